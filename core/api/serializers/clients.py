@@ -35,8 +35,15 @@ class ClientSerializer(serializers.ModelSerializer):
         ]
 
     def get_history(self, obj):
+        # Sorted in Python so the views' prefetch_related is used
+        reservations = sorted(
+            obj.reservations.all(),
+            key=lambda reservation: reservation.reservation_date,
+            reverse=True,
+        )
+
         history = []
-        for reservation in obj.reservations.all().order_by("-reservation_date"):
+        for reservation in reservations:
             history.append(
                 {
                     "reservation_uid": reservation.uid,
@@ -1,6 +1,5 @@
 import logging
 import re
-from openai import OpenAI
 from datetime import datetime, timedelta, time
 
 from django.conf import settings
@@ -10,6 +9,7 @@ from rest_framework import serializers
 
 
 from common.openAI.generate_nutritions import generate_nutrition_info
+from common.openai_clients import get_openai_client
 from common.translations import translate_day
 
 from apps.organization.choices import OrganizationType
@@ -21,6 +21,7 @@ from apps.organization.models import (
     MessageTemplate,
 )
 from apps.restaurant.models import (
+    ClientMessage,
     Promotion,
     Menu,
     RestaurantTable,
@@ -387,7 +388,7 @@ class RestaurantMenuSerializer(serializers.ModelSerializer):
 
             print(f"Generating nutrition info for: {formatted_ingredients}")  # Debug
 
-            openai_client = OpenAI(api_key=settings.OPENAI_API_KEY)
+            openai_client = get_openai_client(settings.OPENAI_API_KEY)
 
             # Get language preference from context (default to 'en')
 
@@ -455,6 +456,11 @@ class ReservationSlimSerializer(serializers.ModelSerializer):
         ]
 
     def get_menu_selected(self, obj):
+        # Prefer the value annotated by the dashboard query
+        menu_selected = getattr(obj, "menu_selected", None)
+        if menu_selected is not None:
+            return menu_selected
+
         return obj.menus.exists()
 
 
@@ -471,6 +477,7 @@ class RestaurantDashboardSerializer(serializers.Serializer):
     next_reservation = ReservationSlimSerializer(read_only=True)
     sales_level = serializers.IntegerField()
     active_promotions = ReservationPromotionSlimSerializer(many=True, read_only=True)
+    token_usage = serializers.DictField(read_only=True)
 
 
 class MessageTemplateSerializer(serializers.ModelSerializer):
@@ -492,3 +499,25 @@ class RestaurantPromotionsSerializer(serializers.ModelSerializer):
     class Meta:
         model = Promotion
         fields = ["uid", "reward_type", "reward_label"]
+
+
+class RestaurantMessageSearchSerializer(serializers.ModelSerializer):
+    client_uid = serializers.UUIDField(source="client.uid", read_only=True)
+    client_name = serializers.CharField(source="client.name", read_only=True)
+    client_whatsapp = serializers.CharField(
+        source="client.whatsapp_number", read_only=True
+    )
+    rank = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = ClientMessage
+        fields = [
+            "uid",
+            "client_uid",
+            "client_name",
+            "client_whatsapp",
+            "role",
+            "message",
+            "sent_at",
+            "rank",
+        ]
@@ -1,5 +1,4 @@
 from decouple import config
-from openai import OpenAI
 
 from django.db import transaction
 from django.conf import settings
@@ -22,6 +21,7 @@ from apps.organization.models import Organization
 from apps.restaurant.models import Client, Reward, SalesLevel, WhatsappBot
 
 from common.crypto import decrypt_data, encrypt_data, hash_key
+from common.openai_clients import get_openai_client
 
 
 class RewardSerializer(serializers.ModelSerializer):
@@ -120,7 +120,7 @@ class RestaurantWhatsAppSerializer(serializers.ModelSerializer):
             )
 
             # Create Assistant
-            client = OpenAI(api_key=validated_data["openai_key"])
+            client = get_openai_client(validated_data["openai_key"])
             assistant = create_assistant(
                 client,
                 f"{organization.name} whatsapp reservation assistant with sales level 1",
@@ -232,7 +232,7 @@ class RestaurantWhatsAppDetailSerializer(serializers.ModelSerializer):
         # Decrypt sensitive data
         openai_key = decrypt_data(instance.openai_key, settings.CRYPTO_PASSWORD)
         assistant_id = decrypt_data(instance.assistant_id, settings.CRYPTO_PASSWORD)
-        client = OpenAI(api_key=openai_key)
+        client = get_openai_client(openai_key)
 
         if sales_level_data:
             level = sales_level_data.get("level", sales_level.level)
@@ -387,8 +387,9 @@ class RestaurantWhatsAppDetailSerializer(serializers.ModelSerializer):
 
 
 class WhatsappClientListSerializer(serializers.ModelSerializer):
-    last_message = serializers.SerializerMethodField()
-    last_message_sent_at = serializers.SerializerMethodField()
+    # Annotated by WhatsappClientListView
+    last_message = serializers.CharField(read_only=True, allow_null=True)
+    last_message_sent_at = serializers.DateTimeField(read_only=True, allow_null=True)
 
     class Meta:
         model = Client
@@ -401,10 +402,3 @@ class WhatsappClientListSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ["uid"]
 
-    def get_last_message(self, obj):
-        last_msg = obj.client_messages.order_by("-sent_at").first()
-        return last_msg.message if last_msg else None
-
-    def get_last_message_sent_at(self, obj):
-        last_msg = obj.client_messages.order_by("-sent_at").first()
-        return last_msg.sent_at if last_msg else None
@@ -8,4 +8,5 @@ urlpatterns = [
     path("/restaurants", include("api.urls.restaurants")),
     path("/whatsapp", include("api.urls.whatsapp")),
     path("/clients", include("api.urls.clients")),
+    path("/sql-profile", include("api.urls.profiling")),
 ]
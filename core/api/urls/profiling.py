@@ -0,0 +1,7 @@
+from django.urls import path
+
+from ..views.profiling import SQLProfileReportView
+
+urlpatterns = [
+    path("", SQLProfileReportView.as_view(), name="sql-profile-report"),
+]
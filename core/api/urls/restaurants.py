@@ -15,7 +15,9 @@ from ..views.restaurants import (
     RestaurantDashboardView,
     RestaurantAnalyticsTopDishesView,
     RestaurantAnalyticsMostVisitedView,
+    RestaurantAnalyticsTokenUsageView,
     RestaurantPromotionListView,
+    RestaurantMessageSearchView,
 )
 
 urlpatterns = [
@@ -29,11 +31,21 @@ urlpatterns = [
         RestaurantAnalyticsTopDishesView.as_view(),
         name="restaurant.analytics.top-dishes",
     ),
+    path(
+        "/<uuid:restaurant_uid>/analytics/token-usage",
+        RestaurantAnalyticsTokenUsageView.as_view(),
+        name="restaurant.analytics.token-usage",
+    ),
     path(
         "/<uuid:restaurant_uid>/menu/<uuid:menu_uid>/allergens",
         RestaurantMenuAllergensView.as_view(),
         name="restaurant.menu-allergens",
     ),
+    path(
+        "/<uuid:restaurant_uid>/messages/search",
+        RestaurantMessageSearchView.as_view(),
+        name="restaurant.message-search",
+    ),
     path(
         "/<uuid:restaurant_uid>/promotions",
         RestaurantPromotionListView.as_view(),
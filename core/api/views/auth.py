@@ -1,6 +1,7 @@
 import logging
 
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import update_last_login
 
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -10,6 +11,7 @@ from rest_framework.generics import CreateAPIView
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
 
 from apps.authentication.models import RegistrationSession
 
@@ -69,36 +71,44 @@ class LoginView(TokenObtainPairView):
         if errors:
             return Response(errors, status=status.HTTP_400_BAD_REQUEST)
 
-        response = super().post(request, *args, **kwargs)
+        if not user.is_active:
+            return Response(
+                {"detail": "No active account found with the given credentials"},
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
 
-        if response.status_code == status.HTTP_200_OK:
-            access_token = response.data.get("access")
-            refresh_token = response.data.get("refresh")
+        # Credentials are verified above; issue the tokens directly instead of
+        # letting TokenObtainPairSerializer hash the password a second time
+        refresh = self.get_serializer_class().get_token(user)
+        if api_settings.UPDATE_LAST_LOGIN:
+            update_last_login(None, user)
 
-            access_max_age = 60 * 15 * 60  # 15 hours
-            refresh_max_age = 60 * 60 * 24  # 1 days
+        access_token = str(refresh.access_token)
+        refresh_token = str(refresh)
 
-            # Cookie settings based on environment
-            # is_dev = is_development(request)
+        access_max_age = 60 * 15 * 60  # 15 hours
+        refresh_max_age = 60 * 60 * 24  # 1 days
 
-            cookie_settings = {"httponly": True, "samesite": "Lax", "secure": False}
+        # Cookie settings based on environment
+        # is_dev = is_development(request)
 
-            response.set_cookie(
-                key="access_token",
-                value=access_token,
-                max_age=access_max_age,
-                **cookie_settings,
-            )
-            response.set_cookie(
-                key="refresh_token",
-                value=refresh_token,
-                max_age=refresh_max_age,
-                **cookie_settings,
-            )
+        cookie_settings = {"httponly": True, "samesite": "Lax", "secure": False}
 
-            response.data = {
-                "message": "Successfully logged in.",
-            }
+        response = Response(
+            {"message": "Successfully logged in."}, status=status.HTTP_200_OK
+        )
+        response.set_cookie(
+            key="access_token",
+            value=access_token,
+            max_age=access_max_age,
+            **cookie_settings,
+        )
+        response.set_cookie(
+            key="refresh_token",
+            value=refresh_token,
+            max_age=refresh_max_age,
+            **cookie_settings,
+        )
 
         return response
 
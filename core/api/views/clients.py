@@ -12,8 +12,10 @@ from django_filters.rest_framework import DjangoFilterBackend
 
 
 from apps.organization.choices import OrganizationType
+from apps.organization.utils import get_user_organization_ids
 from apps.restaurant.models import Client, ClientMessage
 
+from common.filters import TrigramSearchFilter
 from common.permissions import IsOwner
 from common.excels import (
     generate_excel,
@@ -26,12 +28,12 @@ from ..serializers.clients import ClientSerializer, ClientMessageSerializer
 
 
 class ClientListView(ListAPIView):
-    queryset = Client.objects.all()
+    queryset = Client.objects.prefetch_related("reservations__menus")
     serializer_class = ClientSerializer
     permission_classes = [IsOwner]
     filter_backends = [
         DjangoFilterBackend,
-        filters.SearchFilter,
+        TrigramSearchFilter,
         filters.OrderingFilter,
     ]
     search_fields = ["name", "phone", "whatsapp_number", "email"]
@@ -40,13 +42,14 @@ class ClientListView(ListAPIView):
         user = self.request.user
 
         return self.queryset.filter(
-            organization__organization_users__user=user,
-            organization__organization_type=OrganizationType.RESTAURANT,
+            organization_id__in=get_user_organization_ids(
+                user, OrganizationType.RESTAURANT
+            ),
         )
 
 
 class ClientDetailView(RetrieveUpdateDestroyAPIView):
-    queryset = Client.objects.all()
+    queryset = Client.objects.prefetch_related("reservations__menus")
     serializer_class = ClientSerializer
     permission_classes = [IsOwner]
 
@@ -57,7 +60,7 @@ class ClientDetailView(RetrieveUpdateDestroyAPIView):
 
 
 class ClientMessageListView(ListAPIView):
-    queryset = ClientMessage.objects.all()
+    queryset = ClientMessage.objects.select_related("client")
     serializer_class = ClientMessageSerializer
     pagination_class = None
 
@@ -76,8 +79,9 @@ class ClientExportExcelView(APIView):
         user = request.user
 
         clients = Client.objects.filter(
-            organization__organization_users__user=user,
-            organization__organization_type=OrganizationType.RESTAURANT,
+            organization_id__in=get_user_organization_ids(
+                user, OrganizationType.RESTAURANT
+            ),
         )
 
         title = "Clients"
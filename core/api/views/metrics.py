@@ -0,0 +1,22 @@
+import hmac
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+
+from common.metrics import metrics_enabled, render_metrics
+
+
+def metrics(request):
+    """Prometheus scrape endpoint"""
+    if not metrics_enabled():
+        raise Http404
+
+    if settings.METRICS_TOKEN:
+        expected = f"Bearer {settings.METRICS_TOKEN}"
+        given = request.META.get("HTTP_AUTHORIZATION", "")
+        if not hmac.compare_digest(given, expected):
+            return HttpResponseForbidden()
+
+    return HttpResponse(
+        render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -0,0 +1,23 @@
+from rest_framework import status
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from common.profiling import get_profile_report, reset_profile_report
+
+
+class SQLProfileReportView(APIView):
+    """Top SQL offenders among the sampled requests, Celery tasks and bot tools"""
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        try:
+            limit = int(request.query_params.get("limit", 20))
+        except ValueError:
+            limit = 20
+        return Response(get_profile_report(limit=limit))
+
+    def delete(self, request, *args, **kwargs):
+        reset_profile_report()
+        return Response(status=status.HTTP_204_NO_CONTENT)
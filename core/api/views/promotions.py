@@ -1,3 +1,5 @@
+from django.db.models import Count, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
 from django.http import HttpResponse
 
 from rest_framework.generics import (
@@ -8,12 +10,16 @@ from rest_framework.generics import (
 )
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.filters import OrderingFilter
 
-from apps.restaurant.models import Promotion, PromotionSentLog, Reservation
+from apps.analytics.models import PromotionDailyRollup
+from apps.restaurant.models import Promotion, PromotionSentLog
 from apps.restaurant.choices import PromotionSentLogStatus
 from apps.organization.choices import OrganizationType
+from apps.organization.utils import get_user_organization_ids
 
+from common.filters import TrigramSearchFilter
+from common.pagination import SentLogCursorPagination
 from common.permissions import IsOwner
 from common.excels import generate_excel, get_timestamped_filename
 
@@ -21,7 +27,9 @@ from ..serializers.promotions import PromotionSerializer, PromotionSentLogSerial
 
 
 class PromotionListView(ListCreateAPIView):
-    queryset = Promotion.objects.all()
+    queryset = Promotion.objects.select_related(
+        "message_template", "reward", "organization", "trigger"
+    ).prefetch_related("trigger__menus")
     serializer_class = PromotionSerializer
     permission_classes = [IsOwner]
 
@@ -29,13 +37,16 @@ class PromotionListView(ListCreateAPIView):
         user = self.request.user
 
         return self.queryset.filter(
-            organization__organization_users__user=user,
-            organization__organization_type=OrganizationType.RESTAURANT,
+            organization_id__in=get_user_organization_ids(
+                user, OrganizationType.RESTAURANT
+            ),
         )
 
 
 class PromotionDetailView(RetrieveUpdateDestroyAPIView):
-    queryset = Promotion.objects.all()
+    queryset = Promotion.objects.select_related(
+        "message_template", "reward", "organization", "trigger"
+    ).prefetch_related("trigger__menus")
     serializer_class = PromotionSerializer
     permission_classes = [IsOwner]
 
@@ -48,47 +59,70 @@ class PromotionDetailView(RetrieveUpdateDestroyAPIView):
 class PromotionSentLogListView(ListAPIView):
     serializer_class = PromotionSentLogSerializer
     permission_classes = [IsOwner]
-    filter_backends = [SearchFilter, OrderingFilter]
+    pagination_class = SentLogCursorPagination
+    filter_backends = [TrigramSearchFilter, OrderingFilter]
     search_fields = ["client__name", "client__whatsapp_number"]
-    ordering_fields = ["sent_at", "client__name"]
+    ordering_fields = ["sent_at"]
 
     def get_queryset(self):
         promotion_uid = self.kwargs.get("promotion_uid")
-        return PromotionSentLog.objects.filter(promotion__uid=promotion_uid)
+        return PromotionSentLog.objects.filter(
+            promotion__uid=promotion_uid
+        ).select_related("client")
+
+    def get_promotion_stats(self, promotion_uid):
+        """Fetch the promotion with all its send statistics in one query."""
+        return (
+            Promotion.objects.filter(uid=promotion_uid)
+            .annotate(
+                total_send=Count("sent_logs"),
+                total_failed=Count(
+                    "sent_logs",
+                    filter=Q(sent_logs__status=PromotionSentLogStatus.FAILED),
+                ),
+                total_delivered=Count(
+                    "sent_logs",
+                    filter=Q(sent_logs__status=PromotionSentLogStatus.DELIVERED),
+                ),
+                total_converted=Coalesce(
+                    Subquery(
+                        PromotionDailyRollup.objects.filter(
+                            promo_code=OuterRef("reward")
+                        )
+                        .order_by()
+                        .values("promo_code")
+                        .annotate(total=Sum("conversions"))
+                        .values("total")
+                    ),
+                    0,
+                ),
+            )
+            .first()
+        )
 
     def list(self, request, *args, **kwargs):
-        # Get the related promotion object
+        # Get the related promotion object with its statistics
         promotion_uid = self.kwargs.get("promotion_uid")
+        promotion = self.get_promotion_stats(promotion_uid)
 
-        try:
-            promotion = Promotion.objects.get(uid=promotion_uid)
-        except Promotion.DoesNotExist:
+        if not promotion:
             return Response({"detail": "Promotion not found."}, status=404)
 
         # Get filtered and searched queryset
         queryset = self.filter_queryset(self.get_queryset())
 
-        # Compute additional statistics based on the unfiltered logs
-        total_send = self.get_queryset().count()
-        total_failed = (
-            self.get_queryset().filter(status=PromotionSentLogStatus.FAILED).count()
-        )
-        total_delivered = (
-            self.get_queryset().filter(status=PromotionSentLogStatus.DELIVERED).count()
-        )
-        total_converted = Reservation.objects.filter(
-            promo_code=promotion.reward
-        ).count()
-
-        # Serialize the filtered logs
-        serializer = self.get_serializer(queryset, many=True)
+        # Serialize one page of the filtered logs
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
 
         response_data = {
             "title": promotion.title,
-            "total_send": total_send,
-            "total_delivered": total_delivered,
-            "total_failed": total_failed,
-            "total_converted": total_converted,
+            "total_send": promotion.total_send,
+            "total_delivered": promotion.total_delivered,
+            "total_failed": promotion.total_failed,
+            "total_converted": promotion.total_converted,
+            "next": self.paginator.get_next_link(),
+            "previous": self.paginator.get_previous_link(),
             "logs": serializer.data,
         }
 
@@ -105,8 +139,9 @@ class PromotionReportExportExcelView(APIView):
         try:
             promotion = Promotion.objects.get(
                 uid=promotion_uid,
-                organization__organization_users__user=user,
-                organization__organization_type=OrganizationType.RESTAURANT,
+                organization_id__in=get_user_organization_ids(
+                    user, OrganizationType.RESTAURANT
+                ),
             )
         except Promotion.DoesNotExist:
             return Response({"detail": "Promotion not found."}, status=404)
@@ -8,9 +8,10 @@ from rest_framework.generics import (
 from apps.restaurant.models import Reservation, ClientMessage
 from apps.restaurant.choices import ClientMessageRole
 from apps.organization.choices import OrganizationType
+from apps.organization.utils import get_user_organization_ids
 
 from common.permissions import IsOwner
-from common.filters import ReservationDateRangeFilter
+from common.filters import ReservationDateRangeFilter, TrigramSearchFilter
 
 from ..serializers.reservations import (
     ReservationSerializer,
@@ -21,12 +22,14 @@ from django_filters.rest_framework import DjangoFilterBackend
 
 
 class ReservationListView(ListCreateAPIView):
-    queryset = Reservation.objects.all()
+    queryset = Reservation.objects.select_related(
+        "client", "table", "organization", "promo_code"
+    ).prefetch_related("menus")
     serializer_class = ReservationSerializer
     permission_classes = [IsOwner]
     filter_backends = [
         DjangoFilterBackend,
-        filters.SearchFilter,
+        TrigramSearchFilter,
         filters.OrderingFilter,
     ]
     filterset_class = ReservationDateRangeFilter
@@ -43,13 +46,16 @@ class ReservationListView(ListCreateAPIView):
         user = self.request.user
 
         return self.queryset.filter(
-            organization__organization_users__user=user,
-            organization__organization_type=OrganizationType.RESTAURANT,
+            organization_id__in=get_user_organization_ids(
+                user, OrganizationType.RESTAURANT
+            ),
         )
 
 
 class ReservationDetailView(RetrieveUpdateDestroyAPIView):
-    queryset = Reservation.objects.all()
+    queryset = Reservation.objects.select_related(
+        "client", "table", "organization", "promo_code"
+    ).prefetch_related("menus")
     serializer_class = ReservationSerializer
     permission_classes = [IsOwner]
 
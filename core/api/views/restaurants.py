@@ -2,6 +2,24 @@ import logging
 
 from datetime import datetime, date, timedelta
 
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import (
+    Case,
+    CharField,
+    Count,
+    Exists,
+    F,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce, ExtractWeekDay, RowNumber
+from django.contrib.postgres.search import SearchQuery, SearchRank
+
 from rest_framework.response import Response
 from rest_framework.generics import (
     ListAPIView,
@@ -10,6 +28,7 @@ from rest_framework.generics import (
     RetrieveUpdateDestroyAPIView,
     ValidationError,
     RetrieveDestroyAPIView,
+    get_object_or_404,
 )
 from rest_framework.views import APIView
 
@@ -17,12 +36,19 @@ from rest_framework import filters
 from django_filters.rest_framework import DjangoFilterBackend
 
 
+from apps.analytics.models import (
+    DishDailyRollup,
+    ReservationDailyRollup,
+    TokenDailyRollup,
+)
+from apps.analytics.utils import get_token_regression
 from apps.organization.models import (
     Organization,
     OpeningHours,
     MessageTemplate,
 )
 from apps.organization.choices import OrganizationType
+from apps.organization.utils import get_search_config, get_user_organization_ids
 from apps.restaurant.choices import MenuStatus, RewardCategory, TableStatus
 from apps.restaurant.models import (
     RestaurantTable,
@@ -30,9 +56,13 @@ from apps.restaurant.models import (
     Reservation,
     RestaurantDocument,
     Promotion,
+    SalesLevel,
+    ClientMessage,
 )
-from apps.openAI.utils import is_table_available
+from apps.openAI.utils import get_booked_times, is_time_available
 
+from common.cache import make_cache_key
+from common.expressions import GroupedWindow, WindowSum
 from common.permissions import IsOwner
 from common.filters import ReservationFilter
 
@@ -45,6 +75,7 @@ from ..serializers.restaurants import (
     RestaurantDocumentSerializer,
     RestaurantDashboardSerializer,
     RestaurantPromotionsSerializer,
+    RestaurantMessageSearchSerializer,
 )
 
 logger = logging.getLogger(__name__)
@@ -152,8 +183,11 @@ class RestaurantAvailableTablesView(ListAPIView):
         )
 
         available_tables = []
+        booked_times = get_booked_times(all_tables, reservation_date)
         for table in all_tables:
-            is_available = is_table_available(table, reservation_date, reservation_time)
+            is_available = is_time_available(
+                booked_times[table.id], reservation_date, reservation_time
+            )
             if is_available:
                 available_tables.append(table)
 
@@ -171,7 +205,7 @@ class RestaurantMenuListView(ListCreateAPIView):
         return Menu.objects.filter(
             status=MenuStatus.ACTIVE,
             organization__uid=restaurant_uid,
-        )
+        ).prefetch_related("recommended_combinations")
 
     def perform_create(self, serializer):
         restaurant_uid = self.kwargs.get("restaurant_uid")
@@ -184,7 +218,9 @@ class RestaurantMenuListView(ListCreateAPIView):
 
 
 class RestaurantMenuDetailView(RetrieveUpdateDestroyAPIView):
-    queryset = Menu.objects.filter(status=MenuStatus.ACTIVE)
+    queryset = Menu.objects.filter(status=MenuStatus.ACTIVE).prefetch_related(
+        "recommended_combinations"
+    )
     serializer_class = RestaurantMenuSerializer
     permission_classes = [IsOwner]
 
@@ -257,45 +293,102 @@ class RestaurantDashboardView(APIView):
         today = date.today()
         return organization.promotions.filter(
             is_enabled=True, valid_from__lte=today, valid_to__gte=today
+        ).select_related("message_template")
+
+    def get_next_reservation(self, organization):
+        now = datetime.now()
+        return (
+            Reservation.objects.filter(organization=organization)
+            .filter(
+                Q(reservation_date__gt=now.date())
+                | Q(reservation_date=now.date(), reservation_time__gt=now.time())
+            )
+            .annotate(
+                menu_selected=Exists(
+                    Reservation.menus.through.objects.filter(
+                        reservation=OuterRef("pk")
+                    )
+                )
+            )
+            .order_by("reservation_date", "reservation_time")
+            .first()
         )
 
     def get(self, request, *args, **kwargs):
         restaurant_uid = self.kwargs.get("restaurant_uid")
-        organization = Organization.objects.filter(uid=restaurant_uid).first()
+
+        cache_key = None
+        if settings.DASHBOARD_CACHE_TIMEOUT:
+            cache_key = make_cache_key("dashboard", restaurant_uid, date.today())
+            cached_dashboard = cache.get(cache_key)
+            if cached_dashboard is not None:
+                return Response(cached_dashboard)
+
+        # Today's count and sales level come with the organization row
+        organization = (
+            Organization.objects.filter(uid=restaurant_uid)
+            .annotate(
+                today_reservation=Coalesce(
+                    Subquery(
+                        Reservation.objects.filter(
+                            organization=OuterRef("pk"),
+                            reservation_date=date.today(),
+                        )
+                        .order_by()
+                        .values("organization")
+                        .annotate(count=Count("id"))
+                        .values("count")
+                    ),
+                    0,
+                ),
+                sales_level=Coalesce(
+                    Subquery(
+                        SalesLevel.objects.filter(organization=OuterRef("pk"))
+                        .order_by("pk")
+                        .values("level")[:1]
+                    ),
+                    0,
+                ),
+            )
+            .first()
+        )
 
         if not organization:
             return Response({"error": "Invalid restaurant."}, status=404)
 
         # Gather dashboard data
         data = {
-            "today_reservation": Reservation.objects.filter(
-                organization=organization, reservation_date=datetime.today()
-            ).count(),
-            "next_reservation": Reservation.objects.filter(
-                organization=organization, reservation_time__gt=datetime.now()
-            )
-            .order_by("reservation_time")
-            .first(),
-            "sales_level": (
-                organization.sales_levels.first().level
-                if organization.sales_levels.first()
-                else 0
-            ),
+            "today_reservation": organization.today_reservation,
+            "next_reservation": self.get_next_reservation(organization),
+            "sales_level": organization.sales_level,
             "active_promotions": self.get_active_promotion(organization),
+            "token_usage": get_token_regression(organization.id, date.today()),
         }
 
         serializer = RestaurantDashboardSerializer(data)
 
+        if cache_key:
+            cache.set(cache_key, serializer.data, settings.DASHBOARD_CACHE_TIMEOUT)
+
         return Response(serializer.data)
 
 
 class RestaurantAnalyticsTopDishesView(APIView):
-    def filter_menus(self, restaurant_uid, category=None):
-        """Filter menus by restaurant and optional category."""
-        menus = Menu.objects.filter(organization__uid=restaurant_uid)
-        if category:
-            menus = menus.filter(category=category)
-        return menus
+    def get_limit(self, request):
+        """Parse the optional positive `limit` query param."""
+        limit = request.query_params.get("limit")
+        if not limit:
+            return None
+
+        try:
+            limit = int(limit)
+        except ValueError:
+            limit = 0
+
+        if limit <= 0:
+            raise ValidationError({"limit": "Limit must be a positive integer."})
+
+        return limit
 
     def get(self, request, *args, **kwargs):
         restaurant_uid = self.kwargs.get("restaurant_uid")
@@ -305,32 +398,57 @@ class RestaurantAnalyticsTopDishesView(APIView):
         time_range = request.query_params.get("time_range")
         start_date = request.query_params.get("start_date")
         end_date = request.query_params.get("end_date")
+        per_category = request.query_params.get("per_category") in ["true", "1"]
+        limit = self.get_limit(request)
 
-        top_dishes = {}
+        # Read the pre-aggregated daily dish orders
+        dish_rollups = ReservationFilter(
+            DishDailyRollup.objects.filter(organization__uid=restaurant_uid)
+        ).filter(time_range, start_date, end_date)
 
-        menus = self.filter_menus(restaurant_uid, category)
-        reservations = Reservation.objects.filter(
-            organization__uid=restaurant_uid, menus__in=menus
+        if category:
+            dish_rollups = dish_rollups.filter(menu__category=category)
+
+        # Rank dishes by order count, with overall and per-category totals
+        top_dishes = dish_rollups.values("menu__name", "menu__category").annotate(
+            order_count=Sum("orders"),
+            total_orders=GroupedWindow(WindowSum(Sum("orders"))),
+            category_orders=GroupedWindow(
+                WindowSum(Sum("orders")), partition_by=[F("menu__category")]
+            ),
         )
 
-        filtered_reservations = (
-            ReservationFilter(reservations)
-            .filter(time_range, start_date, end_date)
-            .values_list("menus__name", flat=True)
-        )
+        if per_category:
+            # Limit applies to each category
+            top_dishes = top_dishes.annotate(
+                category_rank=GroupedWindow(
+                    RowNumber(),
+                    partition_by=[F("menu__category")],
+                    order_by=[Sum("orders").desc(), F("menu__name").asc()],
+                )
+            ).order_by("menu__category", "category_rank")
 
-        for dish in filtered_reservations:
-            top_dishes[dish] = top_dishes.get(dish, 0) + 1
+            if limit:
+                top_dishes = top_dishes.filter(category_rank__lte=limit)
+        else:
+            top_dishes = top_dishes.order_by("-order_count", "menu__name")
 
-        total_orders = sum(top_dishes.values()) or 1  # Avoid division by zero
+            if limit:
+                top_dishes = top_dishes[:limit]
 
         top_dishes_list = [
             {
-                "name": name,
-                "orders": count,
-                "share_of_total_sales": round((count / total_orders) * 100, 2),
+                "name": dish["menu__name"],
+                "category": dish["menu__category"],
+                "orders": dish["order_count"],
+                "share_of_total_sales": round(
+                    (dish["order_count"] / int(dish["total_orders"])) * 100, 2
+                ),
+                "share_of_category_sales": round(
+                    (dish["order_count"] / int(dish["category_orders"])) * 100, 2
+                ),
             }
-            for name, count in top_dishes.items()
+            for dish in top_dishes
         ]
 
         return Response(top_dishes_list)
@@ -388,6 +506,9 @@ class RestaurantAnalyticsMostVisitedView(APIView):
 
         return slots
 
+    def slot_label(self, slot_start, slot_end):
+        return f"{slot_start.strftime('%H:%M')}-{slot_end.strftime('%H:%M')}"
+
     def get(self, request, *args, **kwargs):
         restaurant_uid = self.kwargs.get("restaurant_uid")
 
@@ -396,46 +517,160 @@ class RestaurantAnalyticsMostVisitedView(APIView):
         start_date = request.query_params.get("start_date")
         end_date = request.query_params.get("end_date")
 
-        slots = []
+        cache_key = None
+        if settings.ANALYTICS_CACHE_TIMEOUT:
+            cache_key = make_cache_key(
+                "analytics",
+                restaurant_uid,
+                "most_visited",
+                date.today(),
+                time_range,
+                start_date,
+                end_date,
+            )
+            cached_slots = cache.get(cache_key)
+            if cached_slots is not None:
+                return Response(cached_slots)
+
         opening_hours = OpeningHours.objects.filter(organization__uid=restaurant_uid)
+        day_slots = self.time_slots(opening_hours)
+
+        # Map day name -> Django weekday integer
+        day_map = {
+            "SUNDAY": 1,
+            "MONDAY": 2,
+            "TUESDAY": 3,
+            "WEDNESDAY": 4,
+            "THURSDAY": 5,
+            "FRIDAY": 6,
+            "SATURDAY": 7,
+        }
 
-        for opening_hour in self.time_slots(opening_hours):
-            day_name = opening_hour["day"]
-            slots.append({"day": day_name, "visits": []})
-
-            # Map day name -> Django weekday integer
-            day_map = {
-                "SUNDAY": 1,
-                "MONDAY": 2,
-                "TUESDAY": 3,
-                "WEDNESDAY": 4,
-                "THURSDAY": 5,
-                "FRIDAY": 6,
-                "SATURDAY": 7,
-            }
-            day_number = day_map.get(day_name)
+        # Bucket every reservation into its weekday slot in SQL
+        slot_buckets = [
+            When(
+                reservation_date__week_day=day_map.get(opening_hour["day"]),
+                reservation_time__gte=slot_start,
+                reservation_time__lt=slot_end,
+                then=Value(self.slot_label(slot_start, slot_end)),
+            )
+            for opening_hour in day_slots
+            for slot_start, slot_end in opening_hour["slots"]
+        ]
 
-            for slot_start, slot_end in opening_hour["slots"]:
-                reservations = Reservation.objects.filter(
-                    organization__uid=restaurant_uid,
-                    reservation_time__range=(slot_start, slot_end),
-                    reservation_date__week_day=day_number,
+        counts = {}
+        if slot_buckets:
+            # Read the pre-aggregated reservations per day and time slot
+            reservation_rollups = ReservationFilter(
+                ReservationDailyRollup.objects.filter(organization__uid=restaurant_uid)
+            ).filter(time_range, start_date, end_date)
+
+            grouped_reservations = (
+                reservation_rollups.annotate(
+                    week_day=ExtractWeekDay("reservation_date"),
+                    slot=Case(*slot_buckets, output_field=CharField()),
                 )
+                .filter(slot__isnull=False)
+                .values("week_day", "slot")
+                .annotate(count=Sum("reservations"))
+                .order_by()
+            )
 
-                total_reservations = ReservationFilter(reservations).filter(
-                    time_range, start_date, end_date
-                )
+            counts = {
+                (row["week_day"], row["slot"]): row["count"]
+                for row in grouped_reservations
+            }
+
+        # Fill empty buckets with zero counts
+        slots = []
+        for opening_hour in day_slots:
+            day_number = day_map.get(opening_hour["day"])
+            slots.append({"day": opening_hour["day"], "visits": []})
 
+            for slot_start, slot_end in opening_hour["slots"]:
+                slot = self.slot_label(slot_start, slot_end)
                 slots[-1]["visits"].append(
-                    {
-                        "slot": f"{slot_start.strftime('%H:%M')}-{slot_end.strftime('%H:%M')}",
-                        "count": total_reservations.count(),
-                    }
+                    {"slot": slot, "count": counts.get((day_number, slot), 0)}
                 )
 
+        if cache_key:
+            cache.set(cache_key, slots, settings.ANALYTICS_CACHE_TIMEOUT)
+
         return Response(slots)
 
 
+class RestaurantAnalyticsTokenUsageView(APIView):
+    def get_average(self, row):
+        if not row["runs"]:
+            return None
+        tokens = row["prompt_tokens"] + row["completion_tokens"]
+        return round(tokens / row["runs"], 1)
+
+    def get(self, request, *args, **kwargs):
+        restaurant_uid = self.kwargs.get("restaurant_uid")
+
+        # Query params
+        time_range = request.query_params.get("time_range")
+        start_date = request.query_params.get("start_date")
+        end_date = request.query_params.get("end_date")
+
+        organization_id = (
+            Organization.objects.filter(uid=restaurant_uid)
+            .values_list("id", flat=True)
+            .first()
+        )
+        if not organization_id:
+            return Response({"error": "Invalid restaurant."}, status=404)
+
+        # ReservationFilter filters on reservation_date
+        token_rollups = ReservationFilter(
+            TokenDailyRollup.objects.filter(organization_id=organization_id).alias(
+                reservation_date=F("run_date")
+            )
+        ).filter(time_range, start_date, end_date)
+
+        sums = {
+            "runs": Sum("runs"),
+            "prompt_tokens": Sum("prompt_tokens"),
+            "completion_tokens": Sum("completion_tokens"),
+            "cached_tokens": Sum("cached_tokens"),
+            "tool_calls": Sum("tool_calls"),
+            "tool_output_chars": Sum("tool_output_chars"),
+        }
+
+        days = token_rollups.filter(tool="").values("run_date").order_by("run_date")
+        tools = (
+            token_rollups.exclude(tool="")
+            .values("tool")
+            .annotate(**sums)
+            .order_by("-tool_output_chars")
+        )
+        totals = token_rollups.filter(tool="").aggregate(**sums)
+        totals = {key: value or 0 for key, value in totals.items()}
+
+        return Response(
+            {
+                "totals": {**totals, "avg_tokens_per_turn": self.get_average(totals)},
+                "days": [
+                    {**day, "avg_tokens_per_turn": self.get_average(day)}
+                    for day in days.annotate(**sums)
+                ],
+                # Tokens of the turns that called the tool, not of the tool alone
+                "tools": [
+                    {
+                        **tool,
+                        "avg_tokens_per_turn": self.get_average(tool),
+                        "avg_output_chars": round(
+                            tool["tool_output_chars"] / tool["tool_calls"]
+                        ),
+                    }
+                    for tool in tools
+                ],
+                "regression": get_token_regression(organization_id, date.today()),
+            }
+        )
+
+
 class MessageTemplateListView(ListCreateAPIView):
     queryset = MessageTemplate.objects.all()
     serializer_class = MessageTemplateSerializer
@@ -456,7 +691,7 @@ class MessageTemplateListView(ListCreateAPIView):
 
 
 class RestaurantPromotionListView(ListAPIView):
-    queryset = Promotion.objects.all()
+    queryset = Promotion.objects.select_related("reward")
     serializer_class = RestaurantPromotionsSerializer
     permission_classes = [IsOwner]
     filter_backends = [
@@ -473,9 +708,47 @@ class RestaurantPromotionListView(ListAPIView):
 
         return self.queryset.filter(
             organization__uid=restaurant_uid,
-            organization__organization_users__user=user,
-            organization__organization_type=OrganizationType.RESTAURANT,
+            organization_id__in=get_user_organization_ids(
+                user, OrganizationType.RESTAURANT
+            ),
             is_enabled=True,
             valid_to__gte=date.today(),
             reward__reward_category=RewardCategory.PROMOTION,
         )
+
+
+class RestaurantMessageSearchView(ListAPIView):
+    serializer_class = RestaurantMessageSearchSerializer
+    permission_classes = [IsOwner]
+
+    def get_queryset(self):
+        restaurant_uid = self.kwargs.get("restaurant_uid")
+        search = self.request.query_params.get("q", "").strip()
+
+        if not search:
+            raise ValidationError({"q": "Search query is required."})
+
+        organization = get_object_or_404(
+            Organization,
+            uid=restaurant_uid,
+            id__in=get_user_organization_ids(
+                self.request.user, OrganizationType.RESTAURANT
+            ),
+        )
+
+        # Same configuration the message vectors were built with
+        query = SearchQuery(
+            search,
+            config=get_search_config(organization.organization_language),
+            search_type="websearch",
+        )
+
+        return (
+            ClientMessage.objects.filter(
+                client__organization=organization, search_vector=query
+            )
+            .select_related("client")
+            .defer("search_vector")
+            .annotate(rank=SearchRank(F("search_vector"), query))
+            .order_by("-rank", "-sent_at")
+        )
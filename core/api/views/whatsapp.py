@@ -1,8 +1,7 @@
 import logging
-from openai import OpenAI
 from datetime import datetime
 
-from django.conf import settings
+from django.db.models import OuterRef, Subquery
 from django.http import JsonResponse, HttpResponse
 from django.views.decorators.csrf import csrf_exempt
 
@@ -17,13 +16,27 @@ from rest_framework.generics import (
     get_object_or_404,
 )
 
-from apps.openAI.utils import cancel_active_runs, process_assistant_run
+from apps.openAI.context import get_bot_context
+from apps.openAI.utils import finish_leftover_run, process_assistant_run
 from apps.organization.models import Organization
-from apps.restaurant.models import RestaurantDocument, WhatsappBot
+from apps.restaurant.models import WhatsappBot
 from apps.restaurant.models import Client, ClientMessage
 from apps.restaurant.choices import ClientMessageRole
 
-from common.crypto import decrypt_data
+from common.metrics import (
+    annotate_turn,
+    instrument_turn,
+    record_messages_per_run,
+    stage_span,
+)
+from common.openai_clients import get_openai_client
+from common.turns import (
+    add_pending_message,
+    conversation_turn,
+    mark_messages_answered,
+    peek_pending_messages,
+    wait_for_burst,
+)
 from common.whatsapp import send_whatsapp_message
 from common.excels import (
     generate_excel,
@@ -42,6 +55,7 @@ logger = logging.getLogger(__name__)
 
 
 @csrf_exempt
+@instrument_turn
 def whatsapp_bot(request):
     """Main WhatsApp bot endpoint"""
     profile_name = request.POST.get("ProfileName", "")
@@ -54,114 +68,154 @@ def whatsapp_bot(request):
         return JsonResponse({"status": "error", "message": "Missing required data"})
 
     try:
-        bot = WhatsappBot.objects.filter(twilio_number=twilio_number).first()
-        if not bot:
+        with stage_span("context"):
+            context = get_bot_context(twilio_number)
+        if not context:
             logger.error(f"No bot found for Twilio number: {twilio_number}")
             return JsonResponse({"status": "error", "message": "Bot not found"})
 
-        # Decrypt credentials
-        openai_key = decrypt_data(bot.openai_key, settings.CRYPTO_PASSWORD)
-        openai_client = OpenAI(api_key=openai_key)
-        assistant_id = decrypt_data(bot.assistant_id, settings.CRYPTO_PASSWORD)
-        twilio_auth_token = decrypt_data(
-            bot.twilio_auth_token, settings.CRYPTO_PASSWORD
-        )
-        twilio_sid = decrypt_data(bot.twilio_sid, settings.CRYPTO_PASSWORD)
-
-        # Get or create client
-        customer, created = Client.objects.get_or_create(
-            whatsapp_number=whatsapp_number.replace("whatsapp:", "").strip(),
-            organization=bot.organization,
-            defaults={"name": profile_name},
-        )
-
-        # Save message history to database
-        ClientMessage.objects.create(
-            client=customer,
-            role=ClientMessageRole.USER,
-            message=incoming_message,
-        )
-
-        # Create thread for new customers
-        if created or not customer.thread_id:
-            thread = openai_client.beta.threads.create()
-            customer.thread_id = thread.id
-            customer.save()
-            logger.info(f"Created new thread for customer: {customer.whatsapp_number}")
-
-        # Check for active runs and cancel them if necessary
-        cancel_active_runs(openai_client, customer.thread_id)
-
-        instructions = openai_client.beta.assistants.retrieve(assistant_id).instructions
-        print("Instructions------------------------------->:", instructions)
-
-        # Add user message to thread
-        openai_client.beta.threads.messages.create(
-            thread_id=customer.thread_id, role="user", content=incoming_message
-        )
-
-        current_date = datetime.now().strftime("%Y-%m-%d")
-        current_year = datetime.now().year
-
-        # Inject live date at runtime
-        runtime_context = (
-            f"Today’s date is {current_date}, and the current year is {current_year}."
-        )
-
-        # Create and process run
-        run = openai_client.beta.threads.runs.create(
-            thread_id=customer.thread_id,
-            assistant_id=assistant_id,
-            instructions=f"{instructions}\n\n{runtime_context}",
-        )
-
-        # Cheack media available in incoming message
-        state = {"media_available": False}
-
-        # Process the run
-        reply = process_assistant_run(
-            openai_client,
-            customer,
-            run,
-            bot.organization,
-            request,
-            twilio_sid,
-            twilio_auth_token,
-            twilio_number,
-            whatsapp_number,
-            state,
-        )
-
-        if reply:
-            # Send reply via WhatsApp
-            send_result = send_whatsapp_message(
-                whatsapp_number, reply, twilio_sid, twilio_auth_token, twilio_number
+        annotate_turn(organization=context.organization_uid)
+
+        # Decrypted once per process
+        with stage_span("decrypt"):
+            openai_key = context.credentials.decrypt("openai_key")
+            assistant_id = context.credentials.decrypt("assistant_id")
+            twilio_auth_token = context.credentials.decrypt("twilio_auth_token")
+            twilio_sid = context.credentials.decrypt("twilio_sid")
+        openai_client = get_openai_client(openai_key)
+
+        # A conversation is keyed by the number, which is known before the
+        # customer and its thread exist
+        customer_number = whatsapp_number.replace("whatsapp:", "").strip()
+        conversation = f"{context.organization_uid}:{customer_number}"
+
+        # Messages typed in a burst are answered together, by the webhook of
+        # the last one
+        sequence = add_pending_message(conversation, incoming_message)
+        with stage_span("coalesce_wait"):
+            answers_burst = wait_for_burst(conversation, sequence)
+        if not answers_burst:
+            annotate_turn(coalesced=True)
+            return JsonResponse({"status": "ok", "coalesced": True})
+
+        # Turns of one customer run one after another in arrival order, so
+        # no live run has to be cancelled to add the next message
+        with conversation_turn(conversation):
+            # Get or create client
+            customer, created = Client.objects.get_or_create(
+                organization_id=context.organization_id,
+                whatsapp_number=customer_number,
+                defaults={"name": profile_name},
             )
 
-            if send_result:
-                menu_pdf_url = None
-                if state.get("media_available"):
-                    # Menu pdf file
-                    menus = RestaurantDocument.objects.filter(
-                        organization=bot.organization, name="menu"
-                    ).first()
-
-                    if menus and menus.file:
-                        if request:
-                            menu_pdf_url = request.build_absolute_uri(menus.file.url)
-                        else:
-                            menu_pdf_url = menus.file.url
-
-                # Save message history to database
-                ClientMessage.objects.create(
-                    client=customer,
-                    message=reply,
-                    media_url=menu_pdf_url if menu_pdf_url else None,
+            # An earlier turn may have answered them all while this one queued
+            incoming_messages, received = peek_pending_messages(conversation)
+            if not incoming_messages:
+                mark_messages_answered(conversation, received)
+                annotate_turn(coalesced=True)
+                return JsonResponse({"status": "ok", "coalesced": True})
+            record_messages_per_run(len(incoming_messages))
+
+            # Create thread for new customers
+            if created or not customer.thread_id:
+                with stage_span("thread_create"):
+                    thread = openai_client.beta.threads.create()
+                customer.thread_id = thread.id
+                customer.save()
+                logger.info(
+                    f"Created new thread for customer: {customer.whatsapp_number}"
                 )
-                logger.info(f"Reply sent successfully to {whatsapp_number}")
-                return JsonResponse({"status": "ok", "reply": reply})
             else:
-                logger.error("Failed to send WhatsApp reply")
+                # A worker killed mid-turn can leave its run active
+                with stage_span("leftover_run"):
+                    finish_leftover_run(openai_client, customer.thread_id)
+
+            annotate_turn(thread=customer.thread_id)
+
+            # Add user message to thread
+            with stage_span("message_create"):
+                openai_client.beta.threads.messages.create(
+                    thread_id=customer.thread_id,
+                    role="user",
+                    content="\n".join(incoming_messages),
+                )
+            # Only now answered; had the thread not taken them, the
+            # customer's next message would bring them along
+            mark_messages_answered(conversation, received)
+
+            # Save message history to database. The context's language spares
+            # loading the organization for the search config
+            for message in incoming_messages:
+                ClientMessage(
+                    client=customer,
+                    role=ClientMessageRole.USER,
+                    message=message,
+                ).save(force_insert=True, organization_language=context.language)
+
+            current_date = datetime.now().strftime("%Y-%m-%d")
+            current_year = datetime.now().year
+
+            # Inject live date at runtime. The assistant's own instructions stay
+            # untouched, so their prefix can be served from the prompt cache
+            runtime_context = (
+                f"Today’s date is {current_date}, "
+                f"and the current year is {current_year}."
+            )
+
+            # Create and process run
+            with stage_span("run_create"):
+                run = openai_client.beta.threads.runs.create(
+                    thread_id=customer.thread_id,
+                    assistant_id=assistant_id,
+                    additional_instructions=runtime_context,
+                )
+
+            # Cheack media available in incoming message
+            state = {"media_available": False}
+
+            # Process the run
+            with stage_span("assistant_run"):
+                reply = process_assistant_run(
+                    openai_client,
+                    customer,
+                    run,
+                    context,
+                    request,
+                    twilio_sid,
+                    twilio_auth_token,
+                    twilio_number,
+                    whatsapp_number,
+                    state,
+                )
+
+            if reply:
+                # Send reply via WhatsApp
+                with stage_span("twilio_send"):
+                    send_result = send_whatsapp_message(
+                        whatsapp_number,
+                        reply,
+                        twilio_sid,
+                        twilio_auth_token,
+                        twilio_number,
+                    )
+
+                if send_result:
+                    menu_pdf_url = None
+                    if state.get("media_available") and context.menu_document_url:
+                        menu_pdf_url = request.build_absolute_uri(
+                            context.menu_document_url
+                        )
+
+                    # Save message history to database
+                    ClientMessage(
+                        client=customer,
+                        message=reply,
+                        media_url=menu_pdf_url if menu_pdf_url else None,
+                    ).save(force_insert=True, organization_language=context.language)
+                    logger.info(f"Reply sent successfully to {whatsapp_number}")
+                    return JsonResponse({"status": "ok", "reply": reply})
+                else:
+                    logger.error("Failed to send WhatsApp reply")
 
     except Exception as e:
         logger.error(f"Error in whatsapp_bot: {str(e)}")
@@ -209,7 +263,16 @@ class WhatsappClientListView(ListAPIView):
         whatsapp_bot_uid = self.kwargs["whatsapp_bot_uid"]
         whatsapp_bot = get_object_or_404(WhatsappBot, uid=whatsapp_bot_uid)
 
-        self.queryset = self.queryset.filter(organization=whatsapp_bot.organization)
+        last_message = ClientMessage.objects.filter(client=OuterRef("pk")).order_by(
+            "-sent_at"
+        )
+
+        self.queryset = self.queryset.filter(
+            organization_id=whatsapp_bot.organization_id
+        ).annotate(
+            last_message=Subquery(last_message.values("message")[:1]),
+            last_message_sent_at=Subquery(last_message.values("sent_at")[:1]),
+        )
         return self.queryset.order_by("-created_at")
 
 
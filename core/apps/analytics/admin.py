@@ -0,0 +1,13 @@
+from django.contrib import admin
+
+from .models import (
+    ReservationDailyRollup,
+    DishDailyRollup,
+    PromotionDailyRollup,
+    TokenDailyRollup,
+)
+
+admin.site.register(ReservationDailyRollup)
+admin.site.register(DishDailyRollup)
+admin.site.register(PromotionDailyRollup)
+admin.site.register(TokenDailyRollup)
@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+
+from apps.organization.choices import OrganizationType
+from apps.organization.models import Organization
+from apps.restaurant.models import Reservation
+
+from apps.analytics.utils import rollup_organization_day
+
+
+class Command(BaseCommand):
+    help = "Rebuild the analytics rollup tables from existing reservations."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--organization", help="UID of a single organization to backfill"
+        )
+        parser.add_argument("--start-date", help="First day to backfill (YYYY-MM-DD)")
+        parser.add_argument("--end-date", help="Last day to backfill (YYYY-MM-DD)")
+
+    def parse_date(self, value, option):
+        try:
+            return datetime.strptime(value, "%Y-%m-%d").date()
+        except ValueError:
+            raise CommandError(f"{option} must be in YYYY-MM-DD format.")
+
+    def handle(self, *args, **options):
+        organizations = Organization.objects.filter(
+            organization_type=OrganizationType.RESTAURANT
+        )
+        if options["organization"]:
+            organizations = organizations.filter(uid=options["organization"])
+
+        for organization in organizations:
+            bounds = Reservation.objects.filter(organization=organization).aggregate(
+                first=Min("reservation_date"), last=Max("reservation_date")
+            )
+            start_date = (
+                self.parse_date(options["start_date"], "--start-date")
+                if options["start_date"]
+                else bounds["first"]
+            )
+            end_date = (
+                self.parse_date(options["end_date"], "--end-date")
+                if options["end_date"]
+                else bounds["last"]
+            )
+
+            if start_date is None or end_date is None:
+                self.stdout.write(f"{organization.name}: no reservations, skipped")
+                continue
+
+            day = start_date
+            days = 0
+            while day <= end_date:
+                rollup_organization_day(organization.id, day)
+                day += timedelta(days=1)
+                days += 1
+
+            self.stdout.write(
+                self.style.SUCCESS(f"{organization.name}: rolled up {days} day(s)")
+            )
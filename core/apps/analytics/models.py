@@ -0,0 +1,102 @@
+from django.db import models
+
+from common.models import BaseModel
+
+from apps.organization.models import Organization
+from apps.restaurant.choices import ReservationStatus
+from apps.restaurant.models import Menu, Reward
+
+
+class ReservationDailyRollup(BaseModel):
+    """Reservations and guests per organization, day, time slot and status."""
+
+    organization = models.ForeignKey(
+        Organization, on_delete=models.CASCADE, related_name="reservation_rollups"
+    )
+    reservation_date = models.DateField()
+    reservation_time = models.TimeField()
+    reservation_status = models.CharField(
+        max_length=20, choices=ReservationStatus.choices
+    )
+    reservations = models.PositiveIntegerField(default=0)
+    guests = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Reservation Daily Rollup"
+        verbose_name_plural = "Reservation Daily Rollups"
+        unique_together = [
+            "organization",
+            "reservation_date",
+            "reservation_time",
+            "reservation_status",
+        ]
+
+    def __str__(self):
+        return f"{self.organization_id} | {self.reservation_date} {self.reservation_time} | {self.reservation_status}: {self.reservations}"
+
+
+class DishDailyRollup(BaseModel):
+    """Dish orders per organization and day."""
+
+    organization = models.ForeignKey(
+        Organization, on_delete=models.CASCADE, related_name="dish_rollups"
+    )
+    reservation_date = models.DateField()
+    menu = models.ForeignKey(Menu, on_delete=models.CASCADE, related_name="rollups")
+    orders = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Dish Daily Rollup"
+        verbose_name_plural = "Dish Daily Rollups"
+        unique_together = ["organization", "reservation_date", "menu"]
+
+    def __str__(self):
+        return f"{self.organization_id} | {self.reservation_date} | Menu: {self.menu_id}: {self.orders}"
+
+
+class PromotionDailyRollup(BaseModel):
+    """Promotion conversions (reservations booked with a promo code) per organization and day."""
+
+    organization = models.ForeignKey(
+        Organization, on_delete=models.CASCADE, related_name="promotion_rollups"
+    )
+    reservation_date = models.DateField()
+    promo_code = models.ForeignKey(
+        Reward, on_delete=models.CASCADE, related_name="rollups"
+    )
+    conversions = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Promotion Daily Rollup"
+        verbose_name_plural = "Promotion Daily Rollups"
+        unique_together = ["organization", "reservation_date", "promo_code"]
+
+    def __str__(self):
+        return f"{self.organization_id} | {self.reservation_date} | Reward: {self.promo_code_id}: {self.conversions}"
+
+
+class TokenDailyRollup(BaseModel):
+    """
+    Assistant run tokens per organization, day and tool. The row with an empty
+    tool holds every run of the day; a tool's row holds the runs that called it.
+    """
+
+    organization = models.ForeignKey(
+        Organization, on_delete=models.CASCADE, related_name="token_rollups"
+    )
+    run_date = models.DateField()
+    tool = models.CharField(max_length=100, blank=True, default="")
+    runs = models.PositiveIntegerField(default=0)
+    prompt_tokens = models.PositiveBigIntegerField(default=0)
+    completion_tokens = models.PositiveBigIntegerField(default=0)
+    cached_tokens = models.PositiveBigIntegerField(default=0)
+    tool_calls = models.PositiveIntegerField(default=0)
+    tool_output_chars = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Token Daily Rollup"
+        verbose_name_plural = "Token Daily Rollups"
+        unique_together = ["organization", "run_date", "tool"]
+
+    def __str__(self):
+        return f"{self.organization_id} | {self.run_date} | {self.tool or 'all'}: {self.prompt_tokens + self.completion_tokens} tokens"
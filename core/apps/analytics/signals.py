@@ -0,0 +1,70 @@
+import logging
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from apps.openAI.models import AssistantRunUsage
+from apps.restaurant.models import Reservation
+
+from common.tasks import refresh_analytics_rollup, refresh_token_rollup
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_after_commit(task, *args):
+    """
+    Queue a task once the current transaction commits. The row that
+    triggered it is already saved then, so an unreachable broker is logged
+    instead of failing the save; the nightly rollup rebuilds what it missed.
+    """
+
+    def enqueue():
+        try:
+            # Without publish retries a broker outage cannot stall the request
+            task.apply_async(args, retry=False)
+        except Exception as e:
+            logger.warning(f"Failed to queue {task.name}{args}: {str(e)}")
+
+    transaction.on_commit(enqueue)
+
+
+def schedule_rollup(organization_id, day):
+    enqueue_after_commit(refresh_analytics_rollup, organization_id, str(day))
+
+
+@receiver(pre_save, sender=Reservation)
+def remember_previous_reservation_date(sender, instance, **kwargs):
+    instance._previous_reservation_date = None
+
+    if instance.pk:
+        instance._previous_reservation_date = (
+            Reservation.objects.filter(pk=instance.pk)
+            .values_list("reservation_date", flat=True)
+            .first()
+        )
+
+
+@receiver(post_save, sender=Reservation)
+@receiver(post_delete, sender=Reservation)
+def refresh_reservation_rollup(sender, instance, **kwargs):
+    schedule_rollup(instance.organization_id, instance.reservation_date)
+
+    previous_date = getattr(instance, "_previous_reservation_date", None)
+    if previous_date and str(previous_date) != str(instance.reservation_date):
+        schedule_rollup(instance.organization_id, previous_date)
+
+
+@receiver(m2m_changed, sender=Reservation.menus.through)
+def refresh_dish_rollup(sender, instance, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear") and isinstance(
+        instance, Reservation
+    ):
+        schedule_rollup(instance.organization_id, instance.reservation_date)
+
+
+@receiver(post_save, sender=AssistantRunUsage)
+def refresh_token_usage_rollup(sender, instance, created, **kwargs):
+    if created:
+        day = instance.created_at.date()
+        enqueue_after_commit(refresh_token_rollup, instance.organization_id, str(day))
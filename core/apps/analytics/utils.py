@@ -0,0 +1,212 @@
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+
+from apps.openAI.models import AssistantRunUsage
+from apps.organization.models import Organization
+from apps.restaurant.models import Reservation
+
+from common.cache import bump_cache_version
+
+from .models import (
+    DishDailyRollup,
+    PromotionDailyRollup,
+    ReservationDailyRollup,
+    TokenDailyRollup,
+)
+
+
+def lock_rollup_day(organization_id: int, day: date) -> None:
+    """
+    Serialize rebuilds of one organization's rollups for one day until the
+    current transaction ends. Concurrent rebuilds would both delete the
+    day's rows and then collide on the unique keys when inserting.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT pg_advisory_xact_lock(%s, %s)",
+            [organization_id, day.toordinal()],
+        )
+
+
+def rollup_organization_day(organization_id: int, day: date) -> None:
+    """
+    Rebuild the analytics rollup rows of one organization for one day.
+
+    Args:
+        organization_id: ID of the organization
+        day: Reservation date to aggregate
+    """
+    organization = Organization.objects.filter(id=organization_id).first()
+    if organization is None:
+        return
+
+    reservations = Reservation.objects.filter(
+        organization_id=organization_id, reservation_date=day
+    )
+
+    reservation_rows = (
+        reservations.values("reservation_time", "reservation_status")
+        .annotate(reservations=Count("id"), guests=Sum("guests"))
+        .order_by()
+    )
+    dish_rows = (
+        Reservation.menus.through.objects.filter(reservation__in=reservations)
+        .values("menu_id")
+        .annotate(orders=Count("id"))
+        .order_by()
+    )
+    promotion_rows = (
+        reservations.filter(promo_code__isnull=False)
+        .values("promo_code_id")
+        .annotate(conversions=Count("id"))
+        .order_by()
+    )
+
+    # The rows are read after taking the lock, so the last rebuild to run
+    # also saw the latest reservations
+    with transaction.atomic():
+        lock_rollup_day(organization_id, day)
+
+        ReservationDailyRollup.objects.filter(
+            organization_id=organization_id, reservation_date=day
+        ).delete()
+        DishDailyRollup.objects.filter(
+            organization_id=organization_id, reservation_date=day
+        ).delete()
+        PromotionDailyRollup.objects.filter(
+            organization_id=organization_id, reservation_date=day
+        ).delete()
+
+        ReservationDailyRollup.objects.bulk_create(
+            [
+                ReservationDailyRollup(
+                    organization_id=organization_id,
+                    reservation_date=day,
+                    reservation_time=row["reservation_time"],
+                    reservation_status=row["reservation_status"],
+                    reservations=row["reservations"],
+                    guests=row["guests"] or 0,
+                )
+                for row in reservation_rows
+            ]
+        )
+        DishDailyRollup.objects.bulk_create(
+            [
+                DishDailyRollup(
+                    organization_id=organization_id,
+                    reservation_date=day,
+                    menu_id=row["menu_id"],
+                    orders=row["orders"],
+                )
+                for row in dish_rows
+            ]
+        )
+        PromotionDailyRollup.objects.bulk_create(
+            [
+                PromotionDailyRollup(
+                    organization_id=organization_id,
+                    reservation_date=day,
+                    promo_code_id=row["promo_code_id"],
+                    conversions=row["conversions"],
+                )
+                for row in promotion_rows
+            ]
+        )
+
+    # Cached analytics responses were computed from the previous rollups
+    bump_cache_version("analytics", organization.uid)
+
+
+def rollup_token_usage_day(organization_id: int, day: date) -> None:
+    """
+    Rebuild the token rollup rows of one organization for one day.
+
+    Args:
+        organization_id: ID of the organization
+        day: Day the assistant runs were recorded
+    """
+    runs = AssistantRunUsage.objects.filter(
+        organization_id=organization_id, created_at__date=day
+    ).values_list(
+        "prompt_tokens", "completion_tokens", "cached_tokens", "tool_calls"
+    )
+
+    # Summed under the lock, so the last rebuild to run also saw the latest runs
+    with transaction.atomic():
+        lock_rollup_day(organization_id, day)
+
+        totals = {}
+        for prompt_tokens, completion_tokens, cached_tokens, tool_calls in runs:
+            # The empty tool is the day's total, every tool called gets its own row
+            tool_rows = {
+                "": [
+                    sum(calls for calls, _ in tool_calls.values()),
+                    sum(chars for _, chars in tool_calls.values()),
+                ],
+                **tool_calls,
+            }
+            for tool, (calls, output_chars) in tool_rows.items():
+                row = totals.setdefault(
+                    tool,
+                    TokenDailyRollup(
+                        organization_id=organization_id, run_date=day, tool=tool
+                    ),
+                )
+                row.runs += 1
+                row.prompt_tokens += prompt_tokens
+                row.completion_tokens += completion_tokens
+                row.cached_tokens += cached_tokens
+                row.tool_calls += calls
+                row.tool_output_chars += output_chars
+
+        TokenDailyRollup.objects.filter(
+            organization_id=organization_id, run_date=day
+        ).delete()
+        TokenDailyRollup.objects.bulk_create(totals.values())
+
+
+def get_token_regression(organization_id: int, day: date) -> dict:
+    """
+    Compare the average tokens per turn of one day with the days before it.
+
+    Args:
+        organization_id: ID of the organization
+        day: Day to check
+
+    Returns:
+        Averages of the day and of its TOKEN_REGRESSION_BASELINE_DAYS
+        baseline, and whether the day regressed. Averages are None when
+        either period has fewer than TOKEN_REGRESSION_MIN_TURNS turns.
+    """
+    rollups = TokenDailyRollup.objects.filter(organization_id=organization_id, tool="")
+    baseline_start = day - timedelta(days=settings.TOKEN_REGRESSION_BASELINE_DAYS)
+
+    def average(rows):
+        totals = rows.aggregate(
+            runs=Sum("runs"),
+            prompt_tokens=Sum("prompt_tokens"),
+            completion_tokens=Sum("completion_tokens"),
+        )
+        if (totals["runs"] or 0) < settings.TOKEN_REGRESSION_MIN_TURNS:
+            return None
+        tokens = totals["prompt_tokens"] + totals["completion_tokens"]
+        return round(tokens / totals["runs"], 1)
+
+    current = average(rollups.filter(run_date=day))
+    baseline = average(rollups.filter(run_date__gte=baseline_start, run_date__lt=day))
+
+    regressed = bool(
+        current
+        and baseline
+        and current > baseline * (1 + settings.TOKEN_REGRESSION_THRESHOLD)
+    )
+
+    return {
+        "day": day,
+        "avg_tokens_per_turn": current,
+        "baseline_avg_tokens_per_turn": baseline,
+        "regressed": regressed,
+    }
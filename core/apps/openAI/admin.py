@@ -1 +1,5 @@
 from django.contrib import admin
+
+from .models import AssistantRunUsage
+
+admin.site.register(AssistantRunUsage)
@@ -0,0 +1,229 @@
+import json
+import logging
+from dataclasses import dataclass
+from datetime import date
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from apps.restaurant.models import (
+    Promotion,
+    RestaurantDocument,
+    SalesLevel,
+    WhatsappBot,
+)
+
+from common.cache import get_cache_version, make_cache_key
+from common.crypto import decrypt_data
+from common.timezones import get_timezone_from_country_city
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_NAMESPACE = "bot_context"
+# Raised whenever OrganizationContext changes its fields, so a context cached
+# by an earlier release is never unpickled as the new one
+CONTEXT_LAYOUT = 2
+
+# {organization uid: context}, checked against the version in the cache
+_local_contexts = {}
+
+
+@lru_cache(maxsize=256)
+def _decrypt(encrypted: str, password: str) -> str:
+    # PBKDF2 makes every decryption slow, so each value is decrypted once
+    return decrypt_data(json.loads(encrypted), password)
+
+
+@dataclass(frozen=True)
+class BotCredentials:
+    """Encrypted bot credentials, decrypted on first use and only in-process."""
+
+    openai_key: Dict[str, str]
+    assistant_id: Dict[str, str]
+    twilio_sid: Dict[str, str]
+    twilio_auth_token: Dict[str, str]
+
+    def decrypt(self, name: str) -> str:
+        encrypted = json.dumps(getattr(self, name), sort_keys=True)
+        return _decrypt(encrypted, settings.CRYPTO_PASSWORD)
+
+
+def format_opening_hours(opening_hours) -> List[Dict[str, Any]]:
+    """One compact entry per day, with times as HH:MM"""
+    days = []
+    for opening_hour in opening_hours:
+        if opening_hour.is_closed:
+            days.append({"day": opening_hour.day, "closed": True})
+            continue
+
+        day = {"day": opening_hour.day}
+        if opening_hour.opening_start_time and opening_hour.opening_end_time:
+            day["open"] = (
+                f"{opening_hour.opening_start_time:%H:%M}-"
+                f"{opening_hour.opening_end_time:%H:%M}"
+            )
+        if opening_hour.break_start_time and opening_hour.break_end_time:
+            day["break"] = (
+                f"{opening_hour.break_start_time:%H:%M}-"
+                f"{opening_hour.break_end_time:%H:%M}"
+            )
+        days.append(day)
+    return days
+
+
+@dataclass(frozen=True)
+class OrganizationContext:
+    """
+    Tenant configuration a bot turn reads, loaded once per cache version.
+
+    Promotions are every enabled promotion; use active_promotions() for
+    the ones valid on a day. The organization is kept as plain fields, since
+    the context is cached and shared between threads; load the model where
+    a write needs it.
+    """
+
+    organization_id: int
+    organization_uid: str
+    name: str
+    phone: Optional[str]
+    email: Optional[str]
+    website: Optional[str]
+    country: str
+    city: str
+    street: str
+    zip_code: str
+    language: str
+    version: int
+    twilio_number: str
+    credentials: BotCredentials
+    sales_level: Optional[int]
+    sales_level_reward_enabled: bool
+    sales_level_reward_id: Optional[int]
+    menu_document_url: Optional[str]
+    opening_hours: Tuple[Dict[str, Any], ...]
+    timezone: Optional[str]
+    promotions: Tuple[Dict[str, Any], ...]
+
+    def active_promotions(self, day: Optional[date] = None):
+        day = day or date.today()
+        return [
+            promotion
+            for promotion in self.promotions
+            if promotion["valid_from"] <= day <= promotion["valid_to"]
+        ]
+
+
+def build_context(bot: WhatsappBot, version: int = 0) -> OrganizationContext:
+    """Load the context of a bot's organization from the database."""
+    organization = bot.organization
+    sales_level = SalesLevel.objects.filter(organization=organization).first()
+    menu_document = RestaurantDocument.objects.filter(
+        organization=organization, name="menu"
+    ).first()
+    promotions = Promotion.objects.filter(
+        organization=organization, is_enabled=True
+    ).select_related("reward")
+
+    return OrganizationContext(
+        organization_id=organization.id,
+        organization_uid=str(organization.uid),
+        name=organization.name,
+        phone=str(organization.phone) if organization.phone else None,
+        email=organization.email,
+        website=organization.website,
+        country=organization.country,
+        city=organization.city,
+        street=organization.street,
+        zip_code=organization.zip_code,
+        language=organization.organization_language,
+        version=version,
+        twilio_number=bot.twilio_number,
+        credentials=BotCredentials(
+            openai_key=bot.openai_key,
+            assistant_id=bot.assistant_id,
+            twilio_sid=bot.twilio_sid,
+            twilio_auth_token=bot.twilio_auth_token,
+        ),
+        sales_level=sales_level.level if sales_level else None,
+        sales_level_reward_enabled=bool(sales_level and sales_level.reward_enabled),
+        sales_level_reward_id=sales_level.reward_id if sales_level else None,
+        menu_document_url=(
+            menu_document.file.url if menu_document and menu_document.file else None
+        ),
+        opening_hours=tuple(format_opening_hours(organization.opening_hours.all())),
+        timezone=get_timezone_from_country_city(
+            organization.country, organization.city
+        ),
+        promotions=tuple(
+            {
+                "uid": str(promotion.uid),
+                "valid_from": promotion.valid_from,
+                "valid_to": promotion.valid_to,
+                "reward": (
+                    {
+                        "type": promotion.reward.get_type_display(),
+                        "label": promotion.reward.label,
+                        "promo_code": promotion.reward.promo_code,
+                    }
+                    if promotion.reward
+                    else None
+                ),
+            }
+            for promotion in promotions
+        ),
+    )
+
+
+def get_bot_context(twilio_number: str) -> Optional[OrganizationContext]:
+    """
+    Context of the organization whose bot owns a Twilio number, or None.
+
+    Served from this process while the organization's cache version is
+    unchanged, then from the cache, and built from the database last.
+    Credentials stay encrypted in the cache.
+    """
+    number_key = f"{CONTEXT_NAMESPACE}:number:{twilio_number}"
+    organization_uid = cache.get(number_key)
+
+    if organization_uid:
+        version = get_cache_version(CONTEXT_NAMESPACE, organization_uid)
+
+        context = _local_contexts.get(organization_uid)
+        if context is None or context.version != version:
+            context = cache.get(
+                make_cache_key(CONTEXT_NAMESPACE, organization_uid, CONTEXT_LAYOUT)
+            )
+
+        # A bot that moved to another number is reloaded below
+        if (
+            context is not None
+            and context.version == version
+            and context.twilio_number == twilio_number
+        ):
+            _local_contexts[organization_uid] = context
+            return context
+
+    bot = (
+        WhatsappBot.objects.filter(twilio_number=twilio_number)
+        .select_related("organization")
+        .first()
+    )
+    if not bot:
+        cache.delete(number_key)
+        return None
+
+    organization_uid = bot.organization.uid
+    version = get_cache_version(CONTEXT_NAMESPACE, organization_uid)
+    context = build_context(bot, version)
+    logger.info(f"Loaded bot context v{version} of organization {organization_uid}")
+
+    cache.set(number_key, organization_uid, timeout=None)
+    cache.set(
+        make_cache_key(CONTEXT_NAMESPACE, organization_uid, CONTEXT_LAYOUT),
+        context,
+        settings.BOT_CONTEXT_CACHE_TIMEOUT,
+    )
+    _local_contexts[organization_uid] = context
+    return context
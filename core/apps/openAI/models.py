@@ -1 +1,45 @@
 from django.db import models
+
+from common.models import BaseModel
+
+from apps.organization.models import Organization
+from apps.restaurant.models import Client
+
+
+class AssistantRunUsage(BaseModel):
+    """Tokens and tool calls of one assistant run, i.e. one bot turn."""
+
+    organization = models.ForeignKey(
+        Organization,
+        on_delete=models.CASCADE,
+        related_name="assistant_runs",
+        db_index=False,  # Covered by run_usage_org_created
+    )
+    client = models.ForeignKey(
+        Client,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="assistant_runs",
+    )
+    run_id = models.CharField(max_length=100, unique=True)
+    status = models.CharField(max_length=30)
+    prompt_tokens = models.PositiveIntegerField(default=0)
+    completion_tokens = models.PositiveIntegerField(default=0)
+    cached_tokens = models.PositiveIntegerField(default=0)
+    total_tokens = models.PositiveIntegerField(default=0)
+    # {tool name: [calls, characters of JSON output]}
+    tool_calls = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        verbose_name = "Assistant Run Usage"
+        verbose_name_plural = "Assistant Run Usages"
+        indexes = [
+            # Daily token rollups
+            models.Index(
+                fields=["organization", "created_at"], name="run_usage_org_created"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.organization_id} | {self.run_id} | {self.status}: {self.total_tokens} tokens"
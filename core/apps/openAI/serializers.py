@@ -1,5 +1,4 @@
 from decouple import config
-from openai import OpenAI
 
 from django.db import transaction
 from django.conf import settings
@@ -22,6 +21,7 @@ from apps.organization.models import Organization, WhatsappBot
 from apps.restaurant.models import Client, Reward, SalesLevel
 
 from common.crypto import decrypt_data, encrypt_data, hash_key
+from common.openai_clients import get_openai_client
 
 
 class RewardSerializer(serializers.ModelSerializer):
@@ -118,7 +118,7 @@ class RestaurantWhatsAppSerializer(serializers.ModelSerializer):
             )
 
             # Create Assistant
-            client = OpenAI(api_key=validated_data["openai_key"])
+            client = get_openai_client(validated_data["openai_key"])
             assistant = create_assistant(
                 client,
                 f"{organization.name} whatsapp reservation assistant with sales level 1",
@@ -229,7 +229,7 @@ class RestaurantWhatsAppDetailSerializer(serializers.ModelSerializer):
         # Decrypt sensitive data
         openai_key = decrypt_data(instance.openai_key, settings.CRYPTO_PASSWORD)
         assistant_id = decrypt_data(instance.assistant_id, settings.CRYPTO_PASSWORD)
-        client = OpenAI(api_key=openai_key)
+        client = get_openai_client(openai_key)
 
         if sales_level_data:
             level = sales_level_data.get("level", sales_level.level)
@@ -0,0 +1,125 @@
+import json
+import logging
+import math
+from typing import Any, Dict, Optional, Tuple
+
+from django.conf import settings
+
+from common.metrics import record_tool_output
+
+logger = logging.getLogger(__name__)
+
+# Top-level list each tool pages through with a "more" cursor
+PAGED_LISTS = {
+    "get_menu_items": "items",
+    "get_priority_menu_items": "items",
+    "get_available_tables": "available_tables",
+    "get_customer_reservations": "reservations",
+    "get_available_promotions": "promotions",
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of JSON text, about four characters per token."""
+    return math.ceil(len(text) / 4)
+
+
+def compact(value):
+    """Drop None values and empty strings from nested dicts and lists."""
+    if isinstance(value, dict):
+        return {
+            key: compact(item)
+            for key, item in value.items()
+            if item is not None and item != ""
+        }
+    if isinstance(value, list):
+        return [compact(item) for item in value]
+    return value
+
+
+def dumps(value) -> str:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def get_token_budget(tool: str) -> int:
+    return settings.TOOL_TOKEN_BUDGETS.get(tool, settings.TOOL_DEFAULT_TOKEN_BUDGET)
+
+
+def get_cursor(arguments: Optional[str]) -> int:
+    """The cursor argument of a tool call, 0 when missing or invalid."""
+    try:
+        return max(int(json.loads(arguments or "{}").get("cursor") or 0), 0)
+    except (AttributeError, TypeError, ValueError):
+        return 0
+
+
+def paginate(result: Dict[str, Any], key: str, cursor: int, budget: int) -> bool:
+    """
+    Cut result[key] to the items from cursor that fit the budget, keeping at
+    least one, and add a "more" cursor when items remain.
+
+    Returns:
+        Whether items were left out
+    """
+    items = result[key][cursor:]
+    result[key] = []
+    result["more"] = {"cursor": cursor + len(items), "remaining": len(items)}
+    size = estimate_tokens(dumps(result))
+
+    page = []
+    for item in items:
+        # One token for the separating comma
+        item_size = estimate_tokens(dumps(item)) + 1
+        if page and size + item_size > budget:
+            break
+        page.append(item)
+        size += item_size
+
+    result[key] = page
+    remaining = len(items) - len(page)
+    if remaining:
+        result["more"] = {"cursor": cursor + len(page), "remaining": remaining}
+    else:
+        del result["more"]
+    return bool(remaining)
+
+
+def encode_tool_output(
+    tool: str, result: Any, arguments: Optional[str] = None
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Encode a tool result as compact JSON within the tool's token budget.
+    Paged lists that do not fit end with a "more" cursor, which the
+    assistant passes back as the cursor argument to get the next page.
+
+    Args:
+        tool: Name of the tool
+        result: Handler result
+        arguments: JSON arguments of the tool call
+
+    Returns:
+        (output, stats) where stats has the output's characters and
+        estimated tokens, and whether a list was truncated
+    """
+    result = compact(result)
+    budget = get_token_budget(tool)
+    truncated = False
+
+    key = PAGED_LISTS.get(tool)
+    if key and isinstance(result, dict) and isinstance(result.get(key), list):
+        truncated = paginate(result, key, get_cursor(arguments), budget)
+
+    output = dumps(result)
+    stats = {
+        "chars": len(output),
+        "tokens": estimate_tokens(output),
+        "truncated": truncated,
+    }
+
+    if stats["tokens"] > budget:
+        logger.warning(
+            f"{tool} output of ~{stats['tokens']} tokens exceeds its budget of {budget}"
+        )
+    record_tool_output(tool, stats["tokens"], truncated)
+
+    return output, stats
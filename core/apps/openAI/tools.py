@@ -1,3 +1,10 @@
+# Optional argument of the tools whose lists are paged, see tool_outputs.py
+CURSOR_PARAMETER = {
+    "type": "integer",
+    "description": "Position to continue from, taken from the 'more' cursor of the previous result. Omit for the first page.",
+}
+
+
 def function_tools():
     """
     Returns function tools for restaurant customer support based on sales level.
@@ -94,6 +101,7 @@ def function_tools():
                             "enum": ["MEAT", "FISH", "VEGETARIAN", "VEGAN"],
                             "description": "Dietary preference.",
                         },
+                        "cursor": CURSOR_PARAMETER,
                     },
                     "additionalProperties": False,
                 },
@@ -123,6 +131,7 @@ def function_tools():
                             "maximum": 50,
                             "description": "Total number of guests including the one making the booking.",
                         },
+                        "cursor": CURSOR_PARAMETER,
                     },
                     "additionalProperties": False,
                 },
@@ -368,6 +377,7 @@ def function_tools():
                             ],
                             "description": "Filter by reservation status.",
                         },
+                        "cursor": CURSOR_PARAMETER,
                     },
                     "additionalProperties": False,
                 },
@@ -378,7 +388,10 @@ def function_tools():
             "function": {
                 "name": "get_priority_menu_items",
                 "description": "Retrieve menu items that are marked as priority or recommended by the restaurant.",
-                "parameters": {"type": "object", "properties": {}},
+                "parameters": {
+                    "type": "object",
+                    "properties": {"cursor": CURSOR_PARAMETER},
+                },
             },
         },
         {
@@ -394,7 +407,10 @@ def function_tools():
             "function": {
                 "name": "get_available_promotions",
                 "description": "Fetch current promotions, discounts, or special offers available at the restaurant.",
-                "parameters": {"type": "object", "properties": {}},
+                "parameters": {
+                    "type": "object",
+                    "properties": {"cursor": CURSOR_PARAMETER},
+                },
             },
         },
     ]
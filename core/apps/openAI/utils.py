@@ -4,10 +4,9 @@ import time
 from datetime import datetime, date, timedelta, time as dtime
 from openai import OpenAI
 from typing import Dict, Any, Optional, List
-from collections import Counter
+from collections import Counter, defaultdict
 
-
-from django.core import serializers
+from django.conf import settings
 
 from apps.restaurant.choices import (
     PromotionSentLogStatus,
@@ -21,42 +20,89 @@ from apps.restaurant.models import (
     Reservation,
     RestaurantTable,
     Menu,
-    RestaurantDocument,
     Promotion,
     PromotionSentLog,
-    SalesLevel,
 )
 
+from common.metrics import (
+    get_cached_tokens,
+    record_openai_usage,
+    record_run_iterations,
+    stage_span,
+    tool_span,
+)
+from common.profiling import profile_sql
+
+from .context import OrganizationContext
+from .models import AssistantRunUsage
+from .tool_outputs import encode_tool_output
+
 logger = logging.getLogger(__name__)
 
 logger.info("OpenAI utils loaded")
 
+# Runs that no longer block new messages and runs on their thread
+FINISHED_RUN_STATUSES = ("completed", "failed", "cancelled", "expired", "incomplete")
+
+
+def wait_for_run_end(openai_client: OpenAI, thread_id: str, run_id: str) -> bool:
+    """Poll a run until it stops blocking its thread, for a bounded time"""
+    deadline = time.monotonic() + settings.OPENAI_RUN_CANCEL_TIMEOUT
+    while time.monotonic() < deadline:
+        try:
+            run = openai_client.beta.threads.runs.retrieve(
+                thread_id=thread_id, run_id=run_id
+            )
+        except Exception as e:
+            logger.warning(f"Failed to retrieve run {run_id}: {str(e)}")
+            return False
+        if run.status in FINISHED_RUN_STATUSES:
+            return True
+        time.sleep(0.5)
+
+    logger.warning(f"Run {run_id} still active after cancelling")
+    return False
+
 
-def cancel_active_runs(openai_client: OpenAI, thread_id: str) -> None:
-    """Cancel any active runs on the thread"""
+def cancel_run(openai_client: OpenAI, thread_id: str, run_id: str) -> None:
+    """
+    Cancel a run and wait until it has stopped. Cancelling is asynchronous,
+    and a run in "cancelling" still blocks new messages on its thread.
+    """
     try:
-        runs = openai_client.beta.threads.runs.list(thread_id=thread_id, limit=5)
-
-        for run in runs.data:
-            if run.status in ["queued", "in_progress", "requires_action"]:
-                logger.info(f"Cancelling active run: {run.id}")
-                try:
-                    openai_client.beta.threads.runs.cancel(
-                        thread_id=thread_id, run_id=run.id
-                    )
-                    time.sleep(0.5)  # Wait for cancellation to process
-                except Exception as e:
-                    logger.warning(f"Failed to cancel run {run.id}: {str(e)}")
+        logger.info(f"Cancelling run: {run_id}")
+        openai_client.beta.threads.runs.cancel(thread_id=thread_id, run_id=run_id)
+    except Exception as e:
+        logger.warning(f"Failed to cancel run {run_id}: {str(e)}")
+    with stage_span("cancel_wait"):
+        wait_for_run_end(openai_client, thread_id, run_id)
+
 
+def finish_leftover_run(openai_client: OpenAI, thread_id: str) -> None:
+    """
+    Cancel a run a dead worker left active on the thread. Turns of a thread
+    run one at a time, so an active run at the start of one has no owner.
+    """
+    try:
+        runs = openai_client.beta.threads.runs.list(thread_id=thread_id, limit=1)
     except Exception as e:
         logger.warning(f"Error checking for active runs: {str(e)}")
+        return
+
+    for run in runs.data:
+        if run.status == "cancelling":
+            with stage_span("cancel_wait"):
+                wait_for_run_end(openai_client, thread_id, run.id)
+        elif run.status not in FINISHED_RUN_STATUSES:
+            logger.warning(f"Found leftover run {run.id} ({run.status})")
+            cancel_run(openai_client, thread_id, run.id)
 
 
 def process_assistant_run(
     openai_client: OpenAI,
     customer: Client,
     run,
-    organization,
+    context: OrganizationContext,
     request,
     twilio_sid,
     twilio_auth_token,
@@ -67,55 +113,92 @@ def process_assistant_run(
     """Process the assistant run and return the response"""
     max_iterations = 30
     iteration = 0
+    finished = False
 
-    while iteration < max_iterations:
-        iteration += 1
+    try:
+        while iteration < max_iterations:
+            iteration += 1
 
-        try:
-            run_status = openai_client.beta.threads.runs.retrieve(
-                thread_id=customer.thread_id, run_id=run.id
-            )
-        except Exception as e:
-            logger.error(f"Error retrieving run status: {str(e)}")
-            return None
+            try:
+                with stage_span("run_poll"):
+                    run_status = openai_client.beta.threads.runs.retrieve(
+                        thread_id=customer.thread_id, run_id=run.id
+                    )
+            except Exception as e:
+                logger.error(f"Error retrieving run status: {str(e)}")
+                return None
 
-        logger.info(
-            f"Assistant run status: {run_status.status} (iteration {iteration})"
-        )
+            logger.info(
+                f"Assistant run status: {run_status.status} (iteration {iteration})"
+            )
 
-        if run_status.status == "completed":
-            logger.info("Assistant run completed")
-            return get_assistant_response(openai_client, customer.thread_id)
-
-        elif run_status.status == "requires_action":
-            logger.info("Processing required actions")
-            if not handle_required_actions(
-                openai_client,
-                customer,
-                run_status,
-                organization,
-                request,
-                twilio_sid,
-                twilio_auth_token,
-                twilio_number,
-                whatsapp_number,
-                state,
-            ):
-                logger.error("Failed to handle required actions")
+            if run_status.status == "completed":
+                logger.info("Assistant run completed")
+                finished = True
+                record_run_usage(run_status, context.organization_id, customer, state)
+                with stage_span("messages_list"):
+                    return get_assistant_response(openai_client, customer.thread_id)
+
+            elif run_status.status == "requires_action":
+                logger.info("Processing required actions")
+                with stage_span("tool_calls"):
+                    handled = handle_required_actions(
+                        openai_client,
+                        customer,
+                        run_status,
+                        context,
+                        request,
+                        twilio_sid,
+                        twilio_auth_token,
+                        twilio_number,
+                        whatsapp_number,
+                        state,
+                    )
+                if not handled:
+                    logger.error("Failed to handle required actions")
+                    return None
+
+            elif run_status.status in ["failed", "cancelled", "expired"]:
+                logger.error(f"Run failed with status: {run_status.status}")
+                finished = True
+                record_run_usage(run_status, context.organization_id, customer, state)
                 return None
 
-        elif run_status.status in ["failed", "cancelled", "expired"]:
-            logger.error(f"Run failed with status: {run_status.status}")
-            return None
+            elif run_status.status in ["queued", "in_progress"]:
+                with stage_span("run_wait"):
+                    time.sleep(1)  # Wait before checking again
+            else:
+                logger.warning(f"Unknown run status: {run_status.status}")
+                with stage_span("run_wait"):
+                    time.sleep(1)
 
-        elif run_status.status in ["queued", "in_progress"]:
-            time.sleep(1)  # Wait before checking again
-        else:
-            logger.warning(f"Unknown run status: {run_status.status}")
-            time.sleep(1)
+        logger.error(f"Run exceeded maximum iterations ({max_iterations})")
+        return None
+    finally:
+        record_run_iterations(iteration)
+        if not finished:
+            cancel_run(openai_client, customer.thread_id, run.id)
 
-    logger.error(f"Run exceeded maximum iterations ({max_iterations})")
-    return None
+
+def record_run_usage(run_status, organization_id, customer: Client, state) -> None:
+    """Store the tokens and tool calls of a finished run."""
+    usage = run_status.usage
+    record_openai_usage(usage)
+
+    try:
+        AssistantRunUsage.objects.create(
+            organization_id=organization_id,
+            client=customer,
+            run_id=run_status.id,
+            status=run_status.status,
+            prompt_tokens=usage.prompt_tokens if usage else 0,
+            completion_tokens=usage.completion_tokens if usage else 0,
+            cached_tokens=get_cached_tokens(usage),
+            total_tokens=usage.total_tokens if usage else 0,
+            tool_calls=state.get("tool_calls", {}),
+        )
+    except Exception as e:
+        logger.warning(f"Failed to record usage of run {run_status.id}: {str(e)}")
 
 
 def get_assistant_response(openai_client: OpenAI, thread_id: str) -> Optional[str]:
@@ -148,7 +231,7 @@ def handle_required_actions(
     openai_client: OpenAI,
     customer: Client,
     run_status,
-    organization,
+    context: OrganizationContext,
     request,
     twilio_sid,
     twilio_auth_token,
@@ -163,6 +246,7 @@ def handle_required_actions(
         return False
 
     tool_outputs = []
+    organization_id = context.organization_id
 
     for call in run_status.required_action.submit_tool_outputs.tool_calls:
         logger.info(f"Processing tool call: {call.function.name}")
@@ -171,10 +255,10 @@ def handle_required_actions(
         # Route function calls to appropriate handlers
         function_handlers = {
             "get_restaurant_information": lambda: handle_get_restaurant_information(
-                call, organization
+                call, context
             ),
             "send_menu_pdf": lambda: handle_send_menu_pdf(
-                organization,
+                context,
                 request,
                 twilio_sid,
                 twilio_auth_token,
@@ -182,31 +266,31 @@ def handle_required_actions(
                 whatsapp_number,
                 state,
             ),
-            "get_menu_items": lambda: handle_get_menu_items(call, organization),
+            "get_menu_items": lambda: handle_get_menu_items(call, organization_id),
             "get_available_tables": lambda: handle_get_available_tables(
-                call, organization
+                call, organization_id
             ),
-            "book_table": lambda: handle_book_table(call, organization, customer),
+            "book_table": lambda: handle_book_table(call, context, customer),
             "add_menu_to_reservation": lambda: handle_add_menu_to_reservation(
-                call, organization
+                call, organization_id
             ),
             "reschedule_reservation": lambda: handle_reschedule_reservation(
-                call, organization, customer
+                call, context, customer
             ),
             "get_customer_reservations": lambda: handle_get_customer_reservations(
-                call, organization, customer
+                call, organization_id, customer
             ),
             "cancel_reservation": lambda: handle_cancel_reservation(
-                call, organization, customer
+                call, organization_id, customer
             ),
             "get_priority_menu_items": lambda: handle_get_priority_menu_items(
-                call, organization
+                call, organization_id
             ),
             "get_personalized_recommendations": lambda: handle_get_personalized_recommendations(
-                call, organization, customer
+                call, organization_id, customer
             ),
             "get_available_promotions": lambda: handle_get_available_promotions(
-                call, organization
+                call, context
             ),
             "client_profile_update": lambda: handle_client_profile_update(
                 call, customer
@@ -215,7 +299,10 @@ def handle_required_actions(
 
         handler = function_handlers.get(call.function.name)
         if handler:
-            result = handler()
+            with tool_span(call.function.name), profile_sql(
+                "tool", call.function.name
+            ):
+                result = handler()
             logger.info(f"{call.function.name} result-------------------->: {result}")
             if call.function.name == "send_menu_pdf" and result:
                 media_available = True
@@ -223,7 +310,19 @@ def handle_required_actions(
             result = {"error": f"Unknown function: {call.function.name}"}
             logger.warning(f"Unknown function called: {call.function.name}")
 
-        tool_outputs.append({"tool_call_id": call.id, "output": json.dumps(result)})
+        output, _ = encode_tool_output(
+            call.function.name, result, call.function.arguments
+        )
+        tool_outputs.append({"tool_call_id": call.id, "output": output})
+
+        # Calls and output size per tool, stored with the run's usage
+        calls, output_chars = state.setdefault("tool_calls", {}).get(
+            call.function.name, [0, 0]
+        )
+        state["tool_calls"][call.function.name] = [
+            calls + 1,
+            output_chars + len(output),
+        ]
 
         logger.info(f"Tool outputs: {tool_outputs}")
 
@@ -238,36 +337,38 @@ def handle_required_actions(
 
     # Submit tool outputs
     try:
-        openai_client.beta.threads.runs.submit_tool_outputs(
-            thread_id=customer.thread_id,
-            run_id=run_status.id,
-            tool_outputs=tool_outputs,
-        )
+        with stage_span("submit_tool_outputs"):
+            openai_client.beta.threads.runs.submit_tool_outputs(
+                thread_id=customer.thread_id,
+                run_id=run_status.id,
+                tool_outputs=tool_outputs,
+            )
         return True
     except Exception as e:
         logger.error(f"Error submitting tool outputs: {str(e)}")
         return False
 
 
-def handle_get_restaurant_information(call, organization) -> Dict[str, Any]:
+def handle_get_restaurant_information(
+    call, context: OrganizationContext
+) -> Dict[str, Any]:
     """Handle get_restaurant_information tool call"""
     try:
         args = json.loads(call.function.arguments)
         query = args.get("query", "all_info").lower()
 
-        # Serialize opening hours
-        opening_hours = serializers.serialize("json", organization.opening_hours.all())
+        opening_hours = list(context.opening_hours)
 
         # Build complete restaurant information
         restaurant_info = {
-            "name": organization.name,
-            "phone": str(organization.phone) if organization.phone else None,
-            "email": organization.email,
-            "website": organization.website,
-            "country": organization.country,
-            "city": organization.city,
-            "street": organization.street,
-            "zip_code": organization.zip_code,
+            "name": context.name,
+            "phone": context.phone,
+            "email": context.email,
+            "website": context.website,
+            "country": context.country,
+            "city": context.city,
+            "street": context.street,
+            "zip_code": context.zip_code,
             "opening_hours": opening_hours,
         }
 
@@ -339,7 +440,7 @@ def handle_client_profile_update(call, customer: Client) -> Dict[str, Any]:
 
 
 def handle_send_menu_pdf(
-    organization,
+    context: OrganizationContext,
     request,
     account_sid,
     auth_token,
@@ -351,16 +452,9 @@ def handle_send_menu_pdf(
     from twilio.rest import Client
 
     # Menu pdf file
-    menus = RestaurantDocument.objects.filter(
-        organization=organization, name="menu"
-    ).first()
-
-    menu_pdf_url = None
-    if menus and menus.file:
-        if request:
-            menu_pdf_url = request.build_absolute_uri(menus.file.url)
-        else:
-            menu_pdf_url = menus.file.url
+    menu_pdf_url = context.menu_document_url
+    if menu_pdf_url and request:
+        menu_pdf_url = request.build_absolute_uri(menu_pdf_url)
 
     if menu_pdf_url:
         client = Client(account_sid, auth_token)
@@ -385,7 +479,7 @@ def handle_send_menu_pdf(
     return None
 
 
-def handle_get_menu_items(call, organization) -> Dict[str, Any]:
+def handle_get_menu_items(call, organization_id) -> Dict[str, Any]:
     """Handle get_menu_items tool call"""
     try:
         args = json.loads(call.function.arguments)
@@ -399,14 +493,18 @@ def handle_get_menu_items(call, organization) -> Dict[str, Any]:
 
         # Build menu filter
         menu_filter = {
-            "organization": organization,
+            "organization_id": organization_id,
             "status": MenuStatus.ACTIVE,
             "category": category,
             "classification": classification,
         }
 
         # Get menu items
-        menu_items = Menu.objects.filter(**menu_filter).order_by("category", "name")
+        menu_items = (
+            Menu.objects.filter(**menu_filter)
+            .prefetch_related("recommended_combinations")
+            .order_by("category", "name")
+        )
 
         if not menu_items.exists():
             return {
@@ -416,32 +514,23 @@ def handle_get_menu_items(call, organization) -> Dict[str, Any]:
                 "classification": classification,
             }
 
-        # Format menu items for display
-        items = []
-        for item in menu_items:
-            allergens_str = ", ".join(item.allergens) if item.allergens else "None"
-            ingredients_str = (
-                ", ".join(item.ingredients) if item.ingredients else "Not specified"
-            )
-
-            items.append(
-                {
-                    "name": item.name,
-                    "recommended_combinations": list(
-                        item.recommended_combinations.all().values_list(
-                            "name", flat=True
-                        )
-                    ),
-                    "description": item.description or "No description available",
-                    "price": float(item.price),
-                    "ingredients": ingredients_str,
-                    "category": item.category,
-                    "classification": item.classification,
-                    "allergens": allergens_str,
-                    "macronutrients": item.macronutrients,
-                    "uid": str(item.uid),
-                }
-            )
+        # Category and classification are the same for every item
+        items = [
+            {
+                "name": item.name,
+                "price": float(item.price),
+                "description": item.description,
+                "ingredients": list(item.ingredients or {}),
+                "allergens": item.allergens,
+                "macronutrients": item.macronutrients,
+                "recommended_combinations": [
+                    combination.name
+                    for combination in item.recommended_combinations.all()
+                ],
+                "uid": str(item.uid),
+            }
+            for item in menu_items
+        ]
 
         return {
             "status": "success",
@@ -456,7 +545,7 @@ def handle_get_menu_items(call, organization) -> Dict[str, Any]:
         return {"error": f"Failed to get menu items: {str(e)}"}
 
 
-def handle_get_available_tables(call, organization) -> Dict[str, Any]:
+def handle_get_available_tables(call, organization_id) -> Dict[str, Any]:
     """Handle get_available_tables tool call"""
     # try:
     args = json.loads(call.function.arguments)
@@ -490,7 +579,7 @@ def handle_get_available_tables(call, organization) -> Dict[str, Any]:
 
     # Get all tables for the organization
     all_tables = RestaurantTable.objects.filter(
-        organization=organization,
+        organization_id=organization_id,
         capacity__gte=guests,
         status=TableStatus.AVAILABLE,
     )
@@ -503,9 +592,12 @@ def handle_get_available_tables(call, organization) -> Dict[str, Any]:
 
     available_tables = []
     busy_tables = []
+    booked_times = get_booked_times(all_tables, reservation_date)
 
     for table in all_tables:
-        is_available = is_table_available(table, reservation_date, reservation_time)
+        is_available = is_time_available(
+            booked_times[table.id], reservation_date, reservation_time
+        )
 
         table_info = {
             "uid": str(table.uid),
@@ -522,7 +614,7 @@ def handle_get_available_tables(call, organization) -> Dict[str, Any]:
     suggestions = []
     if time_str and available_tables == []:
         suggestions = get_alternative_time_slots(
-            reservation_date, 2, organization, limit=3
+            reservation_date, 2, organization_id, limit=3
         )
 
     return {
@@ -540,9 +632,12 @@ def handle_get_available_tables(call, organization) -> Dict[str, Any]:
     #     return {"error": f"Failed to get available tables: {str(e)}"}
 
 
-def handle_book_table(call, organization, customer: Client) -> Dict[str, Any]:
+def handle_book_table(
+    call, context: OrganizationContext, customer: Client
+) -> Dict[str, Any]:
     """Handle book_table tool call"""
     try:
+        organization_id = context.organization_id
         args = json.loads(call.function.arguments)
         logger.info(f"Book table arguments: {args}")
 
@@ -583,7 +678,7 @@ def handle_book_table(call, organization, customer: Client) -> Dict[str, Any]:
         special_notes = args.get("special_notes", "")
 
         promotion = None
-        sales_level_reward = None
+        sales_level_reward_id = None
 
         if booking_reason and reason_for_visit_date:
             reason_for_visit_date = datetime.strptime(
@@ -597,18 +692,15 @@ def handle_book_table(call, organization, customer: Client) -> Dict[str, Any]:
 
             customer.save()
 
-        sales_level = SalesLevel.objects.filter(organization=organization).first()
-
-        if sales_level and (
-            sales_level.level == 2 or sales_level.reward_enabled is True
+        if context.sales_level is not None and (
+            context.sales_level == 2 or context.sales_level_reward_enabled
         ):
-            if sales_level.reward is not None:
-                sales_level_reward = sales_level.reward
+            sales_level_reward_id = context.sales_level_reward_id
 
         if promo_code:
             try:
                 promotion = Promotion.objects.filter(
-                    organization=organization, reward__promo_code=promo_code
+                    organization_id=organization_id, reward__promo_code=promo_code
                 ).first()
 
                 if promotion and promotion.valid_to < date.today():
@@ -666,7 +758,7 @@ def handle_book_table(call, organization, customer: Client) -> Dict[str, Any]:
 
         # Find suitable tables
         suitable_tables = RestaurantTable.objects.filter(
-            organization=organization,
+            organization_id=organization_id,
             capacity__gte=guests,
             status=TableStatus.AVAILABLE,
         ).order_by("capacity")
@@ -683,15 +775,18 @@ def handle_book_table(call, organization, customer: Client) -> Dict[str, Any]:
 
         # Find an available table
         selected_table = None
+        booked_times = get_booked_times(suitable_tables, reservation_date)
         for table in suitable_tables:
-            if is_table_available(table, reservation_date, reservation_time):
+            if is_time_available(
+                booked_times[table.id], reservation_date, reservation_time
+            ):
                 selected_table = table
                 break
 
         if not selected_table:
             # Get alternative time suggestions
             suggestions = get_alternative_time_slots(
-                reservation_date, guests, organization, limit=3
+                reservation_date, guests, organization_id, limit=3
             )
             return {
                 "status": "time_unavailable",
@@ -704,21 +799,22 @@ def handle_book_table(call, organization, customer: Client) -> Dict[str, Any]:
 
         # Create the reservation
         try:
-            reservation = Reservation.objects.create(
+            reservation = Reservation(
                 client=customer,
                 reservation_name=reservation_name,
                 reservation_date=reservation_date,
                 reservation_time=reservation_time,
                 guests=guests,
                 table=selected_table,
-                organization=organization,
+                organization_id=organization_id,
                 reservation_reason=booking_reason,
                 notes=special_notes,
                 promo_code=promotion.reward if promotion else None,
-                sales_level_reward=sales_level_reward if sales_level_reward else None,
+                sales_level_reward_id=sales_level_reward_id,
                 reservation_phone=reservation_phone,
                 reservation_status=ReservationStatus.PLACED,
             )
+            reservation.save(force_insert=True, restaurant_tz=context.timezone)
 
             if promotion:
                 PromotionSentLog.objects.filter(
@@ -751,7 +847,7 @@ def handle_book_table(call, organization, customer: Client) -> Dict[str, Any]:
         return {"error": f"Booking failed: {str(e)}"}
 
 
-def handle_add_menu_to_reservation(call, organization) -> Dict[str, Any]:
+def handle_add_menu_to_reservation(call, organization_id) -> Dict[str, Any]:
     """Handle add_menu_to_reservation tool call"""
     try:
         args = json.loads(call.function.arguments)
@@ -770,7 +866,7 @@ def handle_add_menu_to_reservation(call, organization) -> Dict[str, Any]:
         try:
             reservation = Reservation.objects.get(
                 uid=reservation_uid,
-                organization=organization,
+                organization_id=organization_id,
                 reservation_status__in=[
                     ReservationStatus.PLACED,
                     ReservationStatus.INPROGRESS,
@@ -794,7 +890,7 @@ def handle_add_menu_to_reservation(call, organization) -> Dict[str, Any]:
                 # Find the menu item (case-insensitive search)
                 menu_item = Menu.objects.get(
                     name__iexact=menu_name,
-                    organization=organization,
+                    organization_id=organization_id,
                     status=MenuStatus.ACTIVE,
                 )
 
@@ -815,7 +911,7 @@ def handle_add_menu_to_reservation(call, organization) -> Dict[str, Any]:
             except Menu.DoesNotExist:
                 failed_items.append(f"Menu item '{menu_name}' not found or unavailable")
                 logger.warning(
-                    f"Menu item '{menu_name}' not found for restaurant {organization}"
+                    f"Menu item '{menu_name}' not found for restaurant {organization_id}"
                 )
 
         if not added_items and failed_items:
@@ -840,9 +936,12 @@ def handle_add_menu_to_reservation(call, organization) -> Dict[str, Any]:
         return {"error": f"Failed to add menu items: {str(e)}"}
 
 
-def handle_reschedule_reservation(call, organization, customer) -> Dict[str, Any]:
+def handle_reschedule_reservation(
+    call, context: OrganizationContext, customer
+) -> Dict[str, Any]:
     """Handle reschedule_reservation tool call"""
     try:
+        organization_id = context.organization_id
         args = json.loads(call.function.arguments)
         logger.info(f"Reschedule reservation arguments: {args}")
 
@@ -872,13 +971,13 @@ def handle_reschedule_reservation(call, organization, customer) -> Dict[str, Any
                 client=customer,
                 reservation_date=original_reservation_date,
                 reservation_time=original_reservation_time,
-                organization=organization,
+                organization_id=organization_id,
             ).first()
         else:
             reservations = Reservation.objects.filter(
                 client=customer,
                 reservation_date=original_reservation_date,
-                organization=organization,
+                organization_id=organization_id,
             )
 
             if reservations.count() > 1:
@@ -951,12 +1050,12 @@ def handle_reschedule_reservation(call, organization, customer) -> Dict[str, Any
         mock_call = MockCall(new_args)
 
         # Create new reservation using existing book_table logic
-        booking_result = handle_book_table(mock_call, organization, customer)
+        booking_result = handle_book_table(mock_call, context, customer)
 
         if booking_result.get("status") == "success":
             # Mark original reservation as rescheduled
             original_reservation.reservation_status = ReservationStatus.RESCHEDULED
-            original_reservation.save()
+            original_reservation.save(restaurant_tz=context.timezone)
 
             # Return success with both original and new details
             return {
@@ -983,7 +1082,7 @@ def handle_reschedule_reservation(call, organization, customer) -> Dict[str, Any
 
 
 # New function to get customer reservations
-def handle_get_customer_reservations(call, organization, customer) -> Dict[str, Any]:
+def handle_get_customer_reservations(call, organization_id, customer) -> Dict[str, Any]:
     """ "Handle get_customer_reservations tool call"""
     try:
         args = json.loads(call.function.arguments)
@@ -1002,13 +1101,15 @@ def handle_get_customer_reservations(call, organization, customer) -> Dict[str,
         # Build filter criteria
         filter_criteria = {
             "client": customer,
-            "organization": organization,
+            "organization_id": organization_id,
             "reservation_date": reservation_date,
             "reservation_status": reservation_status,
         }
 
         # Fetch reservations based on filter criteria
-        reservations = Reservation.objects.filter(**filter_criteria)
+        reservations = Reservation.objects.filter(**filter_criteria).prefetch_related(
+            "menus"
+        )
 
         if not reservations.exists():
             return {"error": "No reservations found for the specified criteria."}
@@ -1044,7 +1145,7 @@ def handle_get_customer_reservations(call, organization, customer) -> Dict[str,
 
 
 # Updated handle_cancel_reservation to work with reschedule workflow
-def handle_cancel_reservation(call, organization, customer) -> Dict[str, Any]:
+def handle_cancel_reservation(call, organization_id, customer) -> Dict[str, Any]:
     """Handle cancel_reservation tool call"""
     try:
         args = json.loads(call.function.arguments)
@@ -1073,7 +1174,7 @@ def handle_cancel_reservation(call, organization, customer) -> Dict[str, Any]:
                 client=customer,
                 reservation_date=reservation_date,
                 reservation_time=reservation_time,
-                organization=organization,
+                organization_id=organization_id,
                 reservation_status__in=[
                     ReservationStatus.PLACED,
                     ReservationStatus.INPROGRESS,
@@ -1088,7 +1189,7 @@ def handle_cancel_reservation(call, organization, customer) -> Dict[str, Any]:
             reservations = Reservation.objects.filter(
                 client=customer,
                 reservation_date=reservation_date,
-                organization=organization,
+                organization_id=organization_id,
                 reservation_status__in=[
                     ReservationStatus.PLACED,
                     ReservationStatus.INPROGRESS,
@@ -1159,7 +1260,7 @@ def handle_cancel_reservation(call, organization, customer) -> Dict[str, Any]:
 
 
 def handle_get_personalized_recommendations(
-    call, organization, customer
+    call, organization_id, customer
 ) -> Dict[str, Any]:
     """Handle get_personalized_recommendations tool call"""
     try:
@@ -1171,7 +1272,7 @@ def handle_get_personalized_recommendations(
         # Fetch customer's past reservations
         past_reservations = Reservation.objects.filter(
             client=customer,
-            organization=organization,
+            organization_id=organization_id,
             # reservation_status=ReservationStatus.COMPLETED,
         ).prefetch_related("menus")
 
@@ -1216,48 +1317,28 @@ def handle_get_personalized_recommendations(
         return {"error": f"Failed to get personalized recommendations: {str(e)}"}
 
 
-def handle_get_available_promotions(call, organization) -> Dict[str, Any]:
+def handle_get_available_promotions(
+    call, context: OrganizationContext
+) -> Dict[str, Any]:
     """Handle get_available_promotions tool call"""
     try:
-        # Fetch active promotions for the organization
-        promotions_qs = Promotion.objects.filter(
-            organization=organization,
-            valid_from__lte=date.today(),
-            valid_to__gte=date.today(),
-            is_enabled=True,
-        ).select_related("reward")
-
-        if not promotions_qs.exists():
+        active_promotions = context.active_promotions()
+
+        if not active_promotions:
             return {
                 "status": "no_promotions",
                 "message": "No active promotions available at the moment.",
             }
 
         # Format promotions for display
-        promotions = []
-        for promo in promotions_qs:
-            promotions.append(
-                {
-                    "uid": str(promo.uid),
-                    "valid_from": str(promo.valid_from),
-                    "valid_to": str(promo.valid_to),
-                    "reward": (
-                        {
-                            "type": (
-                                promo.reward.get_type_display()
-                                if promo.reward
-                                else None
-                            ),
-                            "label": promo.reward.label if promo.reward else None,
-                            "promo_code": (
-                                promo.reward.promo_code if promo.reward else None
-                            ),
-                        }
-                        if promo.reward
-                        else None
-                    ),
-                }
-            )
+        promotions = [
+            {
+                **promotion,
+                "valid_from": str(promotion["valid_from"]),
+                "valid_to": str(promotion["valid_to"]),
+            }
+            for promotion in active_promotions
+        ]
 
         return {
             "status": "success",
@@ -1270,13 +1351,13 @@ def handle_get_available_promotions(call, organization) -> Dict[str, Any]:
         return {"error": f"Failed to get available promotions: {str(e)}"}
 
 
-def handle_get_priority_menu_items(call, organization) -> Dict[str, Any]:
+def handle_get_priority_menu_items(call, organization_id) -> Dict[str, Any]:
     """Handle get_priority_menu_items tool call"""
     try:
         # Fetch menu items marked as priority or recommended
         priority_items_qs = (
             Menu.objects.filter(
-                organization=organization,
+                organization_id=organization_id,
                 status=MenuStatus.ACTIVE,
                 enable_upselling=True,
             )
@@ -1311,6 +1392,43 @@ def handle_get_priority_menu_items(call, organization) -> Dict[str, Any]:
         return {"error": f"Failed to get priority menu items: {str(e)}"}
 
 
+def get_booked_times(tables, reservation_date: date) -> Dict[int, List[dtime]]:
+    """Times of the active reservations of each table on a date, in one query"""
+    booked_times = defaultdict(list)
+
+    reservations = Reservation.objects.filter(
+        table__in=tables,
+        reservation_date=reservation_date,
+        reservation_end_time__isnull=True,
+        reservation_status__in=[
+            ReservationStatus.PLACED,
+            ReservationStatus.INPROGRESS,
+        ],
+    ).values_list("table_id", "reservation_time")
+
+    for table_id, booked_time in reservations:
+        booked_times[table_id].append(booked_time)
+
+    return booked_times
+
+
+def is_time_available(
+    booked_times: List[dtime],
+    reservation_date: date,
+    reservation_time: Optional[dtime] = None,
+) -> bool:
+    """Check a table's booked times (see get_booked_times) against a time"""
+    # Without a time, any booking that day makes the table unavailable
+    if reservation_time is None:
+        return not booked_times
+
+    base_dt = datetime.combine(reservation_date, reservation_time)
+    start_time = (base_dt - timedelta(hours=1, minutes=30)).time()
+    end_time = (base_dt + timedelta(hours=1, minutes=30)).time()
+
+    return not any(start_time <= booked <= end_time for booked in booked_times)
+
+
 def is_table_available(
     table: RestaurantTable,
     reservation_date: date,
@@ -1318,25 +1436,10 @@ def is_table_available(
 ) -> bool:
     """Check if a table is available at the specified date and time"""
     try:
-        base_filter = {
-            "table": table,
-            "reservation_date": reservation_date,
-            "reservation_end_time__isnull": True,
-            "reservation_status__in": [
-                ReservationStatus.PLACED,
-                ReservationStatus.INPROGRESS,
-            ],
-        }
-
-        # Only apply time range if reservation_time is provided
-        if reservation_time is not None:
-            base_dt = datetime.combine(reservation_date, reservation_time)
-            start_time = (base_dt - timedelta(hours=1, minutes=30)).time()
-            end_time = (base_dt + timedelta(hours=1, minutes=30)).time()
-            base_filter["reservation_time__range"] = (start_time, end_time)
-
-        conflicting_reservations = Reservation.objects.filter(**base_filter)
-        return not conflicting_reservations.exists()
+        booked_times = get_booked_times([table], reservation_date)
+        return is_time_available(
+            booked_times[table.id], reservation_date, reservation_time
+        )
 
     except Exception as e:
         print(f"Error in is_table_available: {e}")
@@ -1344,7 +1447,7 @@ def is_table_available(
 
 
 def get_alternative_time_slots(
-    date: date, guests: int, organization, limit: int = 3
+    date: date, guests: int, organization_id, limit: int = 3
 ) -> List[Dict[str, Any]]:
     """Get alternative available time slots for the same date"""
     try:
@@ -1376,11 +1479,14 @@ def get_alternative_time_slots(
         ]
 
         alternatives = []
-        suitable_tables = RestaurantTable.objects.filter(
-            organization=organization,
-            capacity__gte=guests,
-            status=TableStatus.AVAILABLE,
+        suitable_tables = list(
+            RestaurantTable.objects.filter(
+                organization_id=organization_id,
+                capacity__gte=guests,
+                status=TableStatus.AVAILABLE,
+            )
         )
+        booked_times = get_booked_times(suitable_tables, date)
 
         for time_str in time_slots:
             if len(alternatives) >= limit:
@@ -1391,7 +1497,7 @@ def get_alternative_time_slots(
                 available_count = 0
 
                 for table in suitable_tables:
-                    if is_table_available(table, date, time_obj):
+                    if is_time_available(booked_times[table.id], date, time_obj):
                         available_count += 1
 
                 if available_count > 0:
@@ -3,7 +3,9 @@ from django.db import models
 
 class OrganizationQuerySet(models.QuerySet):
     def for_user(self, user):
-        return self.filter(organization_users__user=user)
+        from apps.organization.utils import get_user_organization_ids
+
+        return self.filter(id__in=get_user_organization_ids(user))
 
     def restaurants(self):
         from apps.organization.models import OrganizationType
@@ -0,0 +1,27 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Organization, OrganizationUser
+from .utils import get_membership_cache_key
+
+
+def invalidate_membership_cache(user_ids):
+    cache_keys = [get_membership_cache_key(user_id) for user_id in user_ids]
+    transaction.on_commit(lambda: cache.delete_many(cache_keys))
+
+
+@receiver(post_save, sender=OrganizationUser)
+@receiver(post_delete, sender=OrganizationUser)
+def invalidate_user_membership(sender, instance, **kwargs):
+    invalidate_membership_cache([instance.user_id])
+
+
+@receiver(post_save, sender=Organization)
+def invalidate_organization_membership(sender, instance, created, **kwargs):
+    # The cached memberships carry the organization type
+    if not created:
+        invalidate_membership_cache(
+            instance.organization_users.values_list("user_id", flat=True)
+        )
@@ -1,2 +1,60 @@
 def get_organization_media_path_prefix(instance, filename):
     return f"organization/{instance.uid}/{filename}"
+
+
+def get_membership_cache_key(user_id):
+    return f"organization_membership:{user_id}"
+
+
+def get_user_organization_ids(user, organization_type=None):
+    """
+    Get the ids of the organizations a user belongs to.
+
+    Resolved once per request (memoized on the user object) and cached across
+    requests until the user's memberships change.
+
+    Args:
+        user: Authenticated user
+        organization_type: Optional OrganizationType to restrict to
+
+    Returns:
+        List of organization ids
+    """
+    from django.conf import settings
+    from django.core.cache import cache
+
+    from .models import OrganizationUser
+
+    memberships = getattr(user, "_organization_memberships", None)
+
+    if memberships is None:
+        cache_key = get_membership_cache_key(user.pk)
+        memberships = cache.get(cache_key)
+
+        if memberships is None:
+            memberships = list(
+                OrganizationUser.objects.filter(user=user).values_list(
+                    "organization_id", "organization__organization_type"
+                )
+            )
+            cache.set(cache_key, memberships, settings.MEMBERSHIP_CACHE_TIMEOUT)
+
+        user._organization_memberships = memberships
+
+    return [
+        organization_id
+        for organization_id, membership_type in memberships
+        if organization_type is None or membership_type == organization_type
+    ]
+
+
+def get_search_config(organization_language):
+    """Postgres text search configuration for an organization language."""
+    from .choices import OrganizationLanguage
+
+    search_configs = {
+        OrganizationLanguage.ENGLISH: "english",
+        OrganizationLanguage.GERMAN: "german",
+    }
+
+    return search_configs.get(organization_language, "simple")
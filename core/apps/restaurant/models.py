@@ -2,17 +2,21 @@ import random
 
 from django.contrib.auth import get_user_model
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models, transaction
+from django.db.models import Value
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 
 from phonenumber_field.modelfields import PhoneNumberField
 import pytz
 
-from common.models import BaseModel
+from common.models import BaseModel, trigram_index
 
 from apps.organization.models import Organization, MessageTemplate
+from apps.organization.utils import get_search_config
 from datetime import datetime, timedelta
 
 from .choices import (
@@ -369,8 +373,21 @@ class Client(BaseModel):
         "organization.Organization",
         on_delete=models.CASCADE,
         related_name="organization_clients",
+        db_index=False,  # Covered by client_org_whatsapp
     )
 
+    class Meta:
+        indexes = [
+            trigram_index("name", "client_name_trgm"),
+            trigram_index("phone", "client_phone_trgm"),
+            trigram_index("whatsapp_number", "client_whatsapp_trgm"),
+            trigram_index("email", "client_email_trgm"),
+            # Webhook get_or_create
+            models.Index(
+                fields=["organization", "whatsapp_number"], name="client_org_whatsapp"
+            ),
+        ]
+
     def save(self, *args, **kwargs):
         if self.whatsapp_number and self.whatsapp_number.startswith("whatsapp:"):
             self.whatsapp_number = self.whatsapp_number.replace("whatsapp:", "").strip()
@@ -382,7 +399,10 @@ class Client(BaseModel):
 
 class PromotionSentLog(BaseModel):
     promotion = models.ForeignKey(
-        Promotion, on_delete=models.CASCADE, related_name="sent_logs"
+        Promotion,
+        on_delete=models.CASCADE,
+        related_name="sent_logs",
+        db_index=False,  # Covered by the (promotion, ...) indexes below
     )
     client = models.ForeignKey(
         Client, on_delete=models.CASCADE, related_name="promotion_logs"
@@ -399,6 +419,9 @@ class PromotionSentLog(BaseModel):
 
     class Meta:
         unique_together = ("promotion", "client")
+        indexes = [
+            models.Index(fields=["promotion", "status"], name="promotionlog_promo_status")
+        ]
 
     def is_expired(self):
         return (
@@ -412,7 +435,10 @@ class PromotionSentLog(BaseModel):
 
 class Reservation(BaseModel):
     client = models.ForeignKey(
-        Client, on_delete=models.CASCADE, related_name="reservations"
+        Client,
+        on_delete=models.CASCADE,
+        related_name="reservations",
+        db_index=False,  # Covered by reservation_client_org
     )
     reservation_name = models.CharField(max_length=255, blank=True, null=True)
     reservation_phone = models.CharField(max_length=100, blank=True, null=True)
@@ -441,10 +467,16 @@ class Reservation(BaseModel):
     # FK
     menus = models.ManyToManyField(Menu, blank=True, related_name="reservation_menus")
     table = models.ForeignKey(
-        RestaurantTable, on_delete=models.CASCADE, related_name="reservations_table"
+        RestaurantTable,
+        on_delete=models.CASCADE,
+        related_name="reservations_table",
+        db_index=False,  # Covered by reservation_table_date_status
     )
     organization = models.ForeignKey(
-        Organization, on_delete=models.CASCADE, related_name="organization_reservations"
+        Organization,
+        on_delete=models.CASCADE,
+        related_name="organization_reservations",
+        db_index=False,  # Covered by reservation_org_date
     )
     promo_code = models.ForeignKey(
         Reward,
@@ -465,15 +497,53 @@ class Reservation(BaseModel):
         verbose_name = "Reservation"
         verbose_name_plural = "Reservations"
         ordering = ["-created_at"]
+        indexes = [
+            trigram_index("reservation_name", "reservation_name_trgm"),
+            trigram_index("reservation_phone", "reservation_phone_trgm"),
+            # Table availability checks
+            models.Index(
+                fields=["table", "reservation_date", "reservation_status"],
+                name="reservation_table_date_status",
+            ),
+            # Dashboard and analytics
+            models.Index(
+                fields=["organization", "reservation_date"],
+                name="reservation_org_date",
+            ),
+            # Client reservation history
+            models.Index(
+                fields=["client", "organization"], name="reservation_client_org"
+            ),
+            # Pending reminders, scanned every 5 minutes
+            models.Index(
+                fields=["booking_reminder_sent_at"],
+                condition=models.Q(
+                    reservation_status=ReservationStatus.PLACED,
+                    booking_reminder_sent=False,
+                ),
+                name="reservation_booking_reminder",
+            ),
+            models.Index(
+                fields=["auto_reminder_at"],
+                condition=models.Q(
+                    reservation_status=ReservationStatus.PLACED,
+                    auto_reminder_sent=False,
+                ),
+                name="reservation_auto_reminder",
+            ),
+        ]
 
     def __str__(self):
         return f"UID: {self.uid} | Date: {self.reservation_date} | Time: {self.reservation_time} | Restaurant: {self.organization.name} | Status: {self.reservation_status} | Client: {self.client.whatsapp_number} | Table: {self.table.name}"
 
-    def save(self, *args, **kwargs):
+    def save(self, *args, restaurant_tz=None, **kwargs):
         """
         Sets:
         - booking_reminder_sent_at  → X minutes before reservation
         - auto_reminder_at          → 24 hours before reservation
+
+        restaurant_tz skips looking up the restaurant's timezone when the
+        caller already has it, such as the bot's organization context.
         """
         from common.timezones import (
             get_timezone_from_country_city,
@@ -484,7 +554,7 @@ class Reservation(BaseModel):
         naive_datetime = datetime.combine(self.reservation_date, self.reservation_time)
 
         # convert to Local restaurant Timezone
-        restaurant_tz = get_timezone_from_country_city(
+        restaurant_tz = restaurant_tz or get_timezone_from_country_city(
             self.organization.country, self.organization.city
         )
         restaurant_timezone = pytz.timezone(restaurant_tz)
@@ -509,6 +579,7 @@ class ClientMessage(BaseModel):
         Client,
         on_delete=models.CASCADE,
         related_name="client_messages",
+        db_index=False,  # Covered by clientmessage_client_sent
     )
     reservation = models.ForeignKey(
         Reservation,
@@ -525,10 +596,39 @@ class ClientMessage(BaseModel):
     message = models.TextField()
     media_url = models.URLField(blank=True, null=True)
     sent_at = models.DateTimeField(auto_now_add=True)
+    # Full-text vector of message, in the organization's language
+    search_vector = SearchVectorField(blank=True, null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=["search_vector"], name="clientmessage_search_gin"),
+            models.Index(fields=["client", "sent_at"], name="clientmessage_client_sent"),
+        ]
 
     def __str__(self):
         return f"UID: {self.uid} | Role: {self.role}"
 
+    def save(self, *args, organization_language=None, **kwargs):
+        """
+        organization_language skips loading the client's organization for
+        the search config when the caller already has it, such as the bot's
+        organization context.
+        """
+        update_fields = kwargs.get("update_fields")
+
+        if update_fields is None or "message" in update_fields:
+            self.search_vector = SearchVector(
+                Value(self.message),
+                config=get_search_config(
+                    organization_language
+                    or self.client.organization.organization_language
+                ),
+            )
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "search_vector"}
+
+        super().save(*args, **kwargs)
+
 
 class RestaurantDocument(BaseModel):
     organization = models.ForeignKey(
@@ -590,6 +690,10 @@ class WhatsappBot(BaseModel):
             "twilio_auth_token",
             "twilio_number",
         )
+        indexes = [
+            # Webhook bot lookup
+            models.Index(fields=["twilio_number"], name="whatsappbot_twilio_number"),
+        ]
 
     def __str__(self):
         return f"{self.chatbot_name} - {self.uid}, Restaurant: {self.organization.name}"
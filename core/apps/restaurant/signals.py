@@ -1,33 +1,109 @@
-from django.db.models.signals import post_save
+from django.db import connections, transaction
+from django.db.models.signals import m2m_changed, post_save, post_delete, pre_migrate
 from django.dispatch import receiver
 
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
 
-from .models import ClientMessage
+from apps.organization.models import OpeningHours, Organization
+
+from common.cache import bump_cache_version
+from common.metrics import CHANNEL_PUBLISH_SECONDS, timer
+
+from .models import (
+    ClientMessage,
+    Promotion,
+    Reservation,
+    RestaurantDocument,
+    Reward,
+    SalesLevel,
+    WhatsappBot,
+)
+
+
+@receiver(pre_migrate)
+def create_search_extensions(sender, using, **kwargs):
+    # The trigram search indexes need pg_trgm before their migration runs
+    if sender.name != "apps.restaurant":
+        return
+
+    with connections[using].cursor() as cursor:
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+
+@receiver(post_save, sender=OpeningHours)
+@receiver(post_delete, sender=OpeningHours)
+def invalidate_analytics_cache(sender, instance, **kwargs):
+    organization_uid = instance.organization.uid
+    transaction.on_commit(lambda: bump_cache_version("analytics", organization_uid))
+
+
+@receiver(post_save, sender=Reservation)
+@receiver(post_delete, sender=Reservation)
+@receiver(post_save, sender=Promotion)
+@receiver(post_delete, sender=Promotion)
+@receiver(post_save, sender=SalesLevel)
+@receiver(post_delete, sender=SalesLevel)
+def invalidate_dashboard_cache(sender, instance, **kwargs):
+    organization_uid = instance.organization.uid
+    transaction.on_commit(lambda: bump_cache_version("dashboard", organization_uid))
+
+
+@receiver(post_save, sender=WhatsappBot)
+@receiver(post_delete, sender=WhatsappBot)
+@receiver(post_save, sender=OpeningHours)
+@receiver(post_delete, sender=OpeningHours)
+@receiver(post_save, sender=SalesLevel)
+@receiver(post_delete, sender=SalesLevel)
+@receiver(post_save, sender=RestaurantDocument)
+@receiver(post_delete, sender=RestaurantDocument)
+@receiver(post_save, sender=Promotion)
+@receiver(post_delete, sender=Promotion)
+@receiver(post_save, sender=Reward)
+@receiver(post_delete, sender=Reward)
+@receiver(post_save, sender=Organization)
+def invalidate_bot_context(sender, instance, **kwargs):
+    organization_uid = (
+        instance.uid if sender is Organization else instance.organization.uid
+    )
+    transaction.on_commit(
+        lambda: bump_cache_version("bot_context", organization_uid)
+    )
+
+
+@receiver(m2m_changed, sender=Reservation.menus.through)
+def invalidate_dashboard_cache_on_menus(sender, instance, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear") and isinstance(
+        instance, Reservation
+    ):
+        organization_uid = instance.organization.uid
+        transaction.on_commit(
+            lambda: bump_cache_version("dashboard", organization_uid)
+        )
 
 
 @receiver(post_save, sender=ClientMessage)
 def send_realtime_update(sender, instance, created, **kwargs):
     channel_layer = get_channel_layer()
     client_uid = str(instance.client.uid)
-    async_to_sync(channel_layer.group_send)(
-        f"realtime_updates_{client_uid}",
-        {
-            "type": "chat_message",
-            "data": {
-                "action": "created" if created else "updated",
-                "model": sender.__name__,
+    with timer(CHANNEL_PUBLISH_SECONDS):
+        async_to_sync(channel_layer.group_send)(
+            f"realtime_updates_{client_uid}",
+            {
+                "type": "chat_message",
                 "data": {
-                    "uid": str(instance.uid),
-                    "client": instance.client.whatsapp_number,
-                    "role": instance.role,
-                    "message": instance.message,
-                    "media_url": instance.media_url,
-                    "sent_at": (
-                        instance.sent_at.isoformat() if instance.sent_at else None
-                    ),
+                    "action": "created" if created else "updated",
+                    "model": sender.__name__,
+                    "data": {
+                        "uid": str(instance.uid),
+                        "client": instance.client.whatsapp_number,
+                        "role": instance.role,
+                        "message": instance.message,
+                        "media_url": instance.media_url,
+                        "sent_at": (
+                            instance.sent_at.isoformat() if instance.sent_at else None
+                        ),
+                    },
                 },
             },
-        },
-    )
+        )
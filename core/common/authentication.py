@@ -0,0 +1,90 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+# Attribute holding the authentication outcome on the Django request
+REQUEST_AUTH_ATTR = "_jwt_authentication"
+
+# Per-process {jti: (expires_at, user)} cache, least recently used first,
+# see JWT_USER_CACHE_TIMEOUT
+_user_cache = OrderedDict()
+_user_cache_lock = threading.Lock()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that validates a request's token only once.
+
+    The outcome is stored on the underlying Django request, so the
+    LanguageMiddleware, when enabled, and DRF share a single signature check
+    and user query.
+    """
+
+    def authenticate(self, request):
+        # DRF wraps the Django request; the middleware receives it bare
+        django_request = getattr(request, "_request", request)
+
+        if not hasattr(django_request, REQUEST_AUTH_ATTR):
+            try:
+                outcome = (super().authenticate(request), None)
+            except AuthenticationFailed as exc:
+                outcome = (None, exc)
+            setattr(django_request, REQUEST_AUTH_ATTR, outcome)
+
+        result, error = getattr(django_request, REQUEST_AUTH_ATTR)
+        if error is not None:
+            raise error
+
+        return result
+
+    def get_user(self, validated_token):
+        timeout = settings.JWT_USER_CACHE_TIMEOUT
+        jti = validated_token.get(api_settings.JTI_CLAIM)
+
+        if not timeout or not jti:
+            return super().get_user(validated_token)
+
+        now = time.monotonic()
+        with _user_cache_lock:
+            cached = _user_cache.get(jti)
+            if cached and cached[0] > now:
+                _user_cache.move_to_end(jti)
+                # Copy so one request cannot mutate another request's user
+                return copy.copy(cached[1])
+
+        user = super().get_user(validated_token)
+
+        with _user_cache_lock:
+            _user_cache[jti] = (now + timeout, user)
+            _user_cache.move_to_end(jti)
+
+            # Only the least recently used tokens make room for new ones
+            while len(_user_cache) > settings.JWT_USER_CACHE_SIZE:
+                _user_cache.popitem(last=False)
+
+        return copy.copy(user)
+
+
+def authenticate_request(request):
+    """
+    Authenticate a Django request from its JWT, at most once per request.
+
+    Args:
+        request: Django HttpRequest or DRF Request
+
+    Returns:
+        The authenticated user, or None if there is no valid token
+    """
+    try:
+        result = CachedJWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return None
+
+    return result[0] if result else None
@@ -0,0 +1,55 @@
+import time
+
+from django.core.cache import cache
+
+
+def _new_version() -> int:
+    # Milliseconds since the epoch, so a version seeded again after its key
+    # was evicted never repeats one that older entries are still cached under
+    return int(time.time() * 1000)
+
+
+def get_cache_version(namespace: str, organization_uid) -> int:
+    """
+    Get the current cache version for an organization namespace.
+
+    Args:
+        namespace: Cache namespace (e.g., 'analytics')
+        organization_uid: UID of the organization
+
+    Returns:
+        Current version number
+    """
+    key = f"cache_version:{namespace}:{organization_uid}"
+    version = cache.get(key)
+
+    if version is None:
+        version = _new_version()
+        cache.add(key, version, timeout=None)
+        version = cache.get(key, version)
+
+    return version
+
+
+def bump_cache_version(namespace: str, organization_uid) -> None:
+    """
+    Invalidate every cached entry of an organization namespace by bumping its version.
+
+    Args:
+        namespace: Cache namespace (e.g., 'analytics')
+        organization_uid: UID of the organization
+    """
+    key = f"cache_version:{namespace}:{organization_uid}"
+
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _new_version(), timeout=None)
+
+
+def make_cache_key(namespace: str, organization_uid, *parts) -> str:
+    """Build a versioned cache key for an organization namespace"""
+    version = get_cache_version(namespace, organization_uid)
+    suffix = ":".join(str(part) for part in parts)
+
+    return f"{namespace}:{organization_uid}:v{version}:{suffix}"
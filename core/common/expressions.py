@@ -0,0 +1,22 @@
+from django.db.models import Func, IntegerField, Window
+
+
+class WindowSum(Func):
+    """
+    SUM() usable over an aggregate inside a window, e.g. SUM(COUNT(id)) OVER ().
+    Django's Sum refuses to wrap another aggregate.
+    """
+
+    function = "SUM"
+    window_compatible = True
+    output_field = IntegerField()
+
+
+class GroupedWindow(Window):
+    """
+    Window over a grouped queryset. Its partition columns are already part of
+    the GROUP BY, so it must not add itself to it.
+    """
+
+    def get_group_by_cols(self):
+        return []
@@ -1,7 +1,10 @@
 from datetime import datetime, timedelta
 import django_filters
 
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Q
 from django.utils.timezone import now
+from rest_framework.filters import SearchFilter
 
 from apps.restaurant.models import Reservation
 
@@ -93,3 +96,69 @@ class ReservationFilter:
             )
         except ValueError:
             self.reservations = self.reservations.none()
+
+
+class TrigramSearchFilter(SearchFilter):
+    """
+    Drop-in replacement for SearchFilter backed by pg_trgm GIN indexes.
+
+    Matching is unchanged (icontains on every search field, every term must
+    match). Fields on forward relations, e.g. client__name, are matched
+    through a subquery on the related table, so its trigram index is used
+    instead of filtering a join row by row.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        search_fields = self.get_search_fields(view, request)
+        search_terms = self.get_search_terms(request)
+
+        if not search_fields or not search_terms:
+            return queryset
+
+        orm_lookups = [
+            self.construct_search(str(search_field), queryset)
+            for search_field in search_fields
+        ]
+
+        for term in search_terms:
+            queryset = queryset.filter(
+                self.build_conditions(queryset.model, orm_lookups, term)
+            )
+
+        if self.must_call_distinct(queryset, search_fields):
+            # Many-to-many lookups still join and may duplicate rows
+            queryset = queryset.distinct()
+
+        return queryset
+
+    def build_conditions(self, model, orm_lookups, term):
+        """OR the lookups together, one subquery per forward relation."""
+        conditions = Q()
+        related_lookups = {}
+
+        for orm_lookup in orm_lookups:
+            relation, _, remote_lookup = orm_lookup.partition("__")
+            try:
+                field = model._meta.get_field(relation) if remote_lookup else None
+            except FieldDoesNotExist:
+                field = None
+
+            if (
+                field is not None
+                and field.is_relation
+                and (field.many_to_one or field.one_to_one)
+                and not field.auto_created
+            ):
+                related_lookups.setdefault(field, []).append(remote_lookup)
+            else:
+                # Local fields, reverse and many-to-many relations
+                conditions |= Q(**{orm_lookup: term})
+
+        for field, remote_lookups in related_lookups.items():
+            related_model = field.related_model
+            matches = related_model._default_manager.filter(
+                self.build_conditions(related_model, remote_lookups, term)
+            ).values("pk")
+            conditions |= Q(**{f"{field.name}__in": matches})
+
+        return conditions
@@ -0,0 +1,72 @@
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+
+from api.views.auth import LoginView
+
+User = get_user_model()
+
+
+class RollbackBenchmark(Exception):
+    """Raised to roll back the throwaway benchmark user."""
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure login CPU time against the previous double-verification flow. "
+        "Runs inside a rolled-back transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=20)
+
+    def cpu_time(self, func, iterations):
+        """Mean CPU seconds per call of func."""
+        start = time.process_time()
+        for _ in range(iterations):
+            func()
+        return (time.process_time() - start) / iterations
+
+    def handle(self, *args, **options):
+        iterations = options["iterations"]
+        email = f"benchmark-{uuid.uuid4().hex}@example.com"
+        password = uuid.uuid4().hex
+        credentials = {"email": email, "password": password}
+
+        factory = APIRequestFactory()
+        login_view = LoginView.as_view()
+
+        def current_login():
+            request = factory.post("/api/v1/auth/login", credentials, format="json")
+            response = login_view(request)
+            assert response.status_code == 200, response.data
+
+        def previous_login():
+            # check_password in the view, then TokenObtainPairView authenticating again
+            user = User.objects.filter(email=email).first()
+            user.check_password(password)
+            serializer = TokenObtainPairSerializer(data=credentials)
+            serializer.is_valid(raise_exception=True)
+
+        try:
+            with transaction.atomic():
+                User.objects.create_user(email=email, password=password)
+
+                previous = self.cpu_time(previous_login, iterations)
+                current = self.cpu_time(current_login, iterations)
+
+                raise RollbackBenchmark
+        except RollbackBenchmark:
+            pass
+
+        self.stdout.write(f"Previous login: {previous * 1000:.1f} ms CPU")
+        self.stdout.write(f"Current login:  {current * 1000:.1f} ms CPU")
+        self.stdout.write(
+            self.style.SUCCESS(f"Speedup: {previous / current:.2f}x")
+        )
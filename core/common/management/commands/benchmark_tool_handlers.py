@@ -0,0 +1,350 @@
+import json
+import statistics
+import time
+from datetime import date, timedelta
+from datetime import time as dtime
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from apps.openAI.tool_outputs import encode_tool_output
+from apps.openAI.context import build_context
+from apps.openAI.utils import (
+    get_alternative_time_slots,
+    handle_add_menu_to_reservation,
+    handle_book_table,
+    handle_cancel_reservation,
+    handle_client_profile_update,
+    handle_get_available_promotions,
+    handle_get_available_tables,
+    handle_get_customer_reservations,
+    handle_get_menu_items,
+    handle_get_personalized_recommendations,
+    handle_get_priority_menu_items,
+    handle_get_restaurant_information,
+)
+from apps.restaurant.choices import (
+    CategoryChoices,
+    ClassificationChoices,
+    ReservationStatus,
+)
+from apps.restaurant.models import (
+    Client,
+    Menu,
+    Reservation,
+    RestaurantTable,
+    WhatsappBot,
+)
+
+from common.stand_ins import fake_call
+from common.synthetic import SYNTHETIC_PASSWORD, create_synthetic_tenant
+
+SIZES = {
+    "small": {
+        "clients": 20,
+        "reservations_per_client": 5,
+        "messages_per_client": 1,
+        "menus": 20,
+        "promotions": 2,
+        "tables": 5,
+    },
+    "medium": {
+        "clients": 200,
+        "reservations_per_client": 10,
+        "messages_per_client": 1,
+        "menus": 60,
+        "promotions": 5,
+        "tables": 15,
+    },
+    "large": {
+        "clients": 1000,
+        "reservations_per_client": 20,
+        "messages_per_client": 1,
+        "menus": 150,
+        "promotions": 10,
+        "tables": 40,
+    },
+}
+
+DEFAULT_BASELINE = settings.BASE_DIR / "benchmarks" / "tool_handlers.json"
+
+
+class RollbackBenchmark(Exception):
+    """Raised to roll back the synthetic tenants."""
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the bot tool handlers, count their SQL queries and estimate the "
+        "tokens of their encoded outputs against small, medium and large "
+        "synthetic tenants, and compare them with a stored baseline. Runs "
+        "inside a rolled-back transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes", nargs="+", choices=list(SIZES), default=list(SIZES)
+        )
+        parser.add_argument("--iterations", type=int, default=5)
+        parser.add_argument(
+            "--repeats",
+            type=int,
+            default=3,
+            help="Rounds of --iterations calls; the fastest round's median counts.",
+        )
+        parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+        parser.add_argument(
+            "--save-baseline",
+            action="store_true",
+            help="Write the results as the new baseline instead of comparing.",
+        )
+        parser.add_argument(
+            "--time-tolerance",
+            type=float,
+            default=0.5,
+            help="Allowed slowdown against the baseline, as a fraction.",
+        )
+        parser.add_argument(
+            "--min-time-ms",
+            type=float,
+            default=5.0,
+            help="Slowdowns smaller than this are noise, not regressions.",
+        )
+
+    def get_benchmarks(self, organization):
+        """(name, callable) per tool handler of one tenant."""
+        client = Client.objects.filter(organization=organization).first()
+        menu = Menu.objects.filter(organization=organization).first()
+        tomorrow = date.today() + timedelta(days=1)
+        context = build_context(WhatsappBot.objects.get(organization=organization))
+
+        # A booking the cancel and add-menu handlers can find
+        reservation = Reservation.objects.filter(client=client).first()
+        Reservation.objects.filter(pk=reservation.pk).update(
+            table=RestaurantTable.objects.filter(organization=organization).first(),
+            reservation_date=tomorrow,
+            reservation_time=dtime(19, 0),
+            reservation_end_time=None,
+            reservation_status=ReservationStatus.PLACED,
+        )
+
+        return [
+            (
+                "handle_get_restaurant_information",
+                lambda: handle_get_restaurant_information(
+                    fake_call(query="all_info"), context
+                ),
+            ),
+            (
+                "handle_get_menu_items",
+                lambda: handle_get_menu_items(
+                    fake_call(
+                        category=CategoryChoices.STARTERS,
+                        classification=ClassificationChoices.MEAT,
+                    ),
+                    organization.id,
+                ),
+            ),
+            (
+                "handle_get_priority_menu_items",
+                lambda: handle_get_priority_menu_items(fake_call(), organization.id),
+            ),
+            (
+                "handle_get_available_tables",
+                lambda: handle_get_available_tables(
+                    fake_call(guests=2, date=str(tomorrow), time="20:00"),
+                    organization.id,
+                ),
+            ),
+            (
+                "get_alternative_time_slots",
+                lambda: get_alternative_time_slots(tomorrow, 2, organization.id),
+            ),
+            (
+                "handle_book_table",
+                lambda: handle_book_table(
+                    fake_call(
+                        reservation_name=client.name or "Benchmark",
+                        reservation_phone=client.whatsapp_number,
+                        date=str(tomorrow),
+                        time="21:00",
+                        guests=2,
+                    ),
+                    context,
+                    client,
+                ),
+            ),
+            (
+                "handle_add_menu_to_reservation",
+                lambda: handle_add_menu_to_reservation(
+                    fake_call(
+                        reservation_uid=str(reservation.uid),
+                        menu_items=[{"menu_name": menu.name, "quantity": 1}],
+                    ),
+                    organization.id,
+                ),
+            ),
+            (
+                "handle_get_customer_reservations",
+                lambda: handle_get_customer_reservations(
+                    fake_call(
+                        reservation_date=str(tomorrow),
+                        reservation_status=ReservationStatus.PLACED,
+                    ),
+                    organization.id,
+                    client,
+                ),
+            ),
+            (
+                "handle_cancel_reservation",
+                lambda: handle_cancel_reservation(
+                    fake_call(reservation_date=str(tomorrow), reservation_time="19:00"),
+                    organization.id,
+                    client,
+                ),
+            ),
+            (
+                "handle_get_personalized_recommendations",
+                lambda: handle_get_personalized_recommendations(
+                    fake_call(limit=5), organization.id, client
+                ),
+            ),
+            (
+                "handle_get_available_promotions",
+                lambda: handle_get_available_promotions(fake_call(), context),
+            ),
+            (
+                "handle_client_profile_update",
+                lambda: handle_client_profile_update(
+                    fake_call(preferences=["vegetarian"]), client
+                ),
+            ),
+        ]
+
+    def call(self, name, benchmark):
+        """Seconds, captured queries and result of one call, rolled back."""
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                result = benchmark()
+                elapsed = time.perf_counter() - started
+            transaction.set_rollback(True)
+
+        # Handlers report failures in their result instead of raising
+        if isinstance(result, dict) and "error" in result:
+            raise CommandError(f"{name} failed: {result['error']}")
+        return elapsed, context, result
+
+    def measure(self, name, benchmark, iterations, repeats):
+        """
+        Milliseconds, SQL queries and output tokens of one handler call.
+        The time is the median of the fastest round, since a round only gets
+        slower when something else competes for the machine.
+        """
+        # The first call warms caches
+        _, context, result = self.call(name, benchmark)
+
+        medians = []
+        for _ in range(repeats):
+            timings = []
+            for _ in range(iterations):
+                elapsed, context, result = self.call(name, benchmark)
+                timings.append(elapsed)
+            medians.append(statistics.median(timings))
+
+        _, stats = encode_tool_output(name.removeprefix("handle_"), result)
+        return {
+            "ms": round(min(medians) * 1000, 2),
+            "queries": len(context.captured_queries),
+            "tokens": stats["tokens"],
+        }
+
+    def compare(self, result, baseline, options):
+        """Regression messages of a result against its baseline entry."""
+        regressions = []
+        if result["queries"] > baseline["queries"]:
+            regressions.append(f"{baseline['queries']} -> {result['queries']} queries")
+
+        # Outputs vary a little with the dates in them
+        if "tokens" in baseline and result["tokens"] > baseline["tokens"] * 1.1:
+            regressions.append(f"{baseline['tokens']} -> {result['tokens']} tokens")
+
+        slowdown = result["ms"] - baseline["ms"]
+        if slowdown > options["min_time_ms"] and result["ms"] > baseline["ms"] * (
+            1 + options["time_tolerance"]
+        ):
+            regressions.append(f"{baseline['ms']} -> {result['ms']} ms")
+        return regressions
+
+    def handle(self, *args, **options):
+        baseline_path = options["baseline"]
+        baseline = {}
+        if not options["save_baseline"]:
+            if not baseline_path.exists():
+                raise CommandError(
+                    f"No baseline at {baseline_path}, run with --save-baseline first."
+                )
+            baseline = json.loads(baseline_path.read_text())
+
+        results = {}
+        password_hash = make_password(SYNTHETIC_PASSWORD)
+
+        try:
+            with transaction.atomic(), override_settings(
+                CACHES={
+                    "default": {
+                        "BACKEND": "django.core.cache.backends.dummy.DummyCache"
+                    }
+                },
+            ):
+                for index, size in enumerate(options["sizes"]):
+                    organization, _, _ = create_synthetic_tenant(
+                        index, password_hash=password_hash, seed=40, **SIZES[size]
+                    )
+                    results[size] = {
+                        name: self.measure(
+                            name,
+                            benchmark,
+                            options["iterations"],
+                            options["repeats"],
+                        )
+                        for name, benchmark in self.get_benchmarks(organization)
+                    }
+
+                raise RollbackBenchmark
+        except RollbackBenchmark:
+            pass
+
+        regressions = 0
+        for size, size_results in results.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{size}:"))
+            for name, result in size_results.items():
+                line = (
+                    f"{name:<42} {result['ms']:>9.2f} ms {result['queries']:>4} queries"
+                    f" {result['tokens']:>6} tokens"
+                )
+                expected = baseline.get(size, {}).get(name)
+                problems = self.compare(result, expected, options) if expected else []
+
+                if problems:
+                    regressions += 1
+                    self.stdout.write(
+                        self.style.ERROR(f"  {line}  REGRESSION {', '.join(problems)}")
+                    )
+                else:
+                    self.stdout.write(f"  {line}")
+
+        if options["save_baseline"]:
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps(results, indent=2) + "\n")
+            self.stdout.write(self.style.SUCCESS(f"Baseline saved to {baseline_path}."))
+            return
+
+        if regressions:
+            raise CommandError(f"{regressions} handler benchmark(s) regressed.")
+
+        self.stdout.write(self.style.SUCCESS("No handler regressed."))
@@ -0,0 +1,288 @@
+from datetime import date, time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from rest_framework.test import APIClient
+
+from apps.openAI.context import build_context
+from apps.openAI.utils import (
+    get_alternative_time_slots,
+    handle_get_available_promotions,
+    handle_get_available_tables,
+    handle_get_customer_reservations,
+    handle_get_menu_items,
+    handle_get_personalized_recommendations,
+    handle_get_priority_menu_items,
+    handle_get_restaurant_information,
+)
+from apps.restaurant.choices import (
+    CategoryChoices,
+    ClassificationChoices,
+    ReservationStatus,
+)
+from apps.restaurant.models import (
+    Client,
+    Menu,
+    Promotion,
+    Reservation,
+    RestaurantTable,
+    WhatsappBot,
+)
+
+from common.stand_ins import fake_call
+from common.synthetic import SYNTHETIC_PASSWORD, create_synthetic_tenant
+
+User = get_user_model()
+
+# Both sizes stay below PAGE_SIZE so paginated lists grow with the data
+SIZES = {
+    "small": {
+        "clients": 2,
+        "reservations_per_client": 2,
+        "messages_per_client": 2,
+        "menus": 3,
+        "promotions": 1,
+        "tables": 2,
+    },
+    "large": {
+        "clients": 6,
+        "reservations_per_client": 6,
+        "messages_per_client": 6,
+        "menus": 9,
+        "promotions": 4,
+        "tables": 8,
+    },
+}
+
+ENDPOINTS = [
+    "/api/auth/me",
+    "/api/clients",
+    "/api/clients/{client}",
+    "/api/clients/{client}/messages",
+    "/api/clients/export-excel",
+    "/api/reservations",
+    "/api/reservations/{reservation}",
+    "/api/reservations/{reservation}/messages",
+    "/api/promotions",
+    "/api/promotions/{promotion}",
+    "/api/promotions/{promotion}/sent-logs",
+    "/api/promotions/{promotion}/sent-logs/export-excel",
+    "/api/restaurants",
+    "/api/restaurants/{restaurant}",
+    "/api/restaurants/{restaurant}/dashboard",
+    "/api/restaurants/{restaurant}/analytics/top-dishes",
+    "/api/restaurants/{restaurant}/analytics/most-visited",
+    "/api/restaurants/{restaurant}/menu",
+    "/api/restaurants/{restaurant}/menu/{menu}",
+    "/api/restaurants/{restaurant}/tables",
+    "/api/restaurants/{restaurant}/tables/{table}",
+    "/api/restaurants/{restaurant}/tables/available"
+    "?reservation_date={tomorrow}&reservation_time=20:00",
+    "/api/restaurants/{restaurant}/promotions",
+    "/api/restaurants/{restaurant}/message-templates",
+    "/api/restaurants/{restaurant}/documents",
+    "/api/restaurants/{restaurant}/messages/search?q=table",
+    "/api/whatsapp",
+    "/api/whatsapp/{whatsapp_bot}",
+    "/api/whatsapp/{whatsapp_bot}/clients",
+    "/api/whatsapp/{whatsapp_bot}/clients/export-excel",
+]
+
+
+class RollbackFixtures(Exception):
+    """Raised to roll back the synthetic tenants."""
+
+
+class Command(BaseCommand):
+    help = (
+        "Run every API read endpoint and bot tool handler against two synthetic "
+        "tenant sizes and fail if the number of SQL queries grows with the data. "
+        "Runs inside a rolled-back transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verbose-queries",
+            action="store_true",
+            help="Print the SQL of every check whose query count grew.",
+        )
+
+    def get_checks(self, organization, owner):
+        """(name, callable) per endpoint and tool handler of one tenant."""
+        client = Client.objects.filter(organization=organization).first()
+        reservation = Reservation.objects.filter(organization=organization).first()
+        today = date.today()
+        tomorrow = today + timedelta(days=1)
+        placeholders = {
+            "restaurant": organization.uid,
+            "client": client.uid,
+            "reservation": reservation.uid,
+            "promotion": Promotion.objects.filter(organization=organization)
+            .first()
+            .uid,
+            "menu": Menu.objects.filter(organization=organization).first().uid,
+            "table": RestaurantTable.objects.filter(organization=organization)
+            .first()
+            .uid,
+            "whatsapp_bot": WhatsappBot.objects.get(organization=organization).uid,
+            "tomorrow": tomorrow,
+        }
+
+        api_client = APIClient()
+        # Reload, as a request would; fresh instances hold enum defaults
+        api_client.force_authenticate(User.objects.get(pk=owner.pk))
+
+        def get(url):
+            def request():
+                response = api_client.get(url)
+                if response.status_code != 200:
+                    raise CommandError(f"GET {url} returned {response.status_code}")
+
+            return request
+
+        checks = [
+            (endpoint.split("?")[0], get(endpoint.format(**placeholders)))
+            for endpoint in ENDPOINTS
+        ]
+
+        # One menu category, so get_menu_items lists every dish
+        Menu.objects.filter(organization=organization).update(
+            category=CategoryChoices.STARTERS,
+            classification=ClassificationChoices.MEAT,
+        )
+
+        # Give the client bookings tomorrow and book every table at 20:00,
+        # so the handlers also walk their "no table free" paths
+        Reservation.objects.filter(client=client).update(
+            reservation_date=tomorrow, reservation_status=ReservationStatus.PLACED
+        )
+        reservations = Reservation.objects.filter(organization=organization)
+        tables = RestaurantTable.objects.filter(organization=organization)
+        for table, reservation in zip(tables, reservations.order_by("id")):
+            reservations.filter(pk=reservation.pk).update(
+                table=table,
+                reservation_date=tomorrow,
+                reservation_time=time(20, 0),
+                reservation_end_time=None,
+                reservation_status=ReservationStatus.PLACED,
+            )
+
+        # Tenant configuration comes with the bot context, loaded once per turn
+        context = build_context(WhatsappBot.objects.get(organization=organization))
+
+        checks += [
+            (
+                "handle_get_restaurant_information",
+                lambda: handle_get_restaurant_information(
+                    fake_call(query="all_info"), context
+                ),
+            ),
+            (
+                "handle_get_menu_items",
+                lambda: handle_get_menu_items(
+                    fake_call(
+                        category=CategoryChoices.STARTERS,
+                        classification=ClassificationChoices.MEAT,
+                    ),
+                    organization.id,
+                ),
+            ),
+            (
+                "handle_get_available_tables",
+                lambda: handle_get_available_tables(
+                    fake_call(guests=1, date=str(tomorrow), time="20:00"),
+                    organization.id,
+                ),
+            ),
+            (
+                "get_alternative_time_slots",
+                lambda: get_alternative_time_slots(tomorrow, 1, organization.id),
+            ),
+            (
+                "handle_get_customer_reservations",
+                lambda: handle_get_customer_reservations(
+                    fake_call(
+                        reservation_date=str(tomorrow),
+                        reservation_status=ReservationStatus.PLACED,
+                    ),
+                    organization.id,
+                    client,
+                ),
+            ),
+            (
+                "handle_get_personalized_recommendations",
+                lambda: handle_get_personalized_recommendations(
+                    fake_call(limit=5), organization.id, client
+                ),
+            ),
+            (
+                "handle_get_available_promotions",
+                lambda: handle_get_available_promotions(fake_call(), context),
+            ),
+            (
+                "handle_get_priority_menu_items",
+                lambda: handle_get_priority_menu_items(fake_call(), organization.id),
+            ),
+        ]
+
+        return checks
+
+    def count_queries(self, checks):
+        """{name: captured queries} per check, after one warm-up call."""
+        counts = {}
+        for name, check in checks:
+            check()
+            with CaptureQueriesContext(connection) as context:
+                check()
+            counts[name] = context.captured_queries
+        return counts
+
+    def handle(self, *args, **options):
+        results = {}
+        password_hash = make_password(SYNTHETIC_PASSWORD)
+
+        try:
+            with transaction.atomic(), override_settings(
+                ALLOWED_HOSTS=["*"],
+                CACHES={
+                    "default": {
+                        "BACKEND": "django.core.cache.backends.dummy.DummyCache"
+                    }
+                },
+            ):
+                for index, (size, options_) in enumerate(SIZES.items()):
+                    organization, owner, _ = create_synthetic_tenant(
+                        index, password_hash=password_hash, seed=37, **options_
+                    )
+                    results[size] = self.count_queries(
+                        self.get_checks(organization, owner)
+                    )
+
+                raise RollbackFixtures
+        except RollbackFixtures:
+            pass
+
+        failures = []
+        for name, small in results["small"].items():
+            large = results["large"][name]
+            line = f"{name}: {len(small)} -> {len(large)} queries"
+
+            if len(large) > len(small):
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f"FAIL  {line}"))
+                if options["verbose_queries"]:
+                    for query in large:
+                        self.stdout.write(f"      {query['sql']}")
+            else:
+                self.stdout.write(f"OK    {line}")
+
+        if failures:
+            raise CommandError(
+                f"{len(failures)} check(s) issue more queries on larger data."
+            )
+
+        self.stdout.write(self.style.SUCCESS("Query counts do not grow with data."))
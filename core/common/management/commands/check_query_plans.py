@@ -0,0 +1,118 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.restaurant.choices import PromotionSentLogStatus, ReservationStatus
+from apps.restaurant.models import (
+    Client,
+    ClientMessage,
+    PromotionSentLog,
+    Reservation,
+    WhatsappBot,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN the hot query shapes and fail if the planner does not use "
+        "the index declared for them."
+    )
+
+    def get_cases(self):
+        """(description, queryset, expected index name) per hot query."""
+        today = date.today()
+        now = timezone.now()
+        window = (now - timedelta(minutes=5), now)
+
+        return [
+            (
+                "Table availability",
+                Reservation.objects.filter(
+                    table_id=1,
+                    reservation_date=today,
+                    reservation_status=ReservationStatus.PLACED,
+                ),
+                "reservation_table_date_status",
+            ),
+            (
+                "Reservations of a restaurant by day",
+                Reservation.objects.filter(
+                    organization_id=1, reservation_date=today
+                ).order_by(),
+                "reservation_org_date",
+            ),
+            (
+                "Client reservations in a restaurant",
+                Reservation.objects.filter(client_id=1, organization_id=1).order_by(),
+                "reservation_client_org",
+            ),
+            (
+                "Pending booking reminders",
+                Reservation.objects.filter(
+                    reservation_status=ReservationStatus.PLACED,
+                    booking_reminder_sent=False,
+                    booking_reminder_sent_at__range=window,
+                ).order_by(),
+                "reservation_booking_reminder",
+            ),
+            (
+                "Pending auto reminders",
+                Reservation.objects.filter(
+                    reservation_status=ReservationStatus.PLACED,
+                    auto_reminder_sent=False,
+                    auto_reminder_at__range=window,
+                ).order_by(),
+                "reservation_auto_reminder",
+            ),
+            (
+                "Webhook client lookup",
+                Client.objects.filter(organization_id=1, whatsapp_number="+49123"),
+                "client_org_whatsapp",
+            ),
+            (
+                "Client conversation",
+                ClientMessage.objects.filter(client_id=1).order_by("sent_at"),
+                "clientmessage_client_sent",
+            ),
+            (
+                "Webhook bot lookup",
+                WhatsappBot.objects.filter(twilio_number="whatsapp:+49123"),
+                "whatsappbot_twilio_number",
+            ),
+            (
+                "Promotion send stats",
+                PromotionSentLog.objects.filter(
+                    promotion_id=1, status=PromotionSentLogStatus.FAILED
+                ),
+                "promotionlog_promo_status",
+            ),
+        ]
+
+    def handle(self, *args, **options):
+        failures = []
+
+        with transaction.atomic():
+            # Small or empty tables are cheaper to scan; only check usability
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+
+            for description, queryset, index_name in self.get_cases():
+                plan = queryset.explain()
+
+                if index_name in plan:
+                    self.stdout.write(f"OK    {description} ({index_name})")
+                else:
+                    failures.append(description)
+                    self.stdout.write(
+                        self.style.ERROR(f"FAIL  {description} ({index_name})")
+                    )
+                    self.stdout.write(plan)
+
+        if failures:
+            raise CommandError(
+                f"{len(failures)} query shape(s) do not use their index."
+            )
+
+        self.stdout.write(self.style.SUCCESS("All query shapes use their index."))
@@ -0,0 +1,151 @@
+import io
+import multiprocessing
+import time
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+
+from common.synthetic import SYNTHETIC_PASSWORD, create_synthetic_tenant
+
+User = get_user_model()
+
+# Command options used by generate_tenant
+TENANT_OPTIONS = [
+    "clients",
+    "reservations_per_client",
+    "messages_per_client",
+    "years",
+    "tables",
+    "menus",
+    "promotions",
+    "seed",
+    "batch_size",
+    "skip_search_vectors",
+    "skip_rollups",
+]
+
+
+def generate_tenant(index, options, password_hash):
+    """
+    Create one synthetic tenant and its derived data. Runs in a worker process.
+
+    Returns:
+        Tuple of (organization name, {model label: rows}, seconds taken)
+    """
+    started = time.perf_counter()
+
+    with transaction.atomic():
+        organization, _, rows = create_synthetic_tenant(
+            index,
+            clients=options["clients"],
+            reservations_per_client=options["reservations_per_client"],
+            messages_per_client=options["messages_per_client"],
+            days=options["years"] * 365,
+            tables=options["tables"],
+            menus=options["menus"],
+            promotions=options["promotions"],
+            seed=options["seed"],
+            batch_size=options["batch_size"],
+            password_hash=password_hash,
+        )
+
+    if not options["skip_search_vectors"]:
+        call_command(
+            "rebuild_message_search",
+            organization=str(organization.uid),
+            stdout=io.StringIO(),
+        )
+    if not options["skip_rollups"]:
+        call_command(
+            "backfill_analytics_rollups",
+            organization=str(organization.uid),
+            stdout=io.StringIO(),
+        )
+
+    counts = {model._meta.label: count for model, count in rows.items()}
+    return organization.name, counts, time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate synthetic restaurants with clients, reservations, messages and "
+        "promotion logs for load tests and benchmarks. The same seed and sizes "
+        f"produce the same data. Owners log in with '{SYNTHETIC_PASSWORD}'."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--organizations", type=int, default=1)
+        parser.add_argument("--clients", type=int, default=1000)
+        parser.add_argument("--reservations-per-client", type=int, default=20)
+        parser.add_argument("--messages-per-client", type=int, default=10)
+        parser.add_argument(
+            "--years", type=int, default=2, help="Years of reservation history."
+        )
+        parser.add_argument("--tables", type=int, default=20)
+        parser.add_argument("--menus", type=int, default=60)
+        parser.add_argument("--promotions", type=int, default=3)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Processes generating organizations in parallel.",
+        )
+        parser.add_argument(
+            "--skip-search-vectors",
+            action="store_true",
+            help="Do not build the message full-text search vectors.",
+        )
+        parser.add_argument(
+            "--skip-rollups",
+            action="store_true",
+            help="Do not build the analytics rollup tables.",
+        )
+
+    def handle(self, *args, **options):
+        seed = options["seed"]
+        emails = [
+            f"owner-{seed}-{index}@synthetic.chefbot"
+            for index in range(options["organizations"])
+        ]
+        if User.objects.filter(email__in=emails).exists():
+            raise CommandError(
+                f"Synthetic data for seed {seed} already exists, use another --seed."
+            )
+
+        password_hash = make_password(SYNTHETIC_PASSWORD)
+        # Only plain values, the tasks are pickled for the workers
+        tenant_options = {key: options[key] for key in TENANT_OPTIONS}
+        tasks = [
+            (index, tenant_options, password_hash)
+            for index in range(options["organizations"])
+        ]
+        totals = Counter()
+        started = time.perf_counter()
+
+        if options["workers"] > 1:
+            # Forked workers must open their own database connections
+            connections.close_all()
+            with multiprocessing.Pool(options["workers"]) as pool:
+                results = pool.starmap(generate_tenant, tasks)
+        else:
+            results = (generate_tenant(*task) for task in tasks)
+
+        for name, rows, seconds in results:
+            totals.update(rows)
+            self.stdout.write(f"{name}: {sum(rows.values())} row(s) in {seconds:.1f}s")
+
+        elapsed = time.perf_counter() - started
+        for label, count in totals.items():
+            self.stdout.write(f"  {label}: {count}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Generated {sum(totals.values())} row(s) in {elapsed:.1f}s "
+                f"({sum(totals.values()) / elapsed:.0f} rows/s)."
+            )
+        )
@@ -0,0 +1,288 @@
+import math
+import random
+import statistics
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client as TestClient
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from apps.restaurant.models import Client, WhatsappBot
+
+from common.cache import bump_cache_version
+from common.crypto import encrypt_data
+from common.stand_ins import CONVERSATION_SCRIPTS, StandInServer, StandInState
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(percent / 100 * len(ordered)) - 1, 0)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire scripted WhatsApp webhook traffic at the synthetic tenants of "
+        "generate_synthetic_data, with local stand-ins for the OpenAI Assistants "
+        "and Twilio Messages APIs. Reports turn latency percentiles, throughput "
+        "and SQL queries per turn. Messages and bookings are written to the "
+        "synthetic tenants."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--seed", type=int, default=0, help="Seed of the synthetic data."
+        )
+        parser.add_argument(
+            "--conversations",
+            type=int,
+            default=10,
+            help="Customers messaging at the same time.",
+        )
+        parser.add_argument(
+            "--turns", type=int, default=5, help="Messages per conversation."
+        )
+        parser.add_argument(
+            "--burst",
+            type=int,
+            default=1,
+            help="Messages a customer sends at once in each turn.",
+        )
+        parser.add_argument(
+            "--new-customers",
+            type=float,
+            default=0.1,
+            help="Share of conversations from numbers the restaurant has not seen.",
+        )
+        parser.add_argument(
+            "--latency",
+            type=int,
+            default=50,
+            help="Milliseconds added to every OpenAI request.",
+        )
+        parser.add_argument(
+            "--run-latency",
+            type=int,
+            default=800,
+            help="Milliseconds a run stays in progress before each status change.",
+        )
+        parser.add_argument(
+            "--twilio-latency",
+            type=int,
+            default=100,
+            help="Milliseconds added to every Twilio request.",
+        )
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument(
+            "--url",
+            help=(
+                "Webhook URL of a running deployment to load instead of this "
+                "process. It must run with OPENAI_BASE_URL=http://HOST:PORT/v1 "
+                "and TWILIO_API_URL=http://HOST:PORT. SQL queries are not counted."
+            ),
+        )
+
+    def get_conversations(self, bots, options):
+        """(twilio number, customer whatsapp number) per conversation."""
+        rng = random.Random(options["seed"])
+        twilio_numbers = {bot.organization_id: bot.twilio_number for bot in bots}
+        customers = Client.objects.filter(
+            organization_id__in=twilio_numbers
+        ).values_list("organization_id", "whatsapp_number")
+
+        count = options["conversations"]
+        new_count = round(count * options["new_customers"])
+        known_count = count - new_count
+        offset = rng.randrange(max(customers.count() - known_count, 0) + 1)
+
+        conversations = [
+            (twilio_numbers[organization_id], whatsapp_number)
+            for organization_id, whatsapp_number in customers.order_by("id")[
+                offset : offset + known_count
+            ]
+        ]
+        conversations += [
+            (
+                rng.choice(list(twilio_numbers.values())),
+                f"+4916{options['seed']:03d}{rng.randrange(10**7):07d}",
+            )
+            for _ in range(count - len(conversations))
+        ]
+        return conversations
+
+    def send(self, client, data, options):
+        """Post one message to the webhook, returning its stats dict."""
+        started = time.perf_counter()
+        if options["url"]:
+            result = requests.post(options["url"], data=data).json()
+            queries = None
+        else:
+            with CaptureQueriesContext(connection) as context:
+                result = client.post(reverse("whatsapp-bot"), data).json()
+            queries = len(context.captured_queries)
+
+        return {
+            "message": data["Body"],
+            "seconds": time.perf_counter() - started,
+            "queries": queries,
+            "ok": "reply" in result or result.get("coalesced", False),
+            "coalesced": result.get("coalesced", False),
+        }
+
+    def send_at_once(self, data, options):
+        """send() from a thread of its own, as one message of a burst."""
+        try:
+            return self.send(TestClient(), data, options)
+        finally:
+            connection.close()
+
+    def converse(self, index, twilio_number, whatsapp_number, options):
+        """Send one conversation's turns, returning a stats dict per message."""
+        rng = random.Random(f"{options['seed']}:{index}")
+        messages = list(CONVERSATION_SCRIPTS)
+        client = TestClient()
+        turns = []
+
+        try:
+            for _ in range(options["turns"]):
+                burst = [
+                    {
+                        "From": f"whatsapp:{whatsapp_number}",
+                        "To": twilio_number,
+                        "Body": rng.choice(messages),
+                        "ProfileName": "Load Test",
+                    }
+                    for _ in range(options["burst"])
+                ]
+
+                if len(burst) == 1:
+                    turns.append(self.send(client, burst[0], options))
+                    continue
+
+                # Each message of a burst is its own webhook request
+                with ThreadPoolExecutor(len(burst)) as executor:
+                    turns.extend(
+                        executor.map(
+                            lambda data: self.send_at_once(data, options), burst
+                        )
+                    )
+        finally:
+            connection.close()
+
+        return turns
+
+    def handle(self, *args, **options):
+        bots = list(
+            WhatsappBot.objects.filter(
+                organization__name__startswith=f"Synthetic Restaurant {options['seed']}-"
+            ).select_related("organization")
+        )
+        if not bots:
+            raise CommandError(
+                f"No synthetic tenants for seed {options['seed']}, "
+                "run generate_synthetic_data first."
+            )
+
+        # The stand-ins accept any credentials, but the webhook decrypts them
+        WhatsappBot.objects.filter(pk__in=[bot.pk for bot in bots]).update(
+            openai_key=encrypt_data("sk-stand-in", settings.CRYPTO_PASSWORD),
+            assistant_id=encrypt_data("asst_stand_in", settings.CRYPTO_PASSWORD),
+            twilio_sid=encrypt_data("ACstandin", settings.CRYPTO_PASSWORD),
+            twilio_auth_token=encrypt_data("stand-in", settings.CRYPTO_PASSWORD),
+        )
+        # update() sends no signals, drop the cached bot contexts by hand
+        for bot in bots:
+            bump_cache_version("bot_context", bot.organization.uid)
+
+        conversations = self.get_conversations(bots, options)
+        state = StandInState(run_latency=options["run_latency"] / 1000)
+        server = StandInServer(
+            state,
+            host=options["host"],
+            port=options["port"],
+            latency=options["latency"] / 1000,
+            twilio_latency=options["twilio_latency"] / 1000,
+        )
+
+        with server, override_settings(
+            ALLOWED_HOSTS=["*"],
+            OPENAI_BASE_URL=server.openai_url,
+            TWILIO_API_URL=server.twilio_url,
+        ):
+            started = time.perf_counter()
+            with ThreadPoolExecutor(len(conversations)) as executor:
+                results = executor.map(
+                    lambda args: self.converse(*args, options),
+                    [(index, *pair) for index, pair in enumerate(conversations)],
+                )
+                turns = [turn for conversation in results for turn in conversation]
+            elapsed = time.perf_counter() - started
+
+        by_message = defaultdict(list)
+        for turn in turns:
+            by_message[turn["message"]].append(turn)
+
+        self.stdout.write(f"{'Message':<46} {'turns':>5} {'p50 ms':>8} {'queries':>8}")
+        for message, message_turns in by_message.items():
+            seconds = [turn["seconds"] for turn in message_turns]
+            queries = [turn["queries"] for turn in message_turns]
+            mean_queries = "-" if options["url"] else f"{statistics.mean(queries):.1f}"
+            self.stdout.write(
+                f"{message:<46} {len(message_turns):>5} "
+                f"{percentile(seconds, 50) * 1000:>8.0f} {mean_queries:>8}"
+            )
+
+        seconds = [turn["seconds"] for turn in turns]
+        failed = sum(not turn["ok"] for turn in turns)
+        openai_requests = sum(
+            count
+            for request, count in state.requests.items()
+            if request.split(" ")[1].startswith("/v1/")
+        )
+
+        self.stdout.write("")
+        self.stdout.write(
+            f"Turns: {len(turns)} in {elapsed:.1f}s "
+            f"({len(turns) / elapsed:.2f} turns/s, "
+            f"{len(conversations)} concurrent conversations)"
+        )
+        self.stdout.write(
+            "Turn latency: "
+            + ", ".join(
+                f"p{percent} {percentile(seconds, percent) * 1000:.0f} ms"
+                for percent in (50, 95, 99)
+            )
+        )
+        if not options["url"]:
+            queries = [turn["queries"] for turn in turns]
+            self.stdout.write(
+                f"SQL queries per turn: mean {statistics.mean(queries):.1f}, "
+                f"p95 {percentile(queries, 95)}, max {max(queries)}"
+            )
+        self.stdout.write(
+            f"OpenAI requests per turn: {openai_requests / len(turns):.1f}, "
+            f"Twilio messages sent: {len(state.sent_messages)}"
+        )
+        runs = sum(
+            count
+            for request, count in state.requests.items()
+            if request == "POST /v1/threads/{thread_id}/runs"
+        )
+        self.stdout.write(
+            f"Assistant runs: {runs}, "
+            f"messages answered with a later one: "
+            f"{sum(turn['coalesced'] for turn in turns)}"
+        )
+
+        if failed:
+            raise CommandError(f"{failed} turn(s) got the fallback reply.")
+
+        self.stdout.write(self.style.SUCCESS("All turns got an assistant reply."))
@@ -0,0 +1,38 @@
+from django.contrib.postgres.search import SearchVector
+from django.core.management.base import BaseCommand
+from django.db.models import Value
+
+from apps.organization.models import Organization
+from apps.organization.utils import get_search_config
+from apps.restaurant.models import Client, ClientMessage
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the full-text search vectors of client messages, e.g. for "
+        "existing messages or after an organization changes its language."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--organization", help="UID of a single organization to rebuild"
+        )
+
+    def handle(self, *args, **options):
+        organizations = Organization.objects.all()
+        if options["organization"]:
+            organizations = organizations.filter(uid=options["organization"])
+
+        for organization in organizations:
+            config = get_search_config(organization.organization_language)
+            updated = ClientMessage.objects.filter(
+                client_id__in=Client.objects.filter(
+                    organization=organization
+                ).values("id")
+            ).update(search_vector=SearchVector("message", config=Value(config)))
+
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{organization.name}: rebuilt {updated} message(s) ({config})"
+                )
+            )
@@ -0,0 +1,585 @@
+import contextvars
+import functools
+import json
+import logging
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+from wsgiref.simple_server import WSGIRequestHandler, make_server
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+REGISTRY = []
+
+
+def metrics_enabled() -> bool:
+    return settings.METRICS_ENABLED
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = [*zip(labelnames, values), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Metric:
+    """
+    Base for process-local metrics. Every thread writes to its own shard,
+    so recording takes no lock; collect() merges the shards. Shards of
+    finished threads are folded into one retired total, since the ASGI
+    server runs sync code on a new thread per request.
+
+    Args:
+        name: Prometheus metric name
+        documentation: HELP text
+        labelnames: Names of the labels passed to the recording methods
+    """
+
+    kind = ""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        # [(thread, shard)] of threads that recorded a value
+        self._shards = []
+        self._retired = {}
+        self._lock = threading.Lock()
+        self._prune_at = 32
+        REGISTRY.append(self)
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append((threading.current_thread(), shard))
+                if len(self._shards) > self._prune_at:
+                    self._prune()
+                    self._prune_at = max(32, 2 * len(self._shards))
+        return shard
+
+    def _prune(self):
+        """Fold the shards of finished threads into the retired total."""
+        alive = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                alive.append((thread, shard))
+            else:
+                for key, value in shard.items():
+                    self.merge(self._retired, key, value)
+        self._shards = alive
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def collect(self):
+        """{label values: value} merged over every thread of this process."""
+        totals = {}
+        with self._lock:
+            self._prune()
+            shards = [shard for _, shard in self._shards]
+            for key, value in self._retired.items():
+                self.merge(totals, key, value)
+        for shard in shards:
+            for key, value in list(shard.items()):
+                self.merge(totals, key, value)
+        return totals
+
+    def render(self, values):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        return lines + self._samples(values)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        shard = self._shard()
+        key = self._key(labels)
+        shard[key] = shard.get(key, 0) + amount
+
+    def merge(self, totals, key, value):
+        totals[key] = totals.get(key, 0) + value
+
+    def _samples(self, values):
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {value}"
+            for key, value in sorted(values.items())
+        ]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        shard = self._shard()
+        key = self._key(labels)
+        # One count per bucket plus +Inf, followed by the sum
+        counts = shard.get(key)
+        if counts is None:
+            counts = shard[key] = [0] * (len(self.buckets) + 2)
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def merge(self, totals, key, value):
+        merged = totals.setdefault(key, [0] * len(value))
+        for index, count in enumerate(value):
+            merged[index] += count
+
+    def _samples(self, values):
+        lines = []
+        for key, counts in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, [("le", bound)])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {counts[-1]}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Gauge(Metric):
+    """
+    Value read when the metrics are rendered.
+
+    Args:
+        callback: Returns {label values tuple: value}
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), callback=None):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def collect(self):
+        try:
+            return self.callback()
+        except Exception as e:
+            logger.warning(f"Failed to read gauge {self.name}: {str(e)}")
+            return {}
+
+    def _samples(self, values):
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {value}"
+            for key, value in sorted(values.items())
+        ]
+
+
+_last_snapshot = 0.0
+
+
+def write_snapshot(force=False):
+    """
+    Write this process' counters and histograms to METRICS_DIR, at most
+    once per METRICS_SNAPSHOT_INTERVAL, so other processes can serve them.
+    """
+    global _last_snapshot
+
+    if not settings.METRICS_DIR:
+        return
+    now = time.monotonic()
+    if not force and now - _last_snapshot < settings.METRICS_SNAPSHOT_INTERVAL:
+        return
+    _last_snapshot = now
+
+    snapshot = {
+        metric.name: [[list(key), value] for key, value in metric.collect().items()]
+        for metric in REGISTRY
+        if not isinstance(metric, Gauge)
+    }
+    directory = Path(settings.METRICS_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{os.getpid()}.json"
+    temporary = directory / f"{os.getpid()}.{threading.get_ident()}.tmp"
+    temporary.write_text(json.dumps(snapshot))
+    # Readers see either the old or the new file, never half of one
+    os.replace(temporary, path)
+
+
+def _collect_all():
+    """{metric name: values} over all processes sharing METRICS_DIR."""
+    if not settings.METRICS_DIR:
+        return {metric.name: metric.collect() for metric in REGISTRY}
+
+    write_snapshot(force=True)
+    metrics = {metric.name: metric for metric in REGISTRY}
+    collected = {
+        metric.name: metric.collect() if isinstance(metric, Gauge) else {}
+        for metric in REGISTRY
+    }
+    for path in Path(settings.METRICS_DIR).glob("*.json"):
+        try:
+            snapshot = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+        for name, samples in snapshot.items():
+            if name not in metrics:
+                continue
+            for key, value in samples:
+                metrics[name].merge(collected[name], tuple(key), value)
+    return collected
+
+
+def render_metrics() -> str:
+    """All registered metrics in the Prometheus text exposition format."""
+    lines = []
+    collected = _collect_all()
+    for metric in REGISTRY:
+        lines.extend(metric.render(collected[metric.name]))
+    return "\n".join(lines) + "\n"
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def _metrics_app(environ, start_response):
+    start_response("200 OK", [("Content-Type", "text/plain; version=0.0.4")])
+    return [render_metrics().encode()]
+
+
+def start_metrics_server(port, host="0.0.0.0"):
+    """Serve render_metrics() over HTTP from a daemon thread."""
+    server = make_server(host, port, _metrics_app, handler_class=_QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info(f"Serving metrics on {host}:{port}")
+    return server
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class _Timer:
+    def __init__(self, histogram, labels, errors=None):
+        self.histogram = histogram
+        self.labels = labels
+        self.errors = errors
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+        if exc_type is not None and self.errors is not None:
+            self.errors.inc(**self.labels)
+        return False
+
+
+def timer(histogram, errors=None, **labels):
+    """
+    Observe the duration of a block in a histogram, and count it in errors
+    when it raises.
+
+    Usage:
+        with timer(TWILIO_REQUEST_SECONDS, TWILIO_ERRORS, kind="message"):
+            requests.post(...)
+    """
+    if not metrics_enabled():
+        return NOOP_SPAN
+    return _Timer(histogram, labels, errors)
+
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "chefbot_http_request_seconds",
+    "Django request latency by route.",
+    ["method", "route", "status"],
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "chefbot_db_queries_per_request",
+    "SQL queries issued by one request.",
+    ["route"],
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+DB_SECONDS_PER_REQUEST = Histogram(
+    "chefbot_db_seconds_per_request",
+    "Time one request spent in SQL queries.",
+    ["route"],
+)
+OPENAI_REQUEST_SECONDS = Histogram(
+    "chefbot_openai_request_seconds",
+    "OpenAI API latency until the response headers arrive.",
+    ["endpoint", "status"],
+)
+OPENAI_TOKENS = Counter(
+    "chefbot_openai_tokens_total",
+    "Tokens used by finished assistant runs.",
+    ["kind"],
+)
+TWILIO_REQUEST_SECONDS = Histogram(
+    "chefbot_twilio_request_seconds",
+    "Twilio Messages API latency.",
+    ["kind"],
+)
+TWILIO_ERRORS = Counter(
+    "chefbot_twilio_errors_total",
+    "Twilio Messages API requests that failed.",
+    ["kind"],
+)
+CELERY_TASK_SECONDS = Histogram(
+    "chefbot_celery_task_seconds",
+    "Celery task runtime.",
+    ["task", "state"],
+    buckets=(*DEFAULT_BUCKETS, 60.0, 120.0, 300.0),
+)
+# Scheduled tasks whose backlog in the broker queue is exported
+QUEUE_DEPTH_TASKS = (
+    "common.tasks.send_scheduled_promotions",
+    "common.tasks.reservation_reminder",
+)
+QUEUE_SCAN_LIMIT = 1000
+
+
+def _celery_queue_depth():
+    """Waiting messages per scheduled task in the default Redis queue."""
+    import redis
+
+    client = redis.Redis.from_url(settings.CELERY_BROKER_URL)
+    depth = dict.fromkeys(QUEUE_DEPTH_TASKS, 0)
+    for message in client.lrange("celery", 0, QUEUE_SCAN_LIMIT - 1):
+        task = json.loads(message).get("headers", {}).get("task")
+        if task in depth:
+            depth[task] += 1
+    return {(task,): count for task, count in depth.items()}
+
+
+CELERY_QUEUE_DEPTH = Gauge(
+    "chefbot_celery_queue_depth",
+    "Messages of a scheduled task waiting in the Celery queue.",
+    ["task"],
+    callback=_celery_queue_depth,
+)
+CHANNEL_PUBLISH_SECONDS = Histogram(
+    "chefbot_channel_publish_seconds",
+    "Channel layer group_send latency of realtime updates.",
+)
+
+# OpenAI object ids in request paths, collapsed to keep the label set small
+OPENAI_ID_PATTERN = re.compile(r"/(?:asst|thread|run|msg|call|step|file|vs)_[^/]+")
+
+
+def _openai_request_started(request):
+    request.extensions["metrics_started"] = time.perf_counter()
+
+
+def _openai_response_received(response):
+    started = response.request.extensions.get("metrics_started")
+    if started is None:
+        return
+    path = OPENAI_ID_PATTERN.sub("/{id}", response.request.url.path)
+    OPENAI_REQUEST_SECONDS.observe(
+        time.perf_counter() - started,
+        endpoint=f"{response.request.method} {path}",
+        status=f"{response.status_code // 100}xx",
+    )
+
+
+def openai_event_hooks():
+    """httpx event hooks timing every OpenAI API request, none when disabled."""
+    if not metrics_enabled():
+        return {}
+    return {
+        "request": [_openai_request_started],
+        "response": [_openai_response_received],
+    }
+
+
+def get_cached_tokens(usage) -> int:
+    """Cached prompt tokens of a run's usage, when the API reports them."""
+    details = getattr(usage, "prompt_token_details", None)
+    if isinstance(details, dict):
+        return details.get("cached_tokens") or 0
+    return getattr(details, "cached_tokens", None) or 0
+
+
+def record_openai_usage(usage):
+    """Count the tokens of a finished run's usage, if it reports any."""
+    if not metrics_enabled() or usage is None:
+        return
+    OPENAI_TOKENS.inc(usage.prompt_tokens, kind="prompt")
+    OPENAI_TOKENS.inc(usage.completion_tokens, kind="completion")
+    OPENAI_TOKENS.inc(get_cached_tokens(usage), kind="cached")
+
+
+WHATSAPP_STAGE_SECONDS = Histogram(
+    "chefbot_whatsapp_stage_seconds",
+    "Time spent in each stage of a WhatsApp webhook turn.",
+    ["stage"],
+)
+WHATSAPP_TOOL_SECONDS = Histogram(
+    "chefbot_whatsapp_tool_seconds",
+    "Time spent in each assistant tool handler.",
+    ["tool"],
+)
+WHATSAPP_RUN_ITERATIONS = Histogram(
+    "chefbot_whatsapp_run_iterations",
+    "Status polls needed per assistant run.",
+    buckets=(1, 2, 3, 5, 8, 13, 21, 30),
+)
+WHATSAPP_TOOL_OUTPUT_TOKENS = Histogram(
+    "chefbot_whatsapp_tool_output_tokens",
+    "Estimated tokens of each encoded tool output.",
+    ["tool"],
+    buckets=(25, 50, 100, 250, 500, 1000, 2000, 4000, 8000),
+)
+WHATSAPP_TOOL_OUTPUT_TRUNCATIONS = Counter(
+    "chefbot_whatsapp_tool_output_truncations_total",
+    "Tool outputs whose list was cut short to fit the token budget.",
+    ["tool"],
+)
+WHATSAPP_MESSAGES_PER_RUN = Histogram(
+    "chefbot_whatsapp_messages_per_run",
+    "Inbound messages of a burst answered by one assistant run.",
+    buckets=(1, 2, 3, 4, 6, 10),
+)
+
+_current_turn = contextvars.ContextVar("whatsapp_turn", default=None)
+
+
+class _Span:
+    def __init__(self, histogram, label, name, section):
+        self.histogram = histogram
+        self.label = label
+        self.name = name
+        self.section = section
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        seconds = time.perf_counter() - self.started
+        self.histogram.observe(seconds, **{self.label: self.name})
+
+        turn = _current_turn.get()
+        if turn is not None:
+            timings = turn[self.section]
+            timings[self.name] = round(timings.get(self.name, 0) + seconds, 4)
+        return False
+
+
+def stage_span(stage):
+    """
+    Time a stage of the current WhatsApp turn.
+
+    Usage:
+        with stage_span("twilio_send"):
+            send_whatsapp_message(...)
+    """
+    if not metrics_enabled():
+        return NOOP_SPAN
+    return _Span(WHATSAPP_STAGE_SECONDS, "stage", stage, "stages")
+
+
+def tool_span(tool):
+    """Time one assistant tool handler call of the current WhatsApp turn."""
+    if not metrics_enabled():
+        return NOOP_SPAN
+    return _Span(WHATSAPP_TOOL_SECONDS, "tool", tool, "tools")
+
+
+def record_tool_output(tool, tokens, truncated):
+    if not metrics_enabled():
+        return
+    WHATSAPP_TOOL_OUTPUT_TOKENS.observe(tokens, tool=tool)
+    if truncated:
+        WHATSAPP_TOOL_OUTPUT_TRUNCATIONS.inc(tool=tool)
+
+
+def record_run_iterations(iterations):
+    if not metrics_enabled():
+        return
+    WHATSAPP_RUN_ITERATIONS.observe(iterations)
+
+    turn = _current_turn.get()
+    if turn is not None:
+        turn["iterations"] += iterations
+
+
+def record_messages_per_run(messages):
+    if not metrics_enabled():
+        return
+    WHATSAPP_MESSAGES_PER_RUN.observe(messages)
+    annotate_turn(messages=messages)
+
+
+def annotate_turn(**fields):
+    """Attach fields such as organization and thread to the current turn."""
+    turn = _current_turn.get()
+    if turn is not None:
+        turn.update(fields)
+
+
+def instrument_turn(view):
+    """
+    Time a WhatsApp webhook turn and log one structured record of its
+    stages, tool calls and run iterations when METRICS_ENABLED is set.
+    """
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not metrics_enabled():
+            return view(request, *args, **kwargs)
+
+        turn = {
+            "organization": None,
+            "thread": None,
+            "stages": {},
+            "tools": {},
+            "iterations": 0,
+        }
+        token = _current_turn.set(turn)
+        try:
+            with _Span(WHATSAPP_STAGE_SECONDS, "stage", "total", "stages"):
+                return view(request, *args, **kwargs)
+        finally:
+            _current_turn.reset(token)
+            logger.info(json.dumps({"event": "whatsapp_turn", **turn}))
+
+    return wrapper
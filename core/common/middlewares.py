@@ -1,9 +1,19 @@
 import logging
+import time
 
+from django.db import connection
 from django.utils.translation import activate
 from django.utils.deprecation import MiddlewareMixin
-from rest_framework_simplejwt.authentication import JWTAuthentication
-from rest_framework.exceptions import AuthenticationFailed
+
+from .authentication import authenticate_request
+from .metrics import (
+    DB_QUERIES_PER_REQUEST,
+    DB_SECONDS_PER_REQUEST,
+    HTTP_REQUEST_SECONDS,
+    metrics_enabled,
+    write_snapshot,
+)
+from .profiling import QueryStats, start_sql_profile
 
 logger = logging.getLogger(__name__)
 
@@ -53,20 +63,8 @@ class LanguageMiddleware(MiddlewareMixin):
     """
 
     def process_request(self, request):
-        user = None
-
-        # Try to authenticate user from JWT token
-        auth_header = request.META.get("HTTP_AUTHORIZATION", "")
-
-        if auth_header.startswith("Bearer "):
-            try:
-                jwt_auth = JWTAuthentication()
-                token = auth_header.split(" ")[1]
-                validated_token = jwt_auth.get_validated_token(token)
-                user = jwt_auth.get_user(validated_token)
-            except (AuthenticationFailed, IndexError, AttributeError, Exception):
-                # If JWT authentication fails, continue without user
-                pass
+        # Shared with DRF's authenticator, so the token is validated only once
+        user = authenticate_request(request)
 
         # If we have a user, use their language preference
         if user and user.is_authenticated:
@@ -75,13 +73,73 @@ class LanguageMiddleware(MiddlewareMixin):
                 "GERMAN": "de",
             }
             language_code = language_map.get(user.language, "en")
-            activate(language_code)
         else:
             # Fallback to Accept-Language header for unauthenticated requests
             accept_language = request.META.get("HTTP_ACCEPT_LANGUAGE", "en")
             language_code = accept_language.split(",")[0].split("-")[0][:2]
 
-            if language_code in ["en", "de"]:
-                activate(language_code)
-            else:
-                activate("en")
+            if language_code not in ["en", "de"]:
+                language_code = "en"
+
+        activate(language_code)
+        request.LANGUAGE_CODE = language_code
+
+
+class MetricsMiddleware:
+    """
+    Record request latency by route and the SQL queries of each request
+    when METRICS_ENABLED is set
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not metrics_enabled():
+            return self.get_response(request)
+
+        queries = QueryStats()
+        started = time.perf_counter()
+        with connection.execute_wrapper(queries):
+            response = self.get_response(request)
+        seconds = time.perf_counter() - started
+
+        # The URL pattern, not the path, keeps ids out of the labels
+        match = request.resolver_match
+        route = match.route if match else "unmatched"
+
+        HTTP_REQUEST_SECONDS.observe(
+            seconds,
+            method=request.method,
+            route=route,
+            status=f"{response.status_code // 100}xx",
+        )
+        DB_QUERIES_PER_REQUEST.observe(queries.count, route=route)
+        DB_SECONDS_PER_REQUEST.observe(queries.seconds, route=route)
+        write_snapshot()
+
+        return response
+
+
+class SQLProfilingMiddleware:
+    """
+    Count and time the SQL of each request against its route budget and
+    sample the slowest statements when SQL_PROFILING_ENABLED is set
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profile, stop = start_sql_profile("request", request.path)
+        if profile is None:
+            return self.get_response(request)
+
+        try:
+            response = self.get_response(request)
+        finally:
+            match = request.resolver_match
+            profile.name = match.route if match else "unmatched"
+            stop()
+
+        return response
@@ -1,4 +1,6 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.db import models
+from django.db.models.functions import Cast, Upper
 
 from uuid import uuid4
 
@@ -10,3 +12,14 @@ class BaseModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+def trigram_index(field_name: str, name: str) -> GinIndex:
+    """
+    GIN trigram index on UPPER(field::text), the expression Django's icontains
+    compiles to on Postgres, so SearchFilter lookups can use it. Requires pg_trgm.
+    """
+    return GinIndex(
+        OpClass(Upper(Cast(field_name, models.TextField())), name="gin_trgm_ops"),
+        name=name,
+    )
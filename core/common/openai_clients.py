@@ -0,0 +1,80 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+import httpx
+from openai import DefaultHttpxClient, OpenAI
+
+from django.conf import settings
+
+from .metrics import openai_event_hooks
+
+logger = logging.getLogger(__name__)
+
+# {hash of API key and base URL: client}, least recently used first
+_clients = OrderedDict()
+_http_client = None
+_lock = threading.Lock()
+
+
+def get_timeout() -> httpx.Timeout:
+    return httpx.Timeout(
+        settings.OPENAI_TIMEOUT, connect=settings.OPENAI_CONNECT_TIMEOUT
+    )
+
+
+def get_http_client() -> httpx.Client:
+    """
+    The keep-alive connection pool shared by every OpenAI client of this
+    process. Created on first use, so forked workers each get their own.
+    """
+    global _http_client
+
+    if _http_client is None:
+        _http_client = DefaultHttpxClient(
+            timeout=get_timeout(),
+            limits=httpx.Limits(
+                max_connections=settings.OPENAI_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.OPENAI_KEEPALIVE_EXPIRY,
+            ),
+            event_hooks=openai_event_hooks(),
+        )
+    return _http_client
+
+
+def get_openai_client(api_key: str) -> OpenAI:
+    """
+    OpenAI client for an API key, reused across requests of this process.
+
+    Args:
+        api_key: Decrypted OpenAI API key
+
+    Returns:
+        A client on the shared connection pool
+    """
+    key = hashlib.sha256(f"{settings.OPENAI_BASE_URL}:{api_key}".encode()).hexdigest()
+
+    with _lock:
+        client = _clients.get(key)
+        if client is not None:
+            _clients.move_to_end(key)
+            return client
+
+        client = OpenAI(
+            api_key=api_key,
+            base_url=settings.OPENAI_BASE_URL,
+            # The SDK sends its own timeout with every request
+            timeout=get_timeout(),
+            max_retries=settings.OPENAI_MAX_RETRIES,
+            http_client=get_http_client(),
+        )
+        _clients[key] = client
+
+        # Evicted clients do not own the pool, so there is nothing to close
+        while len(_clients) > settings.OPENAI_CLIENT_CACHE_SIZE:
+            _clients.popitem(last=False)
+
+    logger.debug(f"Created OpenAI client {key[:8]}")
+    return client
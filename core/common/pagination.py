@@ -0,0 +1,13 @@
+from rest_framework.pagination import CursorPagination
+
+
+class SentLogCursorPagination(CursorPagination):
+    """
+    Cursor pagination for append-only logs ordered by send time.
+    Stable and constant-cost however deep the client pages.
+    """
+
+    ordering = "-sent_at"
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 500
@@ -0,0 +1,230 @@
+import heapq
+import logging
+import random
+import re
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+ROUTES_CACHE_KEY = "sqlprofile:routes"
+STATEMENTS_CACHE_KEY = "sqlprofile:statements"
+# Kept for a week, the report is reset by hand or by expiry
+REPORT_TIMEOUT = 7 * 24 * 3600
+
+FINGERPRINT_RULES = [
+    (re.compile(r"'(?:[^']|'')*'"), "?"),
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),
+    (re.compile(r"%s"), "?"),
+    # Lists of any length share one fingerprint
+    (re.compile(r"\((?:\s*\?\s*,)*\s*\?\s*\)"), "(...)"),
+    (re.compile(r"(?:\(\.\.\.\)\s*,\s*)+\(\.\.\.\)"), "(...)"),
+    (re.compile(r"\s+"), " "),
+]
+
+
+def fingerprint(sql: str) -> str:
+    """SQL with literals and placeholder lists collapsed, for grouping."""
+    for pattern, replacement in FINGERPRINT_RULES:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+class QueryStats:
+    """execute_wrapper counting queries and their time."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+class SQLProfile(QueryStats):
+    """
+    QueryStats that also keeps the slowest statements when sampled.
+
+    Args:
+        kind: "request", "task" or "tool"
+        name: Route pattern, task name or tool handler name
+        sampled: Whether to keep statements for the admin report
+    """
+
+    def __init__(self, kind, name, sampled=False):
+        super().__init__()
+        self.kind = kind
+        self.name = name
+        self.sampled = sampled
+        self.slowest = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            seconds = time.perf_counter() - started
+            self.count += 1
+            self.seconds += seconds
+            if self.sampled:
+                entry = (seconds, self.count, sql)
+                if len(self.slowest) < settings.SQL_PROFILING_TOP_STATEMENTS:
+                    heapq.heappush(self.slowest, entry)
+                else:
+                    heapq.heappushpop(self.slowest, entry)
+
+    def get_budget(self):
+        return settings.SQL_BUDGETS.get(self.name, settings.SQL_DEFAULT_BUDGET)
+
+    def finish(self):
+        """Log a budget overrun and add sampled units to the report."""
+        budget = self.get_budget()
+        milliseconds = self.seconds * 1000
+        over_budget = self.count > budget["queries"] or milliseconds > budget["ms"]
+        if over_budget:
+            logger.warning(
+                f"SQL budget exceeded by {self.kind} {self.name}: "
+                f"{self.count} queries in {milliseconds:.0f} ms "
+                f"(budget {budget['queries']} queries, {budget['ms']} ms)"
+            )
+
+        if self.sampled:
+            record_profile(self, over_budget)
+
+
+def _sample():
+    return random.random() < settings.SQL_PROFILING_SAMPLE_RATE
+
+
+def start_sql_profile(kind, name):
+    """
+    Start profiling the queries of the current thread's connection.
+
+    Returns:
+        (profile, stop) where stop() removes the wrapper and finishes the
+        profile, or (None, None) when SQL profiling is disabled
+    """
+    if not settings.SQL_PROFILING_ENABLED:
+        return None, None
+
+    profile = SQLProfile(kind, name, sampled=_sample())
+    wrapper = connection.execute_wrapper(profile)
+    wrapper.__enter__()
+
+    def stop():
+        wrapper.__exit__(None, None, None)
+        profile.finish()
+
+    return profile, stop
+
+
+@contextmanager
+def profile_sql(kind, name):
+    """
+    Profile the queries of a block.
+
+    Usage:
+        with profile_sql("tool", "get_menu_items"):
+            handler()
+    """
+    profile, stop = start_sql_profile(kind, name)
+    try:
+        yield profile
+    finally:
+        if stop:
+            stop()
+
+
+def record_profile(profile, over_budget):
+    """
+    Merge a sampled profile into the report kept in the cache. Concurrent
+    writers can drop each other's samples, which is fine for a report.
+    """
+    milliseconds = profile.seconds * 1000
+
+    routes = cache.get(ROUTES_CACHE_KEY) or {}
+    key = f"{profile.kind}:{profile.name}"
+    route = routes.setdefault(
+        key,
+        {
+            "kind": profile.kind,
+            "name": profile.name,
+            "samples": 0,
+            "queries": 0,
+            "ms": 0.0,
+            "max_queries": 0,
+            "max_ms": 0.0,
+            "over_budget": 0,
+        },
+    )
+    route["samples"] += 1
+    route["queries"] += profile.count
+    route["ms"] += milliseconds
+    route["max_queries"] = max(route["max_queries"], profile.count)
+    route["max_ms"] = max(route["max_ms"], milliseconds)
+    route["over_budget"] += over_budget
+    cache.set(ROUTES_CACHE_KEY, routes, REPORT_TIMEOUT)
+
+    if not profile.slowest:
+        return
+
+    statements = cache.get(STATEMENTS_CACHE_KEY) or {}
+    for seconds, _, sql in profile.slowest:
+        statement = statements.setdefault(
+            fingerprint(sql),
+            {"example": sql, "count": 0, "ms": 0.0, "max_ms": 0.0, "seen_in": []},
+        )
+        statement["count"] += 1
+        statement["ms"] += seconds * 1000
+        if seconds * 1000 > statement["max_ms"]:
+            statement["max_ms"] = seconds * 1000
+            statement["example"] = sql
+        if key not in statement["seen_in"] and len(statement["seen_in"]) < 5:
+            statement["seen_in"].append(key)
+
+    # Keep the statements with the most total time
+    if len(statements) > settings.SQL_PROFILING_MAX_STATEMENTS:
+        statements = dict(
+            heapq.nlargest(
+                settings.SQL_PROFILING_MAX_STATEMENTS,
+                statements.items(),
+                key=lambda item: item[1]["ms"],
+            )
+        )
+    cache.set(STATEMENTS_CACHE_KEY, statements, REPORT_TIMEOUT)
+
+
+def get_profile_report(limit=20):
+    """Top routes, tasks and tools by query count, and top statements by time."""
+    routes = list((cache.get(ROUTES_CACHE_KEY) or {}).values())
+    for route in routes:
+        route["avg_queries"] = round(route["queries"] / route["samples"], 1)
+        route["avg_ms"] = round(route["ms"] / route["samples"], 1)
+        route["budget"] = settings.SQL_BUDGETS.get(
+            route["name"], settings.SQL_DEFAULT_BUDGET
+        )
+
+    statements = [
+        {"fingerprint": key, **value}
+        for key, value in (cache.get(STATEMENTS_CACHE_KEY) or {}).items()
+    ]
+
+    return {
+        "routes": sorted(routes, key=lambda route: -route["avg_queries"])[:limit],
+        "statements": sorted(statements, key=lambda statement: -statement["ms"])[
+            :limit
+        ],
+    }
+
+
+def reset_profile_report():
+    cache.delete_many([ROUTES_CACHE_KEY, STATEMENTS_CACHE_KEY])
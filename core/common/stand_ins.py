@@ -0,0 +1,398 @@
+import asyncio
+import json
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+from aiohttp import web
+
+# Inbound message -> tool call rounds the assistant asks for before replying.
+# Each round is one requires_action status with its (name, arguments) calls;
+# "{tomorrow}" in an argument is replaced with tomorrow's date.
+CONVERSATION_SCRIPTS = {
+    "Hi, when are you open?": [
+        [("get_restaurant_information", {"query": "opening_hours"})],
+    ],
+    "What starters do you have?": [
+        [("get_menu_items", {"category": "STARTERS"})],
+    ],
+    "Can I book a table for 2 tomorrow at 20:00?": [
+        [
+            (
+                "get_available_tables",
+                {"guests": 2, "date": "{tomorrow}", "time": "20:00"},
+            )
+        ],
+        [
+            (
+                "book_table",
+                {
+                    "reservation_name": "Load Test",
+                    "reservation_phone": "+4915000000000",
+                    "date": "{tomorrow}",
+                    "time": "20:00",
+                    "guests": 2,
+                },
+            )
+        ],
+    ],
+    "Do I have a reservation?": [
+        [("get_customer_reservations", {})],
+    ],
+    "What would you recommend for me?": [
+        [
+            ("get_personalized_recommendations", {"limit": 5}),
+            ("get_available_promotions", {}),
+        ],
+    ],
+    "Thanks, see you soon!": [],
+}
+
+ASSISTANT_REPLY = "Thanks for your message! This reply comes from a stand-in."
+
+
+def fake_call(**arguments):
+    """Stand-in for an OpenAI tool call carrying JSON arguments."""
+    return SimpleNamespace(function=SimpleNamespace(arguments=json.dumps(arguments)))
+
+
+def _object_id(prefix):
+    return f"{prefix}_{uuid.uuid4().hex[:24]}"
+
+
+def _fill_arguments(arguments):
+    tomorrow = str(date.today() + timedelta(days=1))
+    return {
+        key: value.replace("{tomorrow}", tomorrow) if isinstance(value, str) else value
+        for key, value in arguments.items()
+    }
+
+
+ACTIVE_RUN_STATUSES = ("queued", "in_progress", "requires_action", "cancelling")
+
+
+class StandInState:
+    """
+    In-memory threads, runs and sent messages. Only touched from the server
+    event loop, so it needs no locking.
+
+    Args:
+        run_latency: Seconds a run stays in_progress before each status change,
+            the time the model would take to think
+    """
+
+    def __init__(self, run_latency=0.0):
+        self.run_latency = run_latency
+        self.threads = {}
+        self.runs = {}
+        self.sent_messages = []
+        self.requests = Counter()
+
+    def get_thread(self, thread_id):
+        # Unknown ids are threads created before the stand-in started
+        return self.threads.setdefault(thread_id, {"messages": [], "runs": []})
+
+    def create_run(self, thread_id, assistant_id):
+        thread = self.get_thread(thread_id)
+        user_messages = [m for m in thread["messages"] if m["role"] == "user"]
+        # Coalesced messages arrive as one, a line each; the last one is scripted
+        last_message = (
+            user_messages[-1]["content"][0]["text"]["value"].splitlines()[-1]
+            if user_messages
+            else ""
+        )
+
+        run = {
+            "id": _object_id("run"),
+            "object": "thread.run",
+            "created_at": int(time.time()),
+            "thread_id": thread_id,
+            "assistant_id": assistant_id,
+            "status": "queued",
+            "required_action": None,
+            "model": "stand-in",
+            "tools": [],
+            "metadata": {},
+            # Private bookkeeping, stripped from responses
+            "_rounds": CONVERSATION_SCRIPTS.get(last_message, []),
+            "_round": 0,
+            "_ready_at": time.monotonic() + self.run_latency,
+        }
+        self.runs[run["id"]] = run
+        thread["runs"].insert(0, run)
+        return run
+
+    def get_active_run(self, thread_id):
+        """The thread's unfinished run, which blocks new messages and runs."""
+        for run in self.get_thread(thread_id)["runs"]:
+            if self.advance(run)["status"] in ACTIVE_RUN_STATUSES:
+                return run
+        return None
+
+    def advance(self, run):
+        """Move a run on to its next scripted status once it is ready."""
+        if run["status"] == "cancelling":
+            # Like the Assistants API, a cancel takes effect a little later
+            if time.monotonic() >= run["_ready_at"]:
+                run["status"] = "cancelled"
+            return run
+        if run["status"] in ("cancelled", "completed", "requires_action"):
+            return run
+        if time.monotonic() < run["_ready_at"]:
+            run["status"] = "in_progress"
+            return run
+
+        if run["_round"] < len(run["_rounds"]):
+            tool_calls = [
+                {
+                    "id": _object_id("call"),
+                    "type": "function",
+                    "function": {
+                        "name": name,
+                        "arguments": json.dumps(_fill_arguments(arguments)),
+                    },
+                }
+                for name, arguments in run["_rounds"][run["_round"]]
+            ]
+            run["status"] = "requires_action"
+            run["required_action"] = {
+                "type": "submit_tool_outputs",
+                "submit_tool_outputs": {"tool_calls": tool_calls},
+            }
+        else:
+            run["status"] = "completed"
+            run["required_action"] = None
+            # Rough token counts, growing with the tool output rounds
+            prompt_tokens = 800 + 300 * len(run["_rounds"])
+            run["usage"] = {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": 60,
+                "total_tokens": prompt_tokens + 60,
+                # The instructions prefix is served from the prompt cache
+                "prompt_token_details": {"cached_tokens": 800},
+            }
+            self.add_message(run["thread_id"], "assistant", ASSISTANT_REPLY)
+        return run
+
+    def submit_tool_outputs(self, run):
+        run["_round"] += 1
+        run["_ready_at"] = time.monotonic() + self.run_latency
+        run["status"] = "in_progress"
+        run["required_action"] = None
+        return run
+
+    def add_message(self, thread_id, role, text):
+        message = {
+            "id": _object_id("msg"),
+            "object": "thread.message",
+            "created_at": int(time.time()),
+            "thread_id": thread_id,
+            "role": role,
+            "content": [{"type": "text", "text": {"value": text, "annotations": []}}],
+            "attachments": [],
+            "metadata": {},
+        }
+        self.get_thread(thread_id)["messages"].append(message)
+        return message
+
+
+def _public(run):
+    return {key: value for key, value in run.items() if not key.startswith("_")}
+
+
+def _page(items):
+    return {
+        "object": "list",
+        "data": items,
+        "first_id": items[0]["id"] if items else None,
+        "last_id": items[-1]["id"] if items else None,
+        "has_more": False,
+    }
+
+
+def create_stand_in_app(state, latency=0.0, twilio_latency=0.0):
+    """
+    aiohttp app serving the Assistants endpoints the webhook uses under /v1
+    and the Twilio Messages API under /2010-04-01.
+
+    Args:
+        state: StandInState holding threads, runs and sent messages
+        latency: Seconds added to every OpenAI response
+        twilio_latency: Seconds added to every Twilio response
+    """
+    routes = web.RouteTableDef()
+
+    @web.middleware
+    async def delay(request, handler):
+        route = request.match_info.route.resource
+        name = route.canonical if route else request.path
+        state.requests[f"{request.method} {name}"] += 1
+
+        if request.path.startswith("/2010-04-01"):
+            await asyncio.sleep(twilio_latency)
+        else:
+            await asyncio.sleep(latency)
+        return await handler(request)
+
+    @routes.get("/v1/assistants/{assistant_id}")
+    async def retrieve_assistant(request):
+        return web.json_response(
+            {
+                "id": request.match_info["assistant_id"],
+                "object": "assistant",
+                "created_at": int(time.time()),
+                "name": "Stand-in assistant",
+                "model": "stand-in",
+                "instructions": "You are a restaurant assistant.",
+                "tools": [],
+                "metadata": {},
+            }
+        )
+
+    @routes.post("/v1/threads")
+    async def create_thread(request):
+        thread_id = _object_id("thread")
+        state.get_thread(thread_id)
+        return web.json_response(
+            {
+                "id": thread_id,
+                "object": "thread",
+                "created_at": int(time.time()),
+                "metadata": {},
+            }
+        )
+
+    def check_no_active_run(request):
+        # Like the Assistants API, a thread takes one run at a time
+        run = state.get_active_run(request.match_info["thread_id"])
+        if run is not None:
+            raise web.HTTPBadRequest(
+                text=json.dumps(
+                    {
+                        "error": {
+                            "message": f"Thread {run['thread_id']} already has "
+                            f"an active run {run['id']}."
+                        }
+                    }
+                ),
+                content_type="application/json",
+            )
+
+    @routes.post("/v1/threads/{thread_id}/messages")
+    async def create_message(request):
+        check_no_active_run(request)
+        data = await request.json()
+        return web.json_response(
+            state.add_message(
+                request.match_info["thread_id"], data["role"], data["content"]
+            )
+        )
+
+    @routes.get("/v1/threads/{thread_id}/messages")
+    async def list_messages(request):
+        limit = int(request.query.get("limit", 20))
+        messages = state.get_thread(request.match_info["thread_id"])["messages"]
+        return web.json_response(_page(messages[::-1][:limit]))
+
+    @routes.post("/v1/threads/{thread_id}/runs")
+    async def create_run(request):
+        check_no_active_run(request)
+        data = await request.json()
+        run = state.create_run(request.match_info["thread_id"], data["assistant_id"])
+        return web.json_response(_public(run))
+
+    @routes.get("/v1/threads/{thread_id}/runs")
+    async def list_runs(request):
+        limit = int(request.query.get("limit", 20))
+        runs = state.get_thread(request.match_info["thread_id"])["runs"][:limit]
+        return web.json_response(_page([_public(state.advance(run)) for run in runs]))
+
+    def get_run(request):
+        run = state.runs.get(request.match_info["run_id"])
+        if run is None:
+            raise web.HTTPNotFound(
+                text='{"error": {"message": "No run found"}}',
+                content_type="application/json",
+            )
+        return run
+
+    @routes.get("/v1/threads/{thread_id}/runs/{run_id}")
+    async def retrieve_run(request):
+        return web.json_response(_public(state.advance(get_run(request))))
+
+    @routes.post("/v1/threads/{thread_id}/runs/{run_id}/submit_tool_outputs")
+    async def submit_tool_outputs(request):
+        run = get_run(request)
+        await request.json()
+        return web.json_response(_public(state.submit_tool_outputs(run)))
+
+    @routes.post("/v1/threads/{thread_id}/runs/{run_id}/cancel")
+    async def cancel_run(request):
+        run = get_run(request)
+        if state.advance(run)["status"] in ACTIVE_RUN_STATUSES:
+            run["status"] = "cancelling"
+            run["_ready_at"] = time.monotonic() + state.run_latency
+        return web.json_response(_public(run))
+
+    @routes.post("/2010-04-01/Accounts/{account_sid}/Messages.json")
+    async def send_message(request):
+        data = await request.post()
+        message = {
+            "sid": f"SM{uuid.uuid4().hex}",
+            "account_sid": request.match_info["account_sid"],
+            "from": data.get("From"),
+            "to": data.get("To"),
+            "body": data.get("Body"),
+            "status": "queued",
+        }
+        state.sent_messages.append(message)
+        return web.json_response(message, status=201)
+
+    app = web.Application(middlewares=[delay])
+    app.add_routes(routes)
+    return app
+
+
+class StandInServer:
+    """
+    Serves the stand-in app from a background thread with its own event loop.
+
+    Usage:
+        with StandInServer(state, port=8765) as server:
+            OpenAI(base_url=server.openai_url, ...)
+    """
+
+    def __init__(self, state, host="127.0.0.1", port=8765, **app_options):
+        self.state = state
+        self.host = host
+        self.port = port
+        self.app_options = app_options
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+
+    @property
+    def twilio_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def openai_url(self):
+        return f"{self.twilio_url}/v1"
+
+    async def _start(self):
+        app = create_stand_in_app(self.state, **self.app_options)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.port).start()
+
+    def __enter__(self):
+        self.thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(), self.loop).result()
+        return self
+
+    def __exit__(self, *exc_info):
+        asyncio.run_coroutine_threadsafe(self.runner.cleanup(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
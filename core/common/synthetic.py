@@ -0,0 +1,500 @@
+import itertools
+import random
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+
+import pytz
+
+from apps.organization.choices import DaysOfWeek, MessageTemplateType
+from apps.organization.models import (
+    MessageTemplate,
+    OpeningHours,
+    Organization,
+    OrganizationUser,
+)
+from apps.restaurant.choices import (
+    CategoryChoices,
+    ClassificationChoices,
+    ClientMessageRole,
+    PromotionSentLogStatus,
+    ReservationStatus,
+    RewardCategory,
+    RewardType,
+    TriggerType,
+    YearlyCategory,
+)
+from apps.restaurant.models import (
+    Client,
+    ClientMessage,
+    Menu,
+    Promotion,
+    PromotionSentLog,
+    PromotionTrigger,
+    Reservation,
+    RestaurantTable,
+    Reward,
+    SalesLevel,
+    WhatsappBot,
+)
+
+User = get_user_model()
+
+INGREDIENTS = [
+    "tomato",
+    "basil",
+    "mozzarella",
+    "flour",
+    "egg",
+    "milk",
+    "butter",
+    "salmon",
+    "beef",
+    "chicken",
+    "rice",
+    "garlic",
+    "onion",
+    "lemon",
+    "almond",
+    "chocolate",
+]
+
+ALLERGENS = ["gluten", "lactose", "eggs", "fish", "nuts", "soy", "celery"]
+
+CUSTOMER_MESSAGES = [
+    "Hi, do you have a table for {guests} tonight?",
+    "Can I book for Saturday at 19:00?",
+    "Do you have gluten-free cake?",
+    "Is there a vegan option on the menu?",
+    "I'd like to cancel my reservation, please.",
+    "Can we move our booking to 20:30?",
+    "Hallo, habt ihr morgen noch einen Tisch frei?",
+    "What are your opening hours on Sunday?",
+]
+
+ASSISTANT_MESSAGES = [
+    "Of course! For how many guests?",
+    "Your table is booked. See you soon!",
+    "Yes, we have a gluten-free chocolate cake.",
+    "Our vegan risotto is very popular.",
+    "Your reservation has been cancelled.",
+    "Done, your booking is now at 20:30.",
+]
+
+# Shared by every synthetic owner; hashing is too slow to repeat per tenant
+SYNTHETIC_PASSWORD = "synthetic-password"
+
+# Clients are generated and inserted this many at a time to bound memory
+CLIENT_CHUNK_SIZE = 1000
+
+# Reservations reach this far into the future; `days` sets the history
+UPCOMING_DAYS = 30
+
+PAST_STATUSES = [
+    ReservationStatus.COMPLETED,
+    ReservationStatus.COMPLETED,
+    ReservationStatus.COMPLETED,
+    ReservationStatus.CANCELLED,
+    ReservationStatus.ABSENT,
+]
+
+# Synthetic restaurants are all in Berlin, which avoids geocoding lookups
+SYNTHETIC_TIMEZONE = pytz.timezone("Europe/Berlin")
+
+
+def _uid(rng):
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+def _bulk_create(model, objects, batch_size):
+    return model.objects.bulk_create(objects, batch_size=batch_size)
+
+
+@contextmanager
+def _explicit_timestamps(model, *field_names):
+    """Let bulk_create keep the given auto_now_add values instead of now()."""
+    fields = [model._meta.get_field(field_name) for field_name in field_names]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def create_synthetic_tenant(
+    index: int,
+    clients: int = 10,
+    reservations_per_client: int = 3,
+    messages_per_client: int = 4,
+    days: int = 365,
+    tables: int = 12,
+    menus: int = 60,
+    promotions: int = 3,
+    seed: int = 0,
+    batch_size: int = 5000,
+    password_hash: str = None,
+):
+    """
+    Create one restaurant with realistic related data using bulk inserts.
+
+    Model save() hooks and signals are bypassed: reminder times are filled
+    in here, message search vectors and analytics rollups are left empty.
+
+    Args:
+        index: Tenant number, used in unique names
+        clients: Number of clients
+        reservations_per_client: Reservations per client
+        messages_per_client: ClientMessage rows per client
+        days: Days of history; reservations span these and UPCOMING_DAYS
+        tables: Number of tables
+        menus: Number of dishes, cycling through categories and classifications
+        promotions: Number of yearly promotions, each with its own reward
+        seed: Random seed; the same seed and sizes produce the same data
+        batch_size: bulk_create batch size
+        password_hash: Pre-computed owner password hash
+
+    Returns:
+        Tuple of (organization, owner user, Counter of client rows per model)
+    """
+    rng = random.Random(f"{seed}:{index}")
+    today = date.today()
+    token = f"{seed}-{index}"
+
+    owner = User.objects.create(
+        uid=_uid(rng),
+        email=f"owner-{token}@synthetic.chefbot",
+        first_name="Synthetic",
+        last_name=f"Owner {index}",
+        password=password_hash or make_password(SYNTHETIC_PASSWORD),
+    )
+    organization = Organization.objects.create(
+        uid=_uid(rng),
+        name=f"Synthetic Restaurant {token}",
+        email=f"restaurant-{token}@synthetic.chefbot",
+        country="Germany",
+        city="Berlin",
+        street=f"Teststrasse {index}",
+        zip_code="10115",
+    )
+    OrganizationUser.objects.create(
+        uid=_uid(rng), organization=organization, user=owner
+    )
+
+    _bulk_create(
+        OpeningHours,
+        [
+            OpeningHours(
+                uid=_uid(rng),
+                organization=organization,
+                day=day,
+                opening_start_time=time(11, 0),
+                opening_end_time=time(23, 0),
+                break_start_time=time(15, 0),
+                break_end_time=time(17, 0),
+                is_closed=day == DaysOfWeek.MONDAY,
+            )
+            for day in DaysOfWeek.values
+        ],
+        batch_size,
+    )
+
+    restaurant_tables = _bulk_create(
+        RestaurantTable,
+        [
+            RestaurantTable(
+                uid=_uid(rng),
+                organization=organization,
+                name=f"T{number + 1}",
+                capacity=rng.choice([2, 2, 4, 4, 6, 8]),
+            )
+            for number in range(tables)
+        ],
+        batch_size,
+    )
+
+    kinds = [
+        (category, classification)
+        for category in CategoryChoices
+        for classification in ClassificationChoices
+    ]
+    menu_objects = []
+    for number in range(menus):
+        category, classification = kinds[number % len(kinds)]
+        variant = number // len(kinds) + 1
+        menu_objects.append(
+            Menu(
+                uid=_uid(rng),
+                organization=organization,
+                name=f"{category.label} {classification.label} {variant}",
+                description=f"House {classification.label.lower()} dish",
+                price=rng.randint(400, 3500) / 100,
+                ingredients={
+                    ingredient: f"{rng.randint(10, 500)}g"
+                    for ingredient in rng.sample(INGREDIENTS, 4)
+                },
+                category=category,
+                classification=classification,
+                allergens=rng.sample(ALLERGENS, rng.randint(0, 3)),
+                macronutrients={
+                    "calories": rng.randint(100, 900),
+                    "protein": rng.randint(1, 60),
+                },
+                upselling_priority=rng.randint(1, 5),
+                enable_upselling=rng.random() < 0.2,
+            )
+        )
+    restaurant_menus = _bulk_create(Menu, menu_objects, batch_size)
+    Menu.recommended_combinations.through.objects.bulk_create(
+        [
+            Menu.recommended_combinations.through(
+                from_menu_id=menu.id, to_menu_id=other.id
+            )
+            for menu in restaurant_menus
+            for other in rng.sample(restaurant_menus, min(2, len(restaurant_menus)))
+            if other != menu
+        ],
+        batch_size=batch_size,
+    )
+
+    sales_level_reward = Reward.objects.create(
+        uid=_uid(rng),
+        organization=organization,
+        type=RewardType.DESSERT,
+        label="Free dessert",
+        promo_code=f"SLV{token}",
+        reward_category=RewardCategory.SALES_LEVEL,
+    )
+    sales_level = SalesLevel.objects.create(
+        uid=_uid(rng),
+        organization=organization,
+        name="Balanced",
+        level=2,
+        reward=sales_level_reward,
+    )
+
+    yearly_categories = [YearlyCategory.BIRTHDAY, YearlyCategory.ANNIVERSARY]
+    message_templates = {
+        yearly_category: MessageTemplate.objects.create(
+            uid=_uid(rng),
+            organization=organization,
+            name=yearly_category.label,
+            content_sid=f"HX{token}{yearly_category}",
+            content=f"Happy {yearly_category.label.lower()} {{{{1}}}}!",
+            type=MessageTemplateType(yearly_category),
+        )
+        for yearly_category in yearly_categories
+    }
+    rewards = _bulk_create(
+        Reward,
+        [
+            Reward(
+                uid=_uid(rng),
+                organization=organization,
+                type=RewardType.DRINK,
+                label="Free drink",
+                promo_code=f"DRI{token}-{number}",
+                reward_category=RewardCategory.PROMOTION,
+            )
+            for number in range(promotions)
+        ],
+        batch_size,
+    )
+    restaurant_promotions = []
+    for number, reward in enumerate(rewards):
+        yearly_category = yearly_categories[number % len(yearly_categories)]
+        trigger = PromotionTrigger.objects.create(
+            uid=_uid(rng),
+            type=TriggerType.YEARLY,
+            yearly_category=yearly_category,
+            days_before=rng.randint(1, 7),
+        )
+        restaurant_promotions.append(
+            Promotion(
+                uid=_uid(rng),
+                title=f"{yearly_category.label} drink {token}-{number}",
+                valid_from=today - timedelta(days=30),
+                valid_to=today + timedelta(days=30),
+                message_template=message_templates[yearly_category],
+                organization=organization,
+                reward=reward,
+                trigger=trigger,
+            )
+        )
+    restaurant_promotions = _bulk_create(Promotion, restaurant_promotions, batch_size)
+
+    WhatsappBot.objects.create(
+        uid=_uid(rng),
+        organization=organization,
+        sales_level=sales_level,
+        chatbot_name="Chefbot",
+        twilio_number=f"whatsapp:+4930{seed:03d}{index:05d}",
+        hashed_key="synthetic",
+    )
+
+    rows = Counter()
+    for start in range(0, clients, CLIENT_CHUNK_SIZE):
+        rows += _create_clients(
+            rng,
+            organization,
+            token,
+            range(start, min(start + CLIENT_CHUNK_SIZE, clients)),
+            reservations_per_client=reservations_per_client,
+            messages_per_client=messages_per_client,
+            days=days,
+            tables=restaurant_tables,
+            menus=restaurant_menus,
+            rewards=rewards,
+            promotions=restaurant_promotions,
+            batch_size=batch_size,
+        )
+
+    return organization, owner, rows
+
+
+def _create_clients(
+    rng,
+    organization,
+    token,
+    numbers,
+    reservations_per_client,
+    messages_per_client,
+    days,
+    tables,
+    menus,
+    rewards,
+    promotions,
+    batch_size,
+):
+    """Create a chunk of clients with their reservations, messages and logs."""
+    today = date.today()
+    now = timezone.now()
+    booking_reminder = timedelta(minutes=organization.reservation_booking_reminder)
+
+    restaurant_clients = _bulk_create(
+        Client,
+        [
+            Client(
+                uid=_uid(rng),
+                organization=organization,
+                name=f"Guest {token}-{number}",
+                whatsapp_number=f"+4915{number:09d}",
+                date_of_birth=date(rng.randint(1950, 2005), rng.randint(1, 12), 1)
+                + timedelta(days=rng.randint(0, 27)),
+                anniversary_date=(
+                    date(rng.randint(2000, 2023), rng.randint(1, 12), 1)
+                    + timedelta(days=rng.randint(0, 27))
+                    if rng.random() < 0.3
+                    else None
+                ),
+                last_visit=now - timedelta(days=rng.randint(0, days)),
+                preferences=rng.sample(["window", "terrace", "quiet"], 1),
+                allergens=rng.sample(ALLERGENS, rng.randint(0, 2)),
+                thread_id=f"thread_{token}_{number}",
+            )
+            for number in numbers
+        ],
+        batch_size,
+    )
+
+    reservations = []
+    for client in restaurant_clients:
+        for _ in range(reservations_per_client):
+            reservation_date = today + timedelta(days=rng.randint(-days, UPCOMING_DAYS))
+            reservation_time = time(rng.choice([12, 13, 18, 19, 20, 21]), 0)
+            # Same reminder times Reservation.save() would compute
+            reservation_dt = SYNTHETIC_TIMEZONE.localize(
+                datetime.combine(reservation_date, reservation_time)
+            ).astimezone(pytz.UTC)
+            reservations.append(
+                Reservation(
+                    uid=_uid(rng),
+                    organization=organization,
+                    client=client,
+                    table=rng.choice(tables),
+                    reservation_name=client.name,
+                    reservation_phone=client.whatsapp_number,
+                    reservation_date=reservation_date,
+                    reservation_time=reservation_time,
+                    guests=rng.randint(1, 6),
+                    reservation_status=(
+                        ReservationStatus.PLACED
+                        if reservation_date >= today
+                        else rng.choice(PAST_STATUSES)
+                    ),
+                    promo_code=(
+                        rng.choice(rewards) if rewards and rng.random() < 0.05 else None
+                    ),
+                    booking_reminder_sent_at=reservation_dt - booking_reminder,
+                    auto_reminder_at=reservation_dt - timedelta(hours=24),
+                    created_at=reservation_dt - timedelta(days=rng.randint(0, 14)),
+                )
+            )
+    with _explicit_timestamps(Reservation, "created_at"):
+        reservations = _bulk_create(Reservation, reservations, batch_size)
+
+    reservation_menus = _bulk_create(
+        Reservation.menus.through,
+        [
+            Reservation.menus.through(reservation_id=reservation.id, menu_id=menu.id)
+            for reservation in reservations
+            for menu in rng.sample(menus, min(rng.randint(0, 3), len(menus)))
+        ],
+        batch_size,
+    )
+
+    messages = []
+    for client in restaurant_clients:
+        sent_at = now - timedelta(
+            days=rng.randint(0, days), minutes=rng.randint(0, 1439)
+        )
+        for number in range(messages_per_client):
+            is_user = number % 2 == 0
+            template = rng.choice(CUSTOMER_MESSAGES if is_user else ASSISTANT_MESSAGES)
+            messages.append(
+                ClientMessage(
+                    uid=_uid(rng),
+                    client=client,
+                    role=(
+                        ClientMessageRole.USER
+                        if is_user
+                        else ClientMessageRole.ASSISTANT
+                    ),
+                    message=template.format(guests=rng.randint(2, 6)),
+                    sent_at=sent_at + timedelta(minutes=number),
+                )
+            )
+    with _explicit_timestamps(ClientMessage, "sent_at"):
+        _bulk_create(ClientMessage, messages, batch_size)
+
+    sent_logs = [
+        PromotionSentLog(
+            uid=_uid(rng),
+            promotion=promotion,
+            client=client,
+            message_template=promotion.message_template,
+            status=rng.choice(PromotionSentLogStatus.values),
+            sent_at=now - timedelta(days=rng.randint(0, 30)),
+        )
+        for client, promotion in zip(
+            restaurant_clients[::2], itertools.cycle(promotions)
+        )
+    ]
+    with _explicit_timestamps(PromotionSentLog, "sent_at"):
+        _bulk_create(PromotionSentLog, sent_logs, batch_size)
+
+    return Counter(
+        {
+            Client: len(restaurant_clients),
+            Reservation: len(reservations),
+            Reservation.menus.through: len(reservation_menus),
+            ClientMessage: len(messages),
+            PromotionSentLog: len(sent_logs),
+        }
+    )
@@ -1,4 +1,5 @@
 import json
+import logging
 import pytz
 from datetime import datetime
 import requests
@@ -10,7 +11,13 @@ from django.conf import settings
 from django.db.models import Count, Q
 from django.utils import timezone
 
-from apps.organization.choices import MessageTemplateType
+from apps.analytics.utils import (
+    get_token_regression,
+    rollup_organization_day,
+    rollup_token_usage_day,
+)
+from apps.organization.choices import MessageTemplateType, OrganizationType
+from apps.organization.models import Organization
 from apps.restaurant.models import (
     Client,
     Promotion,
@@ -27,12 +34,15 @@ from apps.restaurant.choices import (
 from common.timezones import get_timezone_from_country_city
 
 from .crypto import decrypt_data
+from .metrics import TWILIO_ERRORS, TWILIO_REQUEST_SECONDS, timer
+
+logger = logging.getLogger(__name__)
 
 
 def send_whatsapp_template(
     from_number, to, twilio_sid, twilio_auth_token, template_sid, content_variables
 ):
-    url = f"https://api.twilio.com/2010-04-01/Accounts/{twilio_sid}/Messages.json"
+    url = f"{settings.TWILIO_API_URL}/2010-04-01/Accounts/{twilio_sid}/Messages.json"
 
     data = {
         "From": from_number,
@@ -44,8 +54,9 @@ def send_whatsapp_template(
     auth = (twilio_sid, twilio_auth_token)
 
     try:
-        response = requests.post(url, data=data, auth=auth)
-        response.raise_for_status()
+        with timer(TWILIO_REQUEST_SECONDS, TWILIO_ERRORS, kind="template"):
+            response = requests.post(url, data=data, auth=auth)
+            response.raise_for_status()
         return response.json()
     except requests.exceptions.RequestException as e:
         print(f"Error sending message: {e}")
@@ -223,6 +234,68 @@ def send_scheduled_promotions() -> None:
             print(f"Unknown or improperly configured trigger: {trigger}")
 
 
+# Queued from model signals; nothing reads its result, and subscribing to
+# it would make every save wait on the result backend
+@shared_task(ignore_result=True)
+def refresh_analytics_rollup(organization_id: int, day: str) -> None:
+    """
+    Incrementally rebuild the analytics rollups of one organization for one day.
+    Queued on commit whenever a reservation (or its dishes) changes.
+    """
+    rollup_organization_day(organization_id, datetime.strptime(day, "%Y-%m-%d").date())
+
+
+@shared_task
+def rollup_analytics_nightly() -> None:
+    """
+    Runs daily.
+    Re-rolls yesterday and today for every restaurant, catching any change that
+    bypassed the model signals (e.g. queryset.update()).
+    """
+    today = timezone.now().date()
+    organization_ids = Organization.objects.filter(
+        organization_type=OrganizationType.RESTAURANT
+    ).values_list("id", flat=True)
+
+    for organization_id in organization_ids:
+        for day in (today - timedelta(days=1), today):
+            rollup_organization_day(organization_id, day)
+            rollup_token_usage_day(organization_id, day)
+
+
+# Queued from model signals, like refresh_analytics_rollup
+@shared_task(ignore_result=True)
+def refresh_token_rollup(organization_id: int, day: str) -> None:
+    """
+    Rebuild the token rollups of one organization for one day.
+    Queued on commit whenever an assistant run's usage is recorded.
+    """
+    rollup_token_usage_day(organization_id, datetime.strptime(day, "%Y-%m-%d").date())
+
+
+@shared_task
+def check_token_regressions() -> None:
+    """
+    Runs daily, after the nightly rollups.
+    Warns about every restaurant whose average tokens per turn yesterday
+    exceeded its baseline by more than TOKEN_REGRESSION_THRESHOLD.
+    """
+    yesterday = timezone.now().date() - timedelta(days=1)
+    organizations = Organization.objects.filter(
+        organization_type=OrganizationType.RESTAURANT,
+        token_rollups__run_date=yesterday,
+    ).distinct()
+
+    for organization in organizations:
+        regression = get_token_regression(organization.id, yesterday)
+        if regression["regressed"]:
+            logger.warning(
+                f"Token regression for {organization.name} ({organization.uid}) "
+                f"on {yesterday}: {regression['avg_tokens_per_turn']} tokens per "
+                f"turn, baseline {regression['baseline_avg_tokens_per_turn']}"
+            )
+
+
 @shared_task
 def reservation_reminder() -> None:
     """
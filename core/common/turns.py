@@ -0,0 +1,247 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .metrics import stage_span
+
+logger = logging.getLogger(__name__)
+
+
+class TurnQueueTimeout(Exception):
+    """Raised when earlier turns of a conversation keep a turn waiting too long."""
+
+
+def _key(conversation, *parts):
+    return ":".join(["turn", conversation, *(str(part) for part in parts)])
+
+
+def _take_ticket(conversation) -> int:
+    """Next place in the conversation's queue; the first ticket of a queue is 1."""
+    timeout = settings.TURN_QUEUE_KEY_TIMEOUT
+    cache.add(_key(conversation, "serving"), 1, timeout)
+    cache.add(_key(conversation, "next"), 0, timeout)
+    try:
+        ticket = cache.incr(_key(conversation, "next"))
+    except ValueError:
+        # The counter expired in between
+        cache.add(_key(conversation, "next"), 0, timeout)
+        ticket = cache.incr(_key(conversation, "next"))
+
+    cache.touch(_key(conversation, "serving"), timeout)
+    cache.touch(_key(conversation, "next"), timeout)
+    return ticket
+
+
+def _beat(conversation, ticket) -> None:
+    cache.set(_key(conversation, "alive", ticket), 1, settings.TURN_HEARTBEAT_TIMEOUT)
+
+
+def _advance(conversation, ticket) -> None:
+    """
+    Serve the ticket after this one. Guarded per ticket, so a release racing
+    a skip of the same ticket advances the queue once.
+    """
+    if cache.add(
+        _key(conversation, "done", ticket), 1, settings.TURN_QUEUE_KEY_TIMEOUT
+    ):
+        try:
+            cache.incr(_key(conversation, "serving"))
+        except ValueError:
+            pass
+
+
+def _wait(conversation, ticket) -> None:
+    deadline = time.monotonic() + settings.TURN_QUEUE_TIMEOUT
+    last_beat = 0.0
+    observed, observed_at = None, time.monotonic()
+
+    while True:
+        serving = cache.get(_key(conversation, "serving"))
+        if serving is None:
+            cache.add(
+                _key(conversation, "serving"),
+                ticket,
+                settings.TURN_QUEUE_KEY_TIMEOUT,
+            )
+            continue
+        # Past this ticket only when the counters expired while idle
+        if serving >= ticket:
+            return
+
+        now = time.monotonic()
+        if now - last_beat >= settings.TURN_HEARTBEAT_INTERVAL:
+            _beat(conversation, ticket)
+            last_beat = now
+
+        if serving != observed:
+            observed, observed_at = serving, now
+        elif (
+            now - observed_at >= settings.TURN_HEARTBEAT_INTERVAL
+            and cache.get(_key(conversation, "alive", serving)) is None
+        ):
+            # Its worker died or gave up without releasing
+            logger.warning(
+                f"Skipping stale turn {serving} of conversation {conversation}"
+            )
+            _advance(conversation, serving)
+
+        if now > deadline:
+            cache.delete(_key(conversation, "alive", ticket))
+            raise TurnQueueTimeout(
+                f"Turn {ticket} of conversation {conversation} waited for turn {serving} "
+                f"longer than {settings.TURN_QUEUE_TIMEOUT}s"
+            )
+        time.sleep(settings.TURN_QUEUE_POLL_INTERVAL)
+
+
+@contextmanager
+def conversation_turn(conversation: str):
+    """
+    Run a block after every earlier turn of a conversation, and before every
+    later one. Turns of different conversations do not wait on each other.
+
+    Turns queue in arrival order on tickets kept in the cache. A heartbeat
+    marks the running turn alive, so the queue moves on when its worker
+    dies instead of waiting for it forever.
+
+    Args:
+        conversation: Key of the conversation, e.g. organization and number
+
+    Usage:
+        with conversation_turn(f"{organization.uid}:{whatsapp_number}"):
+            openai_client.beta.threads.messages.create(...)
+
+    Raises:
+        TurnQueueTimeout: Earlier turns took longer than TURN_QUEUE_TIMEOUT
+    """
+    ticket = _take_ticket(conversation)
+    with stage_span("turn_wait"):
+        _wait(conversation, ticket)
+
+    stopped = threading.Event()
+
+    def heartbeat():
+        while not stopped.wait(settings.TURN_HEARTBEAT_INTERVAL):
+            _beat(conversation, ticket)
+
+    _beat(conversation, ticket)
+    threading.Thread(target=heartbeat, daemon=True).start()
+    try:
+        yield ticket
+    finally:
+        stopped.set()
+        cache.delete(_key(conversation, "alive", ticket))
+        _advance(conversation, ticket)
+
+
+def add_pending_message(conversation: str, message: str) -> int:
+    """
+    Keep an inbound message until a turn answers it.
+
+    Returns:
+        Its sequence number within the conversation
+    """
+    timeout = settings.TURN_QUEUE_KEY_TIMEOUT
+    cache.add(_key(conversation, "received"), 0, timeout)
+    try:
+        sequence = cache.incr(_key(conversation, "received"))
+    except ValueError:
+        cache.add(_key(conversation, "received"), 0, timeout)
+        sequence = cache.incr(_key(conversation, "received"))
+
+    cache.set(_key(conversation, "message", sequence), message, timeout)
+    cache.touch(_key(conversation, "received"), timeout)
+    return sequence
+
+
+def wait_for_burst(conversation: str, sequence: int) -> bool:
+    """
+    Wait WHATSAPP_COALESCE_WINDOW for more messages of the same burst.
+
+    Returns:
+        True when no later message arrived, so this one's webhook answers
+        the burst; False as soon as a later one arrives
+    """
+    deadline = time.monotonic() + settings.WHATSAPP_COALESCE_WINDOW
+    while True:
+        if (cache.get(_key(conversation, "received")) or 0) > sequence:
+            return False
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return True
+        time.sleep(min(settings.TURN_QUEUE_POLL_INTERVAL, remaining))
+
+
+def _wait_for_body(conversation: str, sequence: int):
+    """
+    Body of a message whose number is published but whose body is not
+    stored yet. Its webhook stores it right after taking the number, so
+    only one that died in between keeps it missing past the timeout.
+    """
+    key = _key(conversation, "message", sequence)
+    deadline = time.monotonic() + settings.TURN_HEARTBEAT_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(settings.TURN_QUEUE_POLL_INTERVAL)
+        body = cache.get(key)
+        if body is not None:
+            return body
+
+    logger.warning(
+        f"Skipping message {sequence} of conversation {conversation}, "
+        "its body was never stored"
+    )
+    return None
+
+
+def _pending_sequences(conversation: str, received: int) -> range:
+    answered = cache.get(_key(conversation, "answered")) or 0
+    # The counters expired while idle and started over
+    if answered > received:
+        answered = 0
+    return range(answered + 1, received + 1)
+
+
+def peek_pending_messages(conversation: str) -> Tuple[List[str], int]:
+    """
+    Messages not yet answered, oldest first. Call it inside
+    conversation_turn, and mark_messages_answered once they reached the
+    assistant, so a turn that fails in between leaves them to the next one.
+
+    Waits for a message whose number is published before its body, so it
+    is never marked answered unread.
+
+    Returns:
+        The messages, and the sequence number to pass to mark_messages_answered
+    """
+    received = cache.get(_key(conversation, "received")) or 0
+    sequences = _pending_sequences(conversation, received)
+    if not sequences:
+        return [], received
+
+    keys = [_key(conversation, "message", sequence) for sequence in sequences]
+    bodies = cache.get_many(keys)
+
+    messages = []
+    for key, sequence in zip(keys, sequences):
+        body = bodies[key] if key in bodies else _wait_for_body(conversation, sequence)
+        if body is not None:
+            messages.append(body)
+    return messages, received
+
+
+def mark_messages_answered(conversation: str, received: int) -> None:
+    """Forget the messages peek_pending_messages returned with received."""
+    timeout = settings.TURN_QUEUE_KEY_TIMEOUT
+    sequences = _pending_sequences(conversation, received)
+
+    # Every body up to received was read, or given up on
+    cache.set(_key(conversation, "answered"), received, timeout)
+    cache.touch(_key(conversation, "received"), timeout)
+    cache.delete_many(
+        [_key(conversation, "message", sequence) for sequence in sequences]
+    )
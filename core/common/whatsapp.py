@@ -8,6 +8,7 @@ from django.http import JsonResponse
 from apps.restaurant.models import WhatsappBot
 
 from common.crypto import decrypt_data
+from common.metrics import TWILIO_ERRORS, TWILIO_REQUEST_SECONDS, timer
 
 logger = logging.getLogger(__name__)
 
@@ -26,7 +27,7 @@ def send_whatsapp_message(
         Response data if successful, None if failed
     """
 
-    url = f"https://api.twilio.com/2010-04-01/Accounts/{twilio_sid}/Messages.json"
+    url = f"{settings.TWILIO_API_URL}/2010-04-01/Accounts/{twilio_sid}/Messages.json"
 
     data = {
         "From": twilio_number,
@@ -37,8 +38,9 @@ def send_whatsapp_message(
     auth = (twilio_sid, twilio_auth_token)
 
     try:
-        response = requests.post(url, data=data, auth=auth)
-        response.raise_for_status()
+        with timer(TWILIO_REQUEST_SECONDS, TWILIO_ERRORS, kind="message"):
+            response = requests.post(url, data=data, auth=auth)
+            response.raise_for_status()
         return response.json()
     except requests.exceptions.RequestException as e:
         print(f"Error sending WhatsApp message: {e}")
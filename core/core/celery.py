@@ -1,8 +1,55 @@
 import os
+import time
+
 from celery import Celery
+from celery.signals import task_postrun, task_prerun, worker_ready
+
+from django.conf import settings
+
+from common.metrics import (
+    CELERY_TASK_SECONDS,
+    metrics_enabled,
+    start_metrics_server,
+    write_snapshot,
+)
+from common.profiling import start_sql_profile
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
 
 app = Celery("core")
 app.config_from_object("django.conf:settings", namespace="CELERY")
 app.autodiscover_tasks()
+
+# Start times and SQL profile stops of the tasks running in this process
+_task_started = {}
+_task_profiles = {}
+
+
+@task_prerun.connect
+def start_task_timer(task_id=None, task=None, **kwargs):
+    _task_started[task_id] = time.perf_counter()
+    _, stop = start_sql_profile("task", task.name)
+    if stop:
+        _task_profiles[task_id] = stop
+
+
+@task_postrun.connect
+def record_task_runtime(task_id=None, task=None, state=None, **kwargs):
+    stop_profile = _task_profiles.pop(task_id, None)
+    if stop_profile:
+        stop_profile()
+
+    started = _task_started.pop(task_id, None)
+    if started is None or not metrics_enabled():
+        return
+
+    CELERY_TASK_SECONDS.observe(
+        time.perf_counter() - started, task=task.name, state=state or "UNKNOWN"
+    )
+    write_snapshot()
+
+
+@worker_ready.connect
+def start_worker_metrics_exporter(**kwargs):
+    if metrics_enabled() and settings.CELERY_METRICS_PORT:
+        start_metrics_server(settings.CELERY_METRICS_PORT)
@@ -55,6 +55,7 @@ PROJECT_APPS = [
     "apps.organization",
     "apps.restaurant",
     "apps.openAI",
+    "apps.analytics",
     "common",
 ]
 
@@ -62,6 +63,8 @@ PROJECT_APPS = [
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + PROJECT_APPS
 
 MIDDLEWARE = [
+    "common.middlewares.MetricsMiddleware",
+    "common.middlewares.SQLProfilingMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -175,11 +178,11 @@ REST_FRAMEWORK = {
         "rest_framework.permissions.IsAuthenticated",
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "common.authentication.CachedJWTAuthentication",
     ],
     "DEFAULT_FILTER_BACKENDS": [
         "django_filters.rest_framework.DjangoFilterBackend",
-        "rest_framework.filters.SearchFilter",
+        "common.filters.TrigramSearchFilter",
     ],
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
@@ -195,6 +198,10 @@ SIMPLE_JWT = {
     "AUTH_HEADER_TYPES": ("Bearer",),
 }
 
+# Per-process cache of JWT users keyed by token jti, in seconds (0 disables)
+JWT_USER_CACHE_TIMEOUT = config("JWT_USER_CACHE_TIMEOUT", default=0, cast=int)
+JWT_USER_CACHE_SIZE = config("JWT_USER_CACHE_SIZE", default=1000, cast=int)
+
 SPECTACULAR_SETTINGS = {
     "TITLE": "ChefBot API",
     "DESCRIPTION": "Restaurant management chatbot API",
@@ -212,12 +219,30 @@ OPENAI_API_KEY = config("OPENAI_API")
 TWILIO_ACCOUNT_SID = config("MY_TWILIO_ACCOUNT_SID")
 TWILIO_AUTH_TOKEN = config("MY_TWILIO_AUTH_TOKEN")
 TWILIO_WHATSAPP_NUMBER = config("TWILIO_WHATSAPP_NUMBER")
+# Twilio REST API root, pointed at a stand-in server by load tests
+TWILIO_API_URL = config("TWILIO_API_URL", default="https://api.twilio.com")
 
 # Crypto password
 CRYPTO_PASSWORD = config("CRYPTO_PASSWORD")
 
 # OpenAI
 ASSISTANT_ID = config("ASSISTANT_ID")
+# OpenAI API root, None uses the SDK default
+OPENAI_BASE_URL = config("OPENAI_BASE_URL", default=None)
+# OpenAI requests, in seconds, and retries of failed ones
+OPENAI_TIMEOUT = config("OPENAI_TIMEOUT", default=60.0, cast=float)
+OPENAI_CONNECT_TIMEOUT = config("OPENAI_CONNECT_TIMEOUT", default=5.0, cast=float)
+OPENAI_MAX_RETRIES = config("OPENAI_MAX_RETRIES", default=2, cast=int)
+# Seconds to wait for a cancelled run to stop blocking its thread
+OPENAI_RUN_CANCEL_TIMEOUT = config("OPENAI_RUN_CANCEL_TIMEOUT", default=10, cast=int)
+# Connection pool shared by the OpenAI clients of a process
+OPENAI_MAX_CONNECTIONS = config("OPENAI_MAX_CONNECTIONS", default=100, cast=int)
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = config(
+    "OPENAI_MAX_KEEPALIVE_CONNECTIONS", default=20, cast=int
+)
+OPENAI_KEEPALIVE_EXPIRY = config("OPENAI_KEEPALIVE_EXPIRY", default=30.0, cast=float)
+# OpenAI clients kept per process, one per API key
+OPENAI_CLIENT_CACHE_SIZE = config("OPENAI_CLIENT_CACHE_SIZE", default=64, cast=int)
 
 # Webhook url
 WEBHOOK_URL = config("WEBHOOK_URL")
@@ -295,6 +320,11 @@ LOGGING = {
             "level": "INFO",
             "propagate": False,
         },
+        "common.metrics": {
+            "handlers": ["console", "file"],
+            "level": "INFO",
+            "propagate": False,
+        },
     },
 }
 
@@ -310,6 +340,91 @@ CHANNEL_LAYERS = {
 }
 
 
+# Cache configuration
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": "redis://redis:6379/1",
+    }
+}
+
+# Record Prometheus metrics and per-turn WhatsApp timing logs
+METRICS_ENABLED = config("METRICS_ENABLED", default=False, cast=bool)
+# Directory where each process writes its metrics for /metrics to merge,
+# needed when several web or Celery worker processes run
+METRICS_DIR = config("METRICS_DIR", default="")
+METRICS_SNAPSHOT_INTERVAL = config("METRICS_SNAPSHOT_INTERVAL", default=5, cast=int)
+# Bearer token required by /metrics, empty allows any caller
+METRICS_TOKEN = config("METRICS_TOKEN", default="")
+# Port of the Celery worker metrics exporter, 0 disables it
+CELERY_METRICS_PORT = config("CELERY_METRICS_PORT", default=0, cast=int)
+
+# Count and time the SQL of requests, Celery tasks and bot tool calls
+SQL_PROFILING_ENABLED = config("SQL_PROFILING_ENABLED", default=False, cast=bool)
+# Share of profiled units whose slowest statements go to the admin report
+SQL_PROFILING_SAMPLE_RATE = config(
+    "SQL_PROFILING_SAMPLE_RATE", default=0.01, cast=float
+)
+SQL_PROFILING_TOP_STATEMENTS = 5
+SQL_PROFILING_MAX_STATEMENTS = 200
+# Query and time budgets by route pattern, Celery task or tool name
+SQL_DEFAULT_BUDGET = {"queries": 50, "ms": 1000}
+SQL_BUDGETS = {
+    "api/clients": {"queries": 10, "ms": 300},
+    "api/restaurants/<uuid:restaurant_uid>/analytics/most-visited": {
+        "queries": 10,
+        "ms": 500,
+    },
+    "api/whatsapp/bot": {"queries": 40, "ms": 1000},
+    "common.tasks.reservation_reminder": {"queries": 200, "ms": 10000},
+    "get_available_tables": {"queries": 5, "ms": 100},
+    "get_menu_items": {"queries": 5, "ms": 100},
+}
+
+# Analytics cache timeout in seconds (0 disables analytics caching)
+ANALYTICS_CACHE_TIMEOUT = config("ANALYTICS_CACHE_TIMEOUT", default=300, cast=int)
+
+# Dashboard cache timeout in seconds (0 disables dashboard caching)
+DASHBOARD_CACHE_TIMEOUT = config("DASHBOARD_CACHE_TIMEOUT", default=30, cast=int)
+
+# Bot context cache timeout in seconds, saves of its models invalidate it sooner
+BOT_CONTEXT_CACHE_TIMEOUT = config("BOT_CONTEXT_CACHE_TIMEOUT", default=3600, cast=int)
+
+# A day regresses when its average tokens per turn exceeds the average of the
+# previous TOKEN_REGRESSION_BASELINE_DAYS by more than this fraction
+TOKEN_REGRESSION_THRESHOLD = config(
+    "TOKEN_REGRESSION_THRESHOLD", default=0.3, cast=float
+)
+TOKEN_REGRESSION_BASELINE_DAYS = config(
+    "TOKEN_REGRESSION_BASELINE_DAYS", default=7, cast=int
+)
+# Days with fewer turns are too noisy to compare
+TOKEN_REGRESSION_MIN_TURNS = config("TOKEN_REGRESSION_MIN_TURNS", default=20, cast=int)
+
+# Estimated tokens one tool output may use; paged lists are cut to fit
+TOOL_DEFAULT_TOKEN_BUDGET = config("TOOL_DEFAULT_TOKEN_BUDGET", default=1000, cast=int)
+TOOL_TOKEN_BUDGETS = {
+    "get_menu_items": 2000,
+    "get_restaurant_information": 600,
+}
+
+# Turns of one conversation run in order; seconds a turn waits for the
+# earlier ones, and how often it checks
+TURN_QUEUE_TIMEOUT = config("TURN_QUEUE_TIMEOUT", default=120, cast=int)
+TURN_QUEUE_POLL_INTERVAL = config("TURN_QUEUE_POLL_INTERVAL", default=0.2, cast=float)
+# A turn whose heartbeat is older than the timeout is skipped as dead
+TURN_HEARTBEAT_INTERVAL = config("TURN_HEARTBEAT_INTERVAL", default=5, cast=int)
+TURN_HEARTBEAT_TIMEOUT = config("TURN_HEARTBEAT_TIMEOUT", default=15, cast=int)
+# Idle turn queues and unanswered messages are dropped after this many seconds
+TURN_QUEUE_KEY_TIMEOUT = config("TURN_QUEUE_KEY_TIMEOUT", default=86400, cast=int)
+# Seconds a customer's message waits for more messages of the same burst,
+# which one assistant run then answers together
+WHATSAPP_COALESCE_WINDOW = config("WHATSAPP_COALESCE_WINDOW", default=2.0, cast=float)
+
+# Cached organization ids per user, in seconds (invalidated on membership changes)
+MEMBERSHIP_CACHE_TIMEOUT = config("MEMBERSHIP_CACHE_TIMEOUT", default=3600, cast=int)
+
+
 # Cookie settings for HTTP production
 SESSION_COOKIE_SECURE = True
 SESSION_COOKIE_SAMESITE = "None"  # if cross-site cookies needed
@@ -327,6 +442,12 @@ CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
 CELERY_TIMEZONE = "UTC"
+# Tasks are queued from requests; give up quickly when the broker is down
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    "max_retries": 1,
+    "interval_start": 0,
+    "interval_step": 0.2,
+}
 
 
 from celery.schedules import crontab
@@ -341,4 +462,14 @@ CELERY_BEAT_SCHEDULE = {
         "task": "common.tasks.reservation_reminder",
         "schedule": crontab(minute="*/5"),
     },
+    # Analytics rollups - re-roll yesterday and today every night
+    "rollup-analytics-nightly": {
+        "task": "common.tasks.rollup_analytics_nightly",
+        "schedule": crontab(hour=2, minute=0),
+    },
+    # Token regressions - compare yesterday with its baseline after the rollups
+    "check-token-regressions-daily": {
+        "task": "common.tasks.check_token_regressions",
+        "schedule": crontab(hour=3, minute=0),
+    },
 }
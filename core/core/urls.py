@@ -15,6 +15,8 @@ from drf_spectacular.views import (
     SpectacularRedocView,
 )
 
+from api.views.metrics import metrics
+
 
 urlpatterns = [
     path("admin/", admin.site.urls),
@@ -45,6 +47,8 @@ urlpatterns = [
     # ReDoc UI
     path("api/redoc", SpectacularRedocView.as_view(url_name="schema"), name="redoc"),
     path("api", include("api.urls")),
+    # Prometheus metrics
+    path("metrics", metrics, name="metrics"),
 ]
 
 if settings.DEBUG: